@@ -0,0 +1,277 @@
+"""
+Per-order overhead benchmark for the order entry points.
+
+Each entry point (market, limit, OCO, grid, batched grid, TWAP) is run against the
+offline simulator with zero latency, so the measured time is the bot's own code:
+validation, margin checks, logging and client plumbing. Time spent inside the
+simulator is measured separately and subtracted to give the local overhead.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_orders
+    python -m benchmarks.bench_orders --orders 1,100,1000 --symbols 1,10 --scenarios limit,grid_batch
+    python -m benchmarks.bench_orders --label before-change
+    python -m benchmarks.bench_orders --compare benchmarks/results/before-change.json
+"""
+
+import os
+
+# The benchmark must not open WebSocket streams, read a stale filter snapshot or grow the order journal on disk.
+os.environ["MARKET_DATA_STREAM"] = "False"
+os.environ["FILTER_CACHE_PATH"] = ""
+os.environ["ORDER_JOURNAL_PATH"] = ""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from time import perf_counter
+
+from src.simulator import SimulatedExchange
+from src.utils.api import set_binance_client
+from src.utils.filters import filter_cache
+from src.utils.metrics import STAGE_METRIC, metrics
+from src.market_orders import place_market_order
+from src.limit_orders import place_limit_order
+from src.oco_orders import place_oco_orders
+from src.advanced.grid import place_grid_orders, place_grid_orders_batched
+from src.advanced.twap import place_twap_orders
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+SYMBOL_PRICE = 1000.0
+ORDER_QTY = 0.01
+
+_run_ids = itertools.count(1)
+
+
+class TimedExchange(SimulatedExchange):
+    """SimulatedExchange that accumulates the time spent serving requests."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.exchange_time = 0.0
+
+    def _call(self, name, params):
+        start = perf_counter()
+        try:
+            return super()._call(name, params)
+        finally:
+            self.exchange_time += perf_counter() - start
+
+
+def make_exchange(symbol_count: int) -> TimedExchange:
+    symbols = {
+        f"SYM{i:03d}USDT": {"price": SYMBOL_PRICE, "tick_size": "0.01", "step_size": "0.001",
+                            "min_qty": "0.001", "min_notional": "5"}
+        for i in range(symbol_count)
+    }
+    sim = TimedExchange(symbols=symbols, balance=1e12, liquidity_levels=5, liquidity_qty=1e6, seed=1)
+    # A distinct key per run gives every run a fresh margin ledger.
+    sim.API_KEY = f"bench-{next(_run_ids)}"
+    return sim
+
+
+def plan_calls(scenario: str, symbols: list, orders: int) -> list:
+    """
+    Return the entry-point calls for one run as (callable, orders placed) pairs.
+    Orders are spread evenly over the symbols.
+    """
+    cycle = itertools.cycle(symbols)
+    if scenario == "market":
+        return [(lambda s=next(cycle), side=("BUY", "SELL")[i % 2]: place_market_order(s, side, ORDER_QTY), 1)
+                for i in range(orders)]
+    if scenario == "limit":
+        return [(lambda s=next(cycle): place_limit_order(s, "BUY", ORDER_QTY, SYMBOL_PRICE * 0.9), 1)
+                for _ in range(orders)]
+    if scenario == "oco":
+        return [(lambda s=next(cycle): place_oco_orders(s, "SELL", ORDER_QTY, SYMBOL_PRICE * 1.1,
+                                                        SYMBOL_PRICE * 0.9, SYMBOL_PRICE * 0.89), 2)
+                for _ in range(max(1, orders // 2))]
+
+    used = symbols[:min(len(symbols), orders)]
+    per_symbol = max(2, orders // len(used))
+    low, high = SYMBOL_PRICE * 0.5, SYMBOL_PRICE * 0.99
+    if scenario == "grid":
+        return [(lambda s=s: place_grid_orders(s, "BUY", per_symbol * ORDER_QTY, low, high, per_symbol), per_symbol)
+                for s in used]
+    if scenario == "grid_batch":
+        return [(lambda s=s: place_grid_orders_batched(s, "BUY", per_symbol * ORDER_QTY, low, high, per_symbol),
+                 per_symbol) for s in used]
+    if scenario == "twap":
+        return [(lambda s=s: place_twap_orders(s, "BUY", per_symbol * ORDER_QTY, per_symbol, 0), per_symbol)
+                for s in used]
+    raise ValueError(f"Unknown scenario '{scenario}'.")
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence stdout and logging so console and file I/O do not dominate the measurement."""
+    logging.disable(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_case(scenario: str, orders: int, symbol_count: int, measure_memory: bool = True) -> dict:
+    """Run one scenario and return its timing, allocation and call-count figures."""
+    sim = make_exchange(symbol_count)
+    set_binance_client(sim)
+    filter_cache.invalidate()
+    calls = plan_calls(scenario, list(sim.symbols), orders)
+
+    samples = []
+    metrics.reset()
+    with quiet():
+        start = perf_counter()
+        for call, placed in calls:
+            call_start = perf_counter()
+            exchange_before = sim.exchange_time
+            call()
+            local = perf_counter() - call_start - (sim.exchange_time - exchange_before)
+            samples.append(local / placed * 1e6)
+        wall = perf_counter() - start
+    placed_total = sum(placed for _, placed in calls)
+    result = {
+        "scenario": scenario,
+        "orders": placed_total,
+        "symbols": min(symbol_count, placed_total),
+        "wall_s": round(wall, 6),
+        "exchange_s": round(sim.exchange_time, 6),
+        "orders_per_sec": round(placed_total / wall, 1) if wall else None,
+        "local_us_p50": round(percentile(samples, 50), 2),
+        "local_us_p99": round(percentile(samples, 99), 2),
+        "calls": dict(sim.call_counts),
+        "calls_per_order": round(sum(sim.call_counts.values()) / placed_total, 3),
+        "stage_us_mean": {stage: round(metrics.histogram(STAGE_METRIC, stage).sum / s["count"] * 1e6, 2)
+                          for stage, s in metrics.summary().get(STAGE_METRIC, {}).items()},
+    }
+
+    if measure_memory:
+        sim = make_exchange(symbol_count)
+        set_binance_client(sim)
+        filter_cache.invalidate()
+        calls = plan_calls(scenario, list(sim.symbols), orders)
+        with quiet():
+            tracemalloc.start()
+            try:
+                baseline, _ = tracemalloc.get_traced_memory()
+                for call, _ in calls:
+                    call()
+                current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        result["peak_kib"] = round((peak - baseline) / 1024, 1)
+        result["retained_bytes_per_order"] = round((current - baseline) / placed_total, 1)
+
+    set_binance_client(None)
+    return result
+
+
+def case_key(result: dict) -> tuple:
+    return result["scenario"], result["orders"], result["symbols"]
+
+
+def compare(results: list, baseline_path: str, threshold: float) -> list:
+    """
+    Compare local p50 overhead with a stored run.
+
+    Returns:
+        list[str]: Descriptions of cases that got slower than `threshold` times the baseline.
+    """
+    with open(baseline_path) as f:
+        baseline = {case_key(r): r for r in json.load(f)["results"]}
+
+    regressions = []
+    print(f"\nComparison with {baseline_path} (local p50, us/order):")
+    for result in results:
+        before = baseline.get(case_key(result))
+        if before is None or not before["local_us_p50"]:
+            continue
+        ratio = result["local_us_p50"] / before["local_us_p50"]
+        flag = "REGRESSION" if ratio > threshold else ""
+        print(f"  {result['scenario']:<11} orders={result['orders']:<6} symbols={result['symbols']:<4} "
+              f"{before['local_us_p50']:>9.1f} -> {result['local_us_p50']:>9.1f}  x{ratio:.2f} {flag}")
+        if flag:
+            regressions.append(f"{result['scenario']} orders={result['orders']} symbols={result['symbols']} x{ratio:.2f}")
+    return regressions
+
+
+def default_label() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return time.strftime("%Y%m%d-%H%M%S")
+
+
+def print_header() -> None:
+    header = f"{'scenario':<11} {'orders':>6} {'syms':>4} {'orders/s':>10} {'p50 us':>9} {'p99 us':>9} {'peak KiB':>9} {'calls/order':>11}"
+    print(header)
+    print("-" * len(header))
+
+
+def print_row(r: dict) -> None:
+    print(f"{r['scenario']:<11} {r['orders']:>6} {r['symbols']:>4} {r['orders_per_sec'] or 0:>10.0f} "
+          f"{r['local_us_p50']:>9.1f} {r['local_us_p99']:>9.1f} {r.get('peak_kib', 0):>9.1f} {r['calls_per_order']:>11.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-order overhead of the order entry points")
+    parser.add_argument("--scenarios", type=str, default="market,limit,oco,grid,grid_batch,twap")
+    parser.add_argument("--orders", type=str, default="1,10,100,1000,10000", help="Comma-separated order counts")
+    parser.add_argument("--symbols", type=str, default="1,10,100", help="Comma-separated symbol counts")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc allocation pass")
+    parser.add_argument("--label", type=str, default=None, help="Results file name (default: current git commit)")
+    parser.add_argument("--compare", type=str, default=None, help="Results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    order_counts = [int(n) for n in args.orders.split(",")]
+    symbol_counts = [int(n) for n in args.symbols.split(",")]
+
+    print_header()
+    results = []
+    for scenario in scenarios:
+        for orders in order_counts:
+            for symbol_count in symbol_counts:
+                if symbol_count > orders and symbol_count != min(symbol_counts):
+                    continue
+                results.append(run_case(scenario, orders, symbol_count, not args.no_memory))
+                print_row(results[-1])
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    label = args.label or default_label()
+    path = os.path.join(RESULTS_DIR, f"{label}.json")
+    with open(path, "w") as f:
+        json.dump({
+            "label": label,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {path}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above x{args.threshold}.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
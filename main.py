@@ -1,23 +1,45 @@
 import argparse
+from contextlib import nullcontext
 from src.market_orders import place_market_order
 from src.limit_orders import place_limit_order
-from src.oco_orders import place_oco_orders
+from src.oco_orders import place_oco_orders, watch_oco_pair
+from src.bulk_orders import DEFAULT_WORKERS, run_bulk_orders
+from src.utils.metrics import profile_run
 
 def main():
     parser = argparse.ArgumentParser(description="Binance Futures CLI Bot")
-    parser.add_argument("--type", required=True, choices=["market", "limit", "oco"], help="Type of order to place")
-    parser.add_argument("--symbol", required=True, help="Trading pair symbol (e.g., BTCUSDT)")
-    parser.add_argument("--side", required=True, choices=["BUY", "SELL"], help="Order side")
-    parser.add_argument("--quantity", required=True, type=float, help="Quantity to trade")
+    parser.add_argument("--type", choices=["market", "limit", "oco"], help="Type of order to place")
+    parser.add_argument("--symbol", help="Trading pair symbol (e.g., BTCUSDT)")
+    parser.add_argument("--side", choices=["BUY", "SELL"], help="Order side")
+    parser.add_argument("--quantity", type=float, help="Quantity to trade")
 
     # Optional for Limit and OCO
     parser.add_argument("--price", type=float, help="Limit order price")
     parser.add_argument("--tp", type=float, help="Take-Profit price for OCO")
     parser.add_argument("--stop", type=float, help="Stop trigger price for OCO")
     parser.add_argument("--sl", type=float, help="Stop-limit execution price for OCO")
+    parser.add_argument("--no_watch", action="store_true",
+                        help="For OCO, exit once the legs are placed; nothing cancels the sibling when one fills")
+
+    # Bulk mode: many orders from one file
+    parser.add_argument("--file", help="CSV or JSONL file of orders to place (symbol, side, quantity[, price, type])")
+    parser.add_argument("--results", help="Results file for --file (.csv or .jsonl)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent submissions for --file")
+    parser.add_argument("--profile", metavar="PATH", help="Write a cProfile trace of the run to PATH (e.g. run.prof)")
 
     args = parser.parse_args()
 
+    with profile_run(args.profile) if args.profile else nullcontext():
+        run(parser, args)
+
+def run(parser, args):
+    if args.file:
+        summary = run_bulk_orders(args.file, args.results, args.workers)
+        print(f"✅ Bulk run finished: {summary}")
+        return
+    if not all([args.type, args.symbol, args.side, args.quantity]):
+        parser.error("--type, --symbol, --side and --quantity are required unless --file is given")
+
     symbol = args.symbol.upper()
     side = args.side.upper()
 
@@ -34,7 +56,9 @@ def main():
         if not all([args.tp, args.stop, args.sl]):
             print("❌ For OCO, you must provide --tp (take-profit), --stop (trigger), and --sl (stop-limit).")
             return
-        place_oco_orders(symbol, side, args.quantity, args.tp, args.stop, args.sl)
+        pair = place_oco_orders(symbol, side, args.quantity, args.tp, args.stop, args.sl)
+        if pair is not None:
+            watch_oco_pair(pair, args.no_watch)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,411 @@
+# src/advanced/backtest.py
+
+import argparse
+import csv
+import itertools
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+import numpy as np
+from src.utils.logger import setup_logger
+from src.utils.filters import SymbolFilters, filter_cache
+from src.utils.validation import check_order_params, normalize_quantity
+from src.advanced.grid import build_grid_ladder
+
+logger = setup_logger()
+
+# Price history as parallel arrays: open time (ms) and OHLCV per bar. Trades load as one bar per trade.
+Bars = namedtuple("Bars", ["time", "open", "high", "low", "close", "volume"])
+
+MAKER_FEE = 0.0002
+TAKER_FEE = 0.0004
+
+# Column names accepted in files with a header row.
+_COLUMN_ALIASES = {
+    "time": ("open_time", "time", "timestamp", "transact_time", "T"),
+    "open": ("open", "o"),
+    "high": ("high", "h"),
+    "low": ("low", "l"),
+    "close": ("close", "c"),
+    "price": ("price", "p"),
+    "volume": ("volume", "qty", "quantity", "v", "q"),
+}
+
+# Column positions in headerless Binance data dumps (klines and trades).
+_KLINE_COLUMNS = {"time": 0, "open": 1, "high": 2, "low": 3, "close": 4, "volume": 5}
+_TRADE_COLUMNS = {"price": 1, "volume": 2, "time": 4}
+
+
+def _bars_from_columns(columns: dict) -> Bars:
+    times = np.asarray(columns["time"], dtype=np.int64)
+    volume = np.asarray(columns.get("volume", np.zeros(len(times))), dtype=np.float64)
+    if "close" in columns:
+        return Bars(times, *(np.asarray(columns[k], dtype=np.float64) for k in ("open", "high", "low", "close")), volume)
+    price = np.asarray(columns["price"], dtype=np.float64)
+    return Bars(times, price, price, price, price, volume)
+
+
+def _resolve_header(header: list) -> dict:
+    positions = {}
+    lowered = [h.strip() for h in header]
+    for field, aliases in _COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in lowered:
+                positions[field] = lowered.index(alias)
+                break
+    if "time" not in positions or not ("close" in positions or "price" in positions):
+        raise ValueError(f"Unrecognised columns {header}: expected open_time/open/high/low/close or time/price.")
+    if "close" in positions:
+        positions.pop("price", None)
+    return positions
+
+
+def load_bars(path: str) -> Bars:
+    """
+    Load klines or trades from a CSV or Parquet file.
+
+    CSV files may have a header (open_time/open/high/low/close/volume for klines,
+    time/price/qty for trades) or be headerless Binance data dumps, where klines
+    have 12 columns and trades 6-7.
+
+    Raises:
+        ValueError: If the file format or columns are not recognised, or Parquet
+            support (pyarrow) is not installed.
+    """
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Reading Parquet files requires pyarrow (pip install pyarrow).")
+        table = pq.read_table(path)
+        positions = _resolve_header(table.column_names)
+        columns = {field: table.column(index).to_numpy() for field, index in positions.items()}
+        bars = _bars_from_columns(columns)
+    else:
+        with open(path, newline="") as f:
+            first = next(csv.reader(f), None)
+        if not first:
+            raise ValueError(f"No data in {path}.")
+        try:
+            float(first[0])
+            header_rows = 0
+            positions = _KLINE_COLUMNS if len(first) >= 12 else _TRADE_COLUMNS
+        except ValueError:
+            header_rows = 1
+            positions = _resolve_header(first)
+        fields = list(positions)
+        data = np.loadtxt(path, delimiter=",", skiprows=header_rows, usecols=[positions[f] for f in fields],
+                          dtype=np.float64, ndmin=2)
+        bars = _bars_from_columns({field: data[:, i] for i, field in enumerate(fields)})
+
+    if len(bars.time) == 0:
+        raise ValueError(f"No data in {path}.")
+    order = np.argsort(bars.time, kind="stable")
+    if np.any(order != np.arange(len(order))):
+        bars = Bars(*(column[order] for column in bars))
+    return bars
+
+
+def offline_filters(symbol: str, tick_size: str, step_size: str, min_qty: str = None, min_notional: str = "0") -> SymbolFilters:
+    """Build SymbolFilters without exchange access, e.g. for symbols missing from the filter snapshot."""
+    return SymbolFilters(
+        symbol=symbol,
+        min_qty=Decimal(min_qty or step_size),
+        max_qty=Decimal("1000000000"),
+        step_size=Decimal(step_size),
+        min_price=Decimal(tick_size),
+        max_price=Decimal("1000000000"),
+        tick_size=Decimal(tick_size),
+        min_notional=Decimal(min_notional),
+    )
+
+
+def _summarize(bars: Bars, fill_bar, signed_qty, fill_price, fees, keep_equity: bool) -> dict:
+    """Aggregate fills into position, cash, fees and a mark-to-market equity curve."""
+    n = len(bars.close)
+    position = np.bincount(fill_bar, weights=signed_qty, minlength=n).cumsum()
+    cash = np.bincount(fill_bar, weights=-signed_qty * fill_price - fees, minlength=n).cumsum()
+    equity = cash + position * bars.close
+    drawdown = np.maximum.accumulate(np.maximum(equity, 0.0)) - equity
+    result = {
+        "fills": int(len(fill_bar)),
+        "volume": float(np.abs(signed_qty * fill_price).sum()),
+        "fees": float(fees.sum()),
+        "position": float(position[-1]),
+        "avg_price": float((np.abs(signed_qty) * fill_price).sum() / np.abs(signed_qty).sum()) if len(fill_bar) else None,
+        "pnl": float(equity[-1]),
+        "max_drawdown": float(drawdown.max()),
+    }
+    if keep_equity:
+        result["equity"] = equity
+    return result
+
+
+def _first_touch(running, levels, falling: bool):
+    """Return the first bar index at which a running min (falling) or max reaches each level (len if never)."""
+    if falling:
+        return np.searchsorted(-running, -levels, side="left")
+    return np.searchsorted(running, levels, side="left")
+
+
+def backtest_grid(bars: Bars, filters, side: str, total_quantity: float, lower_price: float, upper_price: float,
+                  grid_count: int, recycle: bool = False, maker_fee: float = MAKER_FEE, taker_fee: float = TAKER_FEE,
+                  keep_equity: bool = False) -> dict:
+    """
+    Replay a grid through price history.
+
+    Levels and the per-level quantity come from build_grid_ladder, exactly as for a live grid.
+    Levels on the wrong side of the first bar's open are marketable and fill at that open
+    (taker); the rest rest as maker orders and fill when a bar's low (BUY) or high (SELL)
+    reaches them.
+
+    Args:
+        recycle (bool): False replays place_grid_orders (each level fills once). True treats
+            every pair of adjacent levels as a cell that buys at the lower and sells at the
+            upper level repeatedly; when one bar touches both levels, the bar direction
+            decides which came first.
+
+    Returns:
+        dict: fills, volume, fees, position, avg_price, pnl (mark-to-market at the last close)
+            and max_drawdown; plus "equity" per bar if keep_equity is True.
+    """
+    prices, slice_qty = build_grid_ladder(filters, total_quantity, lower_price, upper_price, grid_count)
+    levels = np.asarray(prices, dtype=np.float64)
+    start = bars.open[0]
+    buy = side == "BUY"
+
+    if not recycle:
+        marketable = levels >= start if buy else levels <= start
+        running = np.minimum.accumulate(bars.low) if buy else np.maximum.accumulate(bars.high)
+        touched = _first_touch(running, levels, falling=buy)
+        touched[marketable] = 0
+        filled = touched < len(bars.close)
+        fill_bar = touched[filled]
+        fill_price = np.where(marketable, start, levels)[filled]
+        rates = np.where(marketable, taker_fee, maker_fee)[filled]
+        signed_qty = np.full(len(fill_bar), slice_qty if buy else -slice_qty)
+        fees = np.abs(signed_qty) * fill_price * rates
+        return _summarize(bars, fill_bar, signed_qty, fill_price, fees, keep_equity)
+
+    # Map each bar to the grid: the buy at level j is touched when j >= lo[t], the sell at level j+1
+    # when j + 1 < hi[t]. Consecutive bars with the same (lo, hi) that do not span a whole cell
+    # cannot change any cell's state, so only the first of each such run is kept.
+    lo = np.searchsorted(levels, bars.low, side="left")
+    hi = np.searchsorted(levels, bars.high, side="right")
+    keep = np.r_[True, (lo[1:] != lo[:-1]) | (hi[1:] != hi[:-1])] | (hi - lo >= 2)
+    kept = np.flatnonzero(keep)
+    lo, hi, bullish = lo[kept], hi[kept], (bars.close >= bars.open)[kept]
+    # Each bar is two steps: bullish bars visit the low then the high, bearish bars the high then the low.
+    bar_index = np.repeat(kept, 2)
+    parts = []
+    for j, (low_level, high_level) in enumerate(zip(levels[:-1], levels[1:])):
+        buy_touch = (lo <= j).astype(np.int8)
+        sell_touch = (hi >= j + 2).astype(np.int8)
+        events = np.empty(2 * len(kept), dtype=np.int8)
+        events[0::2] = np.where(bullish, buy_touch, -sell_touch)
+        events[1::2] = np.where(bullish, -sell_touch, buy_touch)
+        steps = np.flatnonzero(events)
+        if buy:
+            opened_at_start = low_level >= start
+            expected = -1 if opened_at_start else 1
+        else:
+            opened_at_start = high_level <= start
+            expected = 1 if opened_at_start else -1
+
+        kinds = events[steps]
+        runs = np.flatnonzero(np.r_[True, kinds[1:] != kinds[:-1]]) if len(steps) else np.empty(0, dtype=np.int64)
+        if len(runs) and kinds[runs[0]] != expected:
+            runs = runs[1:]
+        cell_bar = bar_index[steps[runs]]
+        cell_kind = kinds[runs].astype(np.float64)
+        cell_price = np.where(cell_kind > 0, low_level, high_level)
+        cell_rate = np.full(len(runs), maker_fee)
+        if opened_at_start:
+            cell_bar = np.r_[0, cell_bar]
+            cell_kind = np.r_[1.0 if buy else -1.0, cell_kind]
+            cell_price = np.r_[start, cell_price]
+            cell_rate = np.r_[taker_fee, cell_rate]
+        parts.append((cell_bar, cell_kind * slice_qty, cell_price, cell_rate))
+
+    fill_bar = np.concatenate([p[0] for p in parts]).astype(np.int64)
+    signed_qty = np.concatenate([p[1] for p in parts])
+    fill_price = np.concatenate([p[2] for p in parts])
+    fees = np.abs(signed_qty) * fill_price * np.concatenate([p[3] for p in parts])
+    return _summarize(bars, fill_bar, signed_qty, fill_price, fees, keep_equity)
+
+
+def backtest_twap(bars: Bars, filters, side: str, total_quantity: float, num_slices: int, interval: float,
+                  order_type: str = "MARKET", start_time: int = None, maker_fee: float = MAKER_FEE,
+                  taker_fee: float = TAKER_FEE, keep_equity: bool = False) -> dict:
+    """
+    Replay a TWAP through price history.
+
+    The slice quantity is normalized and checked the same way as place_twap_orders. Slice i
+    is sent at start_time + i * interval seconds and fills at the open of the first bar at or
+    after that time; MARKET slices pay the taker fee, LIMIT slices the maker fee. Slices past
+    the end of the data are not filled.
+
+    Returns:
+        dict: The backtest_grid metrics plus slippage_bps of the average fill against the
+            arrival price (first slice's open) and against the time-weighted average close
+            over the execution window.
+    """
+    slice_qty = normalize_quantity(filters, total_quantity / num_slices)
+    check_order_params(filters, slice_qty)
+
+    start_time = bars.time[0] if start_time is None else start_time
+    send_times = start_time + (np.arange(num_slices) * interval * 1000).astype(np.int64)
+    fill_bar = np.searchsorted(bars.time, send_times, side="left")
+    fill_bar = fill_bar[fill_bar < len(bars.time)]
+    fill_price = bars.open[fill_bar]
+    signed_qty = np.full(len(fill_bar), slice_qty if side == "BUY" else -slice_qty)
+    fees = np.abs(signed_qty) * fill_price * (maker_fee if order_type == "LIMIT" else taker_fee)
+    result = _summarize(bars, fill_bar, signed_qty, fill_price, fees, keep_equity)
+
+    if len(fill_bar):
+        direction = 1 if side == "BUY" else -1
+        window_twap = bars.close[fill_bar[0]:fill_bar[-1] + 1].mean()
+        result["slippage_bps"] = float(direction * (result["avg_price"] / fill_price[0] - 1) * 1e4)
+        result["vs_twap_bps"] = float(direction * (result["avg_price"] / window_twap - 1) * 1e4)
+    return result
+
+
+STRATEGIES = {"grid": backtest_grid, "twap": backtest_twap}
+
+# Data shared with sweep worker processes (set once per worker by the pool initializer).
+_worker_data = {}
+
+
+def _init_worker(bars: Bars, filters) -> None:
+    _worker_data["bars"] = bars
+    _worker_data["filters"] = filters
+
+
+def _run_one(strategy: str, params: dict) -> dict:
+    try:
+        result = STRATEGIES[strategy](_worker_data["bars"], _worker_data["filters"], **params)
+    except ValueError as e:
+        result = {"error": str(e)}
+    return {"params": params, **result}
+
+
+def sweep(bars: Bars, filters, strategy: str, base_params: dict, grid: dict, workers: int = None) -> list:
+    """
+    Run a strategy over every combination of the parameter values in `grid`.
+
+    Combinations run in a process pool; the price arrays are sent to each worker once.
+
+    Args:
+        base_params (dict): Parameters shared by every run.
+        grid (dict): Parameter name -> list of values to try (e.g. {"grid_count": [10, 20, 40]}).
+        workers (int): Worker processes. Defaults to the CPU count.
+
+    Returns:
+        list[dict]: One result per combination (with its "params", or an "error"), best PnL first.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Expected one of: {', '.join(STRATEGIES)}.")
+    names = list(grid)
+    combos = [{**base_params, **dict(zip(names, values))} for values in itertools.product(*(grid[n] for n in names))]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(bars, filters)) as pool:
+        results = list(pool.map(_run_one, [strategy] * len(combos), combos, chunksize=max(1, len(combos) // 64)))
+    return sorted(results, key=lambda r: r.get("pnl", float("-inf")), reverse=True)
+
+
+def _parse_sweep(specs: list) -> dict:
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if not values:
+            raise ValueError(f"Invalid --sweep '{spec}'. Use name=v1,v2,...")
+        grid[name.strip()] = [_parse_value(v) for v in values.split(",")]
+    return grid
+
+
+def _parse_value(text: str):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _format_result(result: dict) -> str:
+    if "error" in result:
+        return f"error: {result['error']}"
+    text = (f"fills={result['fills']} volume={result['volume']:.2f} fees={result['fees']:.4f} "
+            f"position={result['position']:g} pnl={result['pnl']:.4f} max_dd={result['max_drawdown']:.4f}")
+    if "slippage_bps" in result:
+        text += f" slippage={result['slippage_bps']:.2f}bps vs_twap={result['vs_twap_bps']:.2f}bps"
+    return text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest grid and TWAP strategies on historical klines or trades")
+    parser.add_argument("--data", type=str, required=True, help="CSV or Parquet file of klines or trades")
+    parser.add_argument("--strategy", type=str, choices=list(STRATEGIES), required=True)
+    parser.add_argument("--symbol", type=str, default="BTCUSDT", help="Symbol whose cached filters are used")
+    parser.add_argument("--tick_size", type=str, help="Tick size (with --step_size, skips the filter cache)")
+    parser.add_argument("--step_size", type=str, help="Step size (with --tick_size, skips the filter cache)")
+    parser.add_argument("--side", type=str, choices=["BUY", "SELL"], required=True)
+    parser.add_argument("--total_quantity", type=float, required=True)
+    parser.add_argument("--lower_price", type=float)
+    parser.add_argument("--upper_price", type=float)
+    parser.add_argument("--grid_count", type=int)
+    parser.add_argument("--recycle", action="store_true", help="Grid: re-place the opposite order after each fill")
+    parser.add_argument("--num_slices", type=int)
+    parser.add_argument("--interval", type=float, help="TWAP: seconds between slices")
+    parser.add_argument("--type", type=str, choices=["MARKET", "LIMIT"], default="MARKET")
+    parser.add_argument("--sweep", type=str, action="append", default=[],
+                        help="Parameter values to sweep, e.g. grid_count=10,20,40 (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="Sweep worker processes (default: CPU count)")
+    parser.add_argument("--top", type=int, default=10, help="Sweep results to print")
+    args = parser.parse_args()
+
+    try:
+        symbol = args.symbol.upper()
+        if args.tick_size and args.step_size:
+            filters = offline_filters(symbol, args.tick_size, args.step_size)
+        else:
+            filters = filter_cache.lookup(symbol)
+            if filters is None:
+                from src.utils.api import get_binance_client
+                filters = filter_cache.get(get_binance_client(), symbol)
+
+        started = time.perf_counter()
+        bars = load_bars(args.data)
+        logger.info("Loaded %s bars from %s in %.2fs", len(bars.time), args.data, time.perf_counter() - started)
+
+        if args.strategy == "grid":
+            params = {"side": args.side, "total_quantity": args.total_quantity, "lower_price": args.lower_price,
+                      "upper_price": args.upper_price, "grid_count": args.grid_count, "recycle": args.recycle}
+        else:
+            params = {"side": args.side, "total_quantity": args.total_quantity, "num_slices": args.num_slices,
+                      "interval": args.interval, "order_type": args.type}
+
+        grid = _parse_sweep(args.sweep)
+        params = {name: value for name, value in params.items() if name not in grid}
+        missing = [name for name, value in params.items() if value is None]
+        if missing:
+            raise ValueError(f"Missing parameters for {args.strategy} backtest: {', '.join('--' + m for m in missing)}")
+
+        started = time.perf_counter()
+        if grid:
+            results = sweep(bars, filters, args.strategy, params, grid, args.workers)
+            print(f"✅ Sweep of {len(results)} runs over {len(bars.time)} bars in {time.perf_counter() - started:.2f}s")
+            for result in results[:args.top]:
+                swept = {name: result["params"][name] for name in grid}
+                print(f"  {swept}: {_format_result(result)}")
+        else:
+            result = STRATEGIES[args.strategy](bars, filters, **params)
+            print(f"✅ Backtest over {len(bars.time)} bars in {time.perf_counter() - started:.2f}s: {_format_result(result)}")
+
+    except ValueError as ve:
+        logger.error("Validation Error: %s", ve)
+        print(f"Error: {ve}")
+    except OSError as e:
+        logger.error("Could not read backtest data: %s", e)
+        print(f"Error: {e}")
@@ -1,17 +1,66 @@
 # src/advanced/grid.py
 
 import argparse
+import time
+from contextlib import nullcontext
 from decimal import Decimal
 from binance.exceptions import BinanceAPIException
 from src.utils.api import get_binance_client
-from src.utils.logger import setup_logger
-from src.utils.account import has_sufficient_balance
-from src.utils.validation import validate_order_params
+from src.utils.logger import elapsed_ms, log_order_placed, log_order_rejected, setup_logger
+from src.utils.account import has_sufficient_margin, reserve_margin
+from src.utils.filters import filter_cache
+from src.utils.journal import LOST, get_order_journal
+from src.utils.submission import NETWORK_ERRORS, UNCERTAIN_CODES, classify_error, lookup_order, send_order
+from src.utils.ledger import get_margin_ledger
+from src.utils.metrics import profile_run
+from src.utils.validation import normalize_prices, normalize_quantity, validate_orders_batch
 
 logger = setup_logger()
-client = get_binance_client()
 
-def place_grid_orders(symbol: str, side: str, total_quantity: float, lower_price: float, upper_price: float, grid_count: int):
+# Binance accepts at most 5 orders per batchOrders request.
+BATCH_ORDER_LIMIT = 5
+
+def build_grid_ladder(filters, total_quantity: float, lower_price: float, upper_price: float, grid_count: int):
+    """
+    Build and pre-validate a grid ladder snapped to the symbol's tick and step sizes.
+
+    Returns:
+        tuple[list[float], float]: Level prices (ascending) and the per-level quantity.
+    """
+    if grid_count < 2:
+        raise ValueError("Grid count must be at least 2")
+
+    step = (upper_price - lower_price) / (grid_count - 1)
+    prices = normalize_prices(filters, [lower_price + (i * step) for i in range(grid_count)])
+    slice_quantity = normalize_quantity(filters, total_quantity / grid_count)
+
+    for verdict in validate_orders_batch(filters, prices, [slice_quantity] * grid_count, normalize=False):
+        if not verdict.valid:
+            raise ValueError(f"Grid order {verdict.index+1}: {verdict.error}")
+
+    return prices, slice_quantity
+
+def _open_grid_job(client, symbol: str, side: str, total_quantity: float, lower_price: float, upper_price: float,
+                   grid_count: int, job_id: str = None):
+    """
+    Register a new grid job in the order journal, or settle the journal of the job being resumed.
+
+    Returns:
+        tuple[str, set[int]]: The job id and the levels that are already placed.
+    """
+    journal = get_order_journal()
+    if job_id is None:
+        params = {"total_quantity": total_quantity, "lower_price": lower_price, "upper_price": upper_price,
+                  "grid_count": grid_count}
+        return journal.start_job("grid", symbol, side, params), set()
+
+    done = journal.resolve_job(client, job_id)
+    logger.info("Resuming grid job %s: %s/%s levels already placed", job_id, len(done), grid_count)
+    print(f"↪️ Resuming grid job {job_id}: {len(done)}/{grid_count} levels already placed.")
+    return job_id, done
+
+def place_grid_orders(symbol: str, side: str, total_quantity: float, lower_price: float, upper_price: float, grid_count: int,
+                      job_id: str = None):
     """
     Places a grid of LIMIT orders equally spaced between lower_price and upper_price.
 
@@ -22,65 +71,277 @@ def place_grid_orders(symbol: str, side: str, total_quantity: float, lower_price
         lower_price (float): Lower bound of grid
         upper_price (float): Upper bound of grid
         grid_count (int): Number of grid orders
+        job_id (str): Journal id of an interrupted grid to resume; levels already placed are skipped
     """
     try:
-        if grid_count < 2:
-            raise ValueError("Grid count must be at least 2")
-
+        client = get_binance_client()
+        filters = filter_cache.get(client, symbol)
+        prices, slice_quantity = build_grid_ladder(filters, total_quantity, lower_price, upper_price, grid_count)
         step = (upper_price - lower_price) / (grid_count - 1)
-        slice_quantity = round(total_quantity / grid_count, 6)
+        journal = get_order_journal()
+        job_id, done = _open_grid_job(client, symbol, side, total_quantity, lower_price, upper_price, grid_count, job_id)
 
-        logger.info(f"Placing {grid_count} grid orders from {lower_price} to {upper_price} with step {step:.2f}")
+        logger.info("Placing %s grid orders from %s to %s with step %.2f (job %s)",
+                    grid_count, lower_price, upper_price, step, job_id)
 
-        for i in range(grid_count):
-            price = round(lower_price + (i * step), 2)
+        for i, price in enumerate(prices):
+            if i + 1 in done:
+                continue
+            error_message = f"Insufficient balance for grid order {i+1} at price {price}"
+            client_order_id = journal.client_order_id(job_id, i + 1)
+            with reserve_margin(client, symbol, slice_quantity * price, error_message) as reservation, \
+                    journal.track(client_order_id, symbol, side, "LIMIT", slice_quantity, price, job_id, "grid", i + 1) as entry:
+                started = time.perf_counter()
+                order = send_order(
+                    client,
+                    symbol=symbol,
+                    side=side,
+                    type="LIMIT",
+                    quantity=slice_quantity,
+                    price=str(price),
+                    timeInForce="GTC",
+                    newClientOrderId=client_order_id
+                )
+                entry.record(order)
+                reservation.confirm(order['orderId'])
+            log_order_placed(order, elapsed_ms(started), strategy="grid", level=i + 1)
 
-            validate_order_params(client, symbol, slice_quantity, price)
+            logger.info("Grid Order %s: ID %s, Price: %s, Qty: %s, Status: %s",
+                        i+1, order['orderId'], price, slice_quantity, order['status'])
+            print(f"✅ Grid Order {i+1}/{grid_count}: Price: {price}, Order ID: {order['orderId']}, Status: {order['status']}")
 
-            if not has_sufficient_balance(client, symbol, side, slice_quantity, price):
-                raise ValueError(f"Insufficient balance for grid order {i+1} at price {price}")
+        journal.finish_job(job_id)
+        print("✅ Grid Execution Completed.")
 
-            order = client.futures_create_order(
-                symbol=symbol,
-                side=side,
-                type="LIMIT",
-                quantity=slice_quantity,
-                price=str(price),
-                timeInForce="GTC"
-            )
+    except ValueError as ve:
+        logger.error("Validation Error: %s", ve)
+        print(f"Error: {ve}")
+    except BinanceAPIException as api_exc:
+        filter_cache.handle_api_error(api_exc)
+        log_order_rejected(symbol, api_exc.code, api_exc.message, side=side, strategy="grid")
+        logger.error("Binance API Error: %s (Code: %s)", api_exc.message, api_exc.code)
+        print(f"Binance API Error: {api_exc.message} (Code: {api_exc.code})")
+    except Exception as e:
+        logger.critical("Unexpected error in Grid: %s", e, exc_info=True)
+        print(f"Unexpected error: {e}")
 
-            logger.info(f"Grid Order {i+1}: ID {order['orderId']}, Price: {price}, Qty: {slice_quantity}, Status: {order['status']}")
-            print(f"✅ Grid Order {i+1}/{grid_count}: Price: {price}, Order ID: {order['orderId']}, Status: {order['status']}")
 
-        print("✅ Grid Execution Completed.")
+def place_grid_orders_batched(symbol: str, side: str, total_quantity: float, lower_price: float, upper_price: float,
+                              grid_count: int, rollback_on_failure: bool = False, job_id: str = None):
+    """
+    Places a grid of LIMIT orders through the futures batchOrders endpoint.
+
+    The whole ladder is validated and margin-checked up front, then submitted in
+    chunks of BATCH_ORDER_LIMIT orders. Results are mapped back to grid levels.
+
+    Args:
+        symbol (str): Trading pair symbol (e.g., BTCUSDT)
+        side (str): 'BUY' or 'SELL'
+        total_quantity (float): Total quantity to be split across grid orders
+        lower_price (float): Lower bound of grid
+        upper_price (float): Upper bound of grid
+        grid_count (int): Number of grid orders
+        rollback_on_failure (bool): Cancel every placed level if any level fails
+        job_id (str): Journal id of an interrupted grid to resume; levels already placed are skipped
+
+    Returns:
+        list[dict]: One result per level sent with keys level, price, order and error.
+    """
+    results = []
+    try:
+        client = get_binance_client()
+        filters = filter_cache.get(client, symbol)
+        prices, slice_quantity = build_grid_ladder(filters, total_quantity, lower_price, upper_price, grid_count)
+
+        journal = get_order_journal()
+        job_id, done = _open_grid_job(client, symbol, side, total_quantity, lower_price, upper_price, grid_count, job_id)
+        pending = [(level, price) for level, price in enumerate(prices, 1) if level not in done]
+
+        required = sum(price * slice_quantity for _, price in pending)
+        if not has_sufficient_margin(client, symbol, required):
+            raise ValueError(f"Insufficient balance for grid: {required:.2f} USDT required")
+        ledger = get_margin_ledger(client)
+
+        logger.info("Placing %s grid orders from %s to %s in batches of %s (job %s)",
+                    len(pending), lower_price, upper_price, BATCH_ORDER_LIMIT, job_id)
+
+        for start in range(0, len(pending), BATCH_ORDER_LIMIT):
+            chunk = []
+            batch = []
+            reservations = []
+            for level, price in pending[start:start + BATCH_ORDER_LIMIT]:
+                # Other orders may have taken margin since the aggregate check, so every level reserves its own
+                reservation = ledger.reserve(price * slice_quantity)
+                if reservation is None:
+                    error = f"Insufficient balance for grid order {level} at price {price}"
+                    results.append({"level": level, "price": price, "order": None, "error": error})
+                    logger.error("Grid Order %s failed at price %s: %s", level, price, error)
+                    print(f"❌ Grid Order {level}/{grid_count}: Price: {price}, Error: {error}")
+                    continue
+                chunk.append((level, price))
+                reservations.append(reservation)
+                client_order_id = journal.client_order_id(job_id, level)
+                journal.record_submit(client_order_id, symbol, side, "LIMIT", slice_quantity, price, job_id, "grid", level)
+                batch.append({
+                    "symbol": symbol,
+                    "side": side,
+                    "type": "LIMIT",
+                    "quantity": str(slice_quantity),
+                    "price": str(price),
+                    "timeInForce": "GTC",
+                    "newClientOrderId": client_order_id,
+                })
+            if not batch:
+                continue
+            started = time.perf_counter()
+            uncertain = False
+            try:
+                responses = client.futures_place_batch_order(batchOrders=batch)
+            except (BinanceAPIException,) + NETWORK_ERRORS as e:
+                # Only this chunk failed; earlier chunks keep their results and later chunks are still sent
+                if isinstance(e, BinanceAPIException):
+                    filter_cache.handle_api_error(e)
+                    responses = [{"code": e.code, "msg": e.message}] * len(chunk)
+                else:
+                    responses = [{"code": None, "msg": str(e)}] * len(chunk)
+                uncertain = classify_error(e) == "uncertain"
+            latency = elapsed_ms(started)
+
+            for offset, ((level, price), response) in enumerate(zip(chunk, responses)):
+                client_order_id = batch[offset]["newClientOrderId"]
+                unresolved = lost = False
+                if "orderId" not in response and (uncertain or response.get("code") in UNCERTAIN_CODES):
+                    # The order may exist (timeout, 5xx, -1007): look it up instead of marking it REJECTED
+                    try:
+                        order = lookup_order(client, symbol, client_order_id)
+                    except (BinanceAPIException,) + NETWORK_ERRORS as e:
+                        logger.warning("Lookup of grid order %s failed: %s", client_order_id, e)
+                        order, unresolved = None, True
+                    if order is not None:
+                        response = order
+                    elif not unresolved:
+                        journal.set_status(client_order_id, LOST)
+                        lost = True
+                if "orderId" in response:
+                    journal.record_response(client_order_id, response)
+                    ledger.confirm(reservations[offset], response['orderId'])
+                    log_order_placed(response, latency, strategy="grid", level=level)
+                    results.append({"level": level, "price": price, "order": response, "error": None})
+                    logger.info("Grid Order %s: ID %s, Price: %s, Qty: %s, Status: %s",
+                                level, response['orderId'], price, slice_quantity, response['status'])
+                    print(f"✅ Grid Order {level}/{grid_count}: Price: {price}, Order ID: {response['orderId']}, Status: {response['status']}")
+                else:
+                    error = f"{response.get('msg')} (Code: {response.get('code')})"
+                    if unresolved:
+                        # Left PENDING in the journal; --resume settles it through resolve_job()
+                        error = f"Outcome unknown: {error}"
+                    elif not lost:
+                        journal.record_error(client_order_id, error)
+                    ledger.release(reservations[offset])
+                    log_order_rejected(symbol, response.get('code'), response.get('msg'), latency,
+                                       side=side, price=price, strategy="grid", level=level)
+                    results.append({"level": level, "price": price, "order": None, "error": error})
+                    logger.error("Grid Order %s failed at price %s: %s", level, price, error)
+                    print(f"❌ Grid Order {level}/{grid_count}: Price: {price}, Error: {error}")
+
+        failed = [r for r in results if r["error"]]
+        if failed and rollback_on_failure:
+            _cancel_grid_levels(client, symbol, results)
+            journal.finish_job(job_id, "rolled_back")
+        elif failed:
+            print(f"⚠️ Grid Execution Completed with {len(failed)}/{grid_count} failed levels (resume with --resume {job_id}).")
+        else:
+            journal.finish_job(job_id)
+            print("✅ Grid Execution Completed.")
 
     except ValueError as ve:
-        logger.error(f"Validation Error: {ve}")
+        logger.error("Validation Error: %s", ve)
         print(f"Error: {ve}")
     except BinanceAPIException as api_exc:
-        logger.error(f"Binance API Error: {api_exc.message} (Code: {api_exc.code})")
+        filter_cache.handle_api_error(api_exc)
+        logger.error("Binance API Error: %s (Code: %s)", api_exc.message, api_exc.code)
         print(f"Binance API Error: {api_exc.message} (Code: {api_exc.code})")
     except Exception as e:
-        logger.critical(f"Unexpected error in Grid: {e}", exc_info=True)
+        logger.critical("Unexpected error in Grid: %s", e, exc_info=True)
         print(f"Unexpected error: {e}")
 
+    return results
+
+def _cancel_grid_levels(client, symbol: str, results: list) -> None:
+    """Cancel every successfully placed level after a partial failure."""
+    cancelled = 0
+    for r in results:
+        if not r["order"]:
+            continue
+        try:
+            client.futures_cancel_order(symbol=symbol, orderId=r["order"]["orderId"])
+            get_margin_ledger(client).release_order(r["order"]["orderId"])
+            if r["order"].get("clientOrderId"):
+                get_order_journal().set_status(r["order"]["clientOrderId"], "CANCELED")
+            r["error"] = r["error"] or "rolled back"
+            cancelled += 1
+        except BinanceAPIException as api_exc:
+            logger.error("Failed to roll back grid order %s: %s (Code: %s)",
+                         r['order']['orderId'], api_exc.message, api_exc.code)
+    logger.info("Rolled back %s grid orders for %s", cancelled, symbol)
+    print(f"↩️ Grid rolled back: cancelled {cancelled} placed orders.")
+
+
+def resume_grid(job_id: str, batch: bool = False, rollback_on_failure: bool = False):
+    """
+    Resume an interrupted grid job from the order journal.
+
+    Orders whose outcome was unknown are looked up by client order id first; only levels
+    that never reached the exchange (or were rejected) are sent again, with the same ids.
+    """
+    job = get_order_journal().get_job(job_id)
+    if job is None or job["strategy"] != "grid":
+        print(f"Error: No grid job '{job_id}' in the order journal.")
+        return None
+    params = job["params"]
+    if batch:
+        return place_grid_orders_batched(job["symbol"], job["side"], rollback_on_failure=rollback_on_failure,
+                                         job_id=job_id, **params)
+    return place_grid_orders(job["symbol"], job["side"], job_id=job_id, **params)
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Grid Trading Bot")
-    parser.add_argument("--symbol", type=str, required=True)
-    parser.add_argument("--side", type=str, choices=["BUY", "SELL"], required=True)
-    parser.add_argument("--total_quantity", type=float, required=True)
-    parser.add_argument("--lower_price", type=float, required=True)
-    parser.add_argument("--upper_price", type=float, required=True)
-    parser.add_argument("--grid_count", type=int, required=True)
+    parser.add_argument("--symbol", type=str)
+    parser.add_argument("--side", type=str, choices=["BUY", "SELL"])
+    parser.add_argument("--total_quantity", type=float)
+    parser.add_argument("--lower_price", type=float)
+    parser.add_argument("--upper_price", type=float)
+    parser.add_argument("--grid_count", type=int)
+    parser.add_argument("--batch", action="store_true", help="Submit levels through the batchOrders endpoint")
+    parser.add_argument("--rollback", action="store_true", help="With --batch, cancel all levels if any level fails")
+    parser.add_argument("--resume", type=str, metavar="JOB_ID", help="Resume an interrupted grid job from the order journal")
+    parser.add_argument("--profile", type=str, metavar="PATH", help="Write a cProfile trace of the run to PATH")
 
     args = parser.parse_args()
+    if not args.resume and None in (args.symbol, args.side, args.total_quantity, args.lower_price,
+                                    args.upper_price, args.grid_count):
+        parser.error("--symbol, --side, --total_quantity, --lower_price, --upper_price and --grid_count are required")
 
-    place_grid_orders(
-        symbol=args.symbol.upper(),
-        side=args.side.upper(),
-        total_quantity=args.total_quantity,
-        lower_price=args.lower_price,
-        upper_price=args.upper_price,
-        grid_count=args.grid_count
-    )
+    with profile_run(args.profile) if args.profile else nullcontext():
+        if args.resume:
+            resume_grid(args.resume, batch=args.batch, rollback_on_failure=args.rollback)
+        elif args.batch:
+            place_grid_orders_batched(
+                symbol=args.symbol.upper(),
+                side=args.side.upper(),
+                total_quantity=args.total_quantity,
+                lower_price=args.lower_price,
+                upper_price=args.upper_price,
+                grid_count=args.grid_count,
+                rollback_on_failure=args.rollback
+            )
+        else:
+            place_grid_orders(
+                symbol=args.symbol.upper(),
+                side=args.side.upper(),
+                total_quantity=args.total_quantity,
+                lower_price=args.lower_price,
+                upper_price=args.upper_price,
+                grid_count=args.grid_count
+            )
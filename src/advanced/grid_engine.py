@@ -0,0 +1,370 @@
+# src/advanced/grid_engine.py
+
+import argparse
+import itertools
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from binance.exceptions import BinanceAPIException
+from src.utils.api import get_binance_client
+from src.utils.logger import elapsed_ms, log_order_placed, log_order_rejected, setup_logger
+from src.utils.account import reserve_margin
+from src.utils.filters import filter_cache
+from src.utils.journal import LOST, get_order_journal
+from src.utils.submission import NETWORK_ERRORS, lookup_order, send_order
+from src.utils.market_data import market_data
+from src.utils.user_stream import get_user_stream
+from src.utils.validation import check_order_params, normalize_prices
+from src.advanced.grid import build_grid_ladder
+
+logger = setup_logger()
+
+# order_ids entry for a level whose order has been sent but not acknowledged yet.
+PENDING = 0
+
+
+class GridEngine:
+    """
+    Live grid for one symbol.
+
+    Levels are kept in three parallel lists sorted by price (prices, order_ids, sides). A fill
+    is located with a bisect on its price, and the opposite order is placed on the adjacent level:
+    a filled BUY is followed by a SELL one level up, a filled SELL by a BUY one level down. When
+    the mark price leaves the ladder, the grid is shifted by whole levels: only the levels that
+    fall off one end are cancelled and only the new levels on the other end are placed.
+
+    REST calls are made on the manager's executor, never on the thread delivering events.
+    """
+
+    def __init__(self, client, executor, symbol: str, total_quantity: float, lower_price: float, upper_price: float,
+                 grid_count: int):
+        self.client = client
+        self.symbol = symbol
+        self.filters = filter_cache.get(client, symbol)
+        prices, self.quantity = build_grid_ladder(self.filters, total_quantity, lower_price, upper_price, grid_count)
+        self.spacing = (upper_price - lower_price) / (grid_count - 1)
+        self.prices = prices
+        self.order_ids = [None] * grid_count
+        self.sides = [None] * grid_count
+        self.fills = 0
+        self.recenters = 0
+        self.job_id = get_order_journal().start_job(
+            "grid_engine", symbol, "BOTH", {"total_quantity": total_quantity, "lower_price": lower_price,
+                                            "upper_price": upper_price, "grid_count": grid_count}
+        )
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._steps = itertools.count(1)
+        self._early = set()
+        self._stopped = False
+
+    def start(self, mark_price: float) -> None:
+        """Place BUY orders below the mark and SELL orders above it, leaving the level nearest the mark empty."""
+        with self._lock:
+            to_place = self._fill_gaps(mark_price)
+        logger.info("Grid engine %s: %s levels from %s to %s, %s orders, job %s",
+                    self.symbol, len(self.prices), self.prices[0], self.prices[-1], len(to_place), self.job_id)
+        self._submit(to_place)
+
+    def stop(self, cancel: bool = True) -> None:
+        """Stop reacting to fills and optionally cancel every open grid order."""
+        with self._lock:
+            self._stopped = True
+            live = [order_id for order_id in self.order_ids if order_id]
+        if cancel:
+            for order_id in live:
+                self._executor.submit(self._cancel, order_id)
+        get_order_journal().finish_job(self.job_id, "stopped")
+
+    @property
+    def open_orders(self) -> int:
+        return sum(1 for order_id in self.order_ids if order_id)
+
+    def on_order_update(self, order: dict) -> None:
+        """Handle the "o" payload of an ORDER_TRADE_UPDATE for this symbol."""
+        if order.get("X") != "FILLED":
+            return
+        order_id = order.get("i")
+        with self._lock:
+            if self._stopped:
+                return
+            index = self._find(float(order.get("p") or 0), order_id)
+            if index is None:
+                # The fill can arrive before the placement response; handled once the id is known
+                if str(order.get("c", "")).startswith(f"{self.job_id}-"):
+                    self._early.add(order_id)
+                return
+            to_place = self._on_fill(index)
+        self._submit(to_place)
+
+    def maybe_recenter(self, mark_price: float) -> int:
+        """
+        Shift the ladder by whole levels so the mark sits in its middle again, if the mark left the range.
+
+        Returns:
+            int: Number of levels shifted (positive when the grid moved up).
+        """
+        with self._lock:
+            if self._stopped or self.prices[0] <= mark_price <= self.prices[-1]:
+                return 0
+            count = len(self.prices)
+            center = (self.prices[0] + self.prices[-1]) / 2
+            shift = round((mark_price - center) / self.spacing) or (1 if mark_price > center else -1)
+            steps = min(abs(shift), count)
+            if shift > 0:
+                top = self.prices[-1]
+                new_prices = normalize_prices(self.filters, [top + (i + 1) * self.spacing for i in range(steps)])
+                dropped = self.order_ids[:steps]
+                self.prices = self.prices[steps:] + new_prices
+                self.order_ids = self.order_ids[steps:] + [None] * steps
+                self.sides = self.sides[steps:] + [None] * steps
+            else:
+                bottom = self.prices[0]
+                new_prices = normalize_prices(self.filters, [bottom - (steps - i) * self.spacing for i in range(steps)])
+                if new_prices[0] <= 0:
+                    return 0
+                dropped = self.order_ids[count - steps:]
+                self.prices = new_prices + self.prices[:count - steps]
+                self.order_ids = [None] * steps + self.order_ids[:count - steps]
+                self.sides = [None] * steps + self.sides[:count - steps]
+            self.recenters += 1
+            to_place = self._fill_gaps(mark_price)
+
+        logger.info("Grid engine %s re-centered by %s levels around %s: cancelling %s, placing %s",
+                    self.symbol, shift, mark_price, sum(1 for o in dropped if o), len(to_place))
+        for order_id in dropped:
+            if order_id:
+                self._executor.submit(self._cancel, order_id)
+        self._submit(to_place)
+        return steps if shift > 0 else -steps
+
+    # ----- internals (call with self._lock held unless noted) -----
+
+    def _find(self, price: float, order_id):
+        index = bisect_left(self.prices, price)
+        if index < len(self.prices) and self.prices[index] == price and self.order_ids[index] == order_id:
+            return index
+        return None
+
+    def _on_fill(self, index: int) -> list:
+        side = self.sides[index]
+        self.order_ids[index] = None
+        self.sides[index] = None
+        self.fills += 1
+        target = index + 1 if side == "BUY" else index - 1
+        if 0 <= target < len(self.prices) and self.order_ids[target] is None:
+            opposite = "SELL" if side == "BUY" else "BUY"
+            self.order_ids[target] = PENDING
+            self.sides[target] = opposite
+            return [(self.prices[target], opposite)]
+        return []
+
+    def _fill_gaps(self, mark_price: float) -> list:
+        """Reserve every empty level except the one nearest the mark; returns (price, side) to place."""
+        nearest = min(range(len(self.prices)), key=lambda i: abs(self.prices[i] - mark_price))
+        to_place = []
+        for i, price in enumerate(self.prices):
+            if i == nearest or self.order_ids[i] is not None:
+                continue
+            side = "BUY" if price < mark_price else "SELL"
+            self.order_ids[i] = PENDING
+            self.sides[i] = side
+            to_place.append((price, side))
+        return to_place
+
+    def _submit(self, to_place: list) -> None:
+        """Queue placements on the executor (call without the lock)."""
+        for price, side in to_place:
+            self._executor.submit(self._place, price, side)
+
+    def _place(self, price: float, side: str) -> None:
+        journal = get_order_journal()
+        step = next(self._steps)
+        client_order_id = journal.client_order_id(self.job_id, step)
+        started = time.perf_counter()
+        try:
+            check_order_params(self.filters, self.quantity, price)
+            with reserve_margin(self.client, self.symbol, self.quantity * price,
+                                f"Insufficient balance for grid level {price}") as reservation, \
+                    journal.track(client_order_id, self.symbol, side, "LIMIT", self.quantity, price, self.job_id,
+                                  "grid_engine", step) as entry:
+                order = send_order(
+                    self.client,
+                    symbol=self.symbol, side=side, type="LIMIT", quantity=self.quantity, price=str(price),
+                    timeInForce="GTC", newClientOrderId=client_order_id
+                )
+                entry.record(order)
+                reservation.confirm(order['orderId'])
+        except (ValueError, BinanceAPIException) as e:
+            if isinstance(e, BinanceAPIException):
+                filter_cache.handle_api_error(e)
+                log_order_rejected(self.symbol, e.code, e.message, elapsed_ms(started), side=side, price=price,
+                                   strategy="grid_engine")
+            logger.error("Grid engine %s: %s order at %s failed: %s", self.symbol, side, price, e)
+            self._release_level(price)
+            return
+        except Exception as e:
+            # Timeouts and OrderOutcomeUnknown: the order may exist, so look it up before freeing the level
+            logger.error("Grid engine %s: %s order at %s failed: %s", self.symbol, side, price, e)
+            order = self._lookup(client_order_id)
+            if order is None:
+                self._release_level(price)
+                return
+            journal.record_response(client_order_id, order)
+
+        log_order_placed(order, elapsed_ms(started), strategy="grid_engine", level_price=price)
+        to_place, orphan = [], False
+        with self._lock:
+            index = bisect_left(self.prices, price)
+            if (self._stopped or index >= len(self.prices) or self.prices[index] != price
+                    or self.order_ids[index] != PENDING):
+                orphan = True
+            else:
+                self.order_ids[index] = order['orderId']
+                if order['status'] == "FILLED" or order['orderId'] in self._early:
+                    self._early.discard(order['orderId'])
+                    to_place = self._on_fill(index)
+        if orphan:
+            # The level was shifted out (or the engine stopped) while the order was in flight
+            self._cancel(order['orderId'])
+        self._submit(to_place)
+
+    def _release_level(self, price: float) -> None:
+        """Free a level whose placement failed so a later fill or re-center can use it again (call without the lock)."""
+        with self._lock:
+            index = bisect_left(self.prices, price)
+            if index < len(self.prices) and self.prices[index] == price and self.order_ids[index] == PENDING:
+                self.order_ids[index] = None
+                self.sides[index] = None
+
+    def _lookup(self, client_order_id: str):
+        """Return the order behind an uncertain placement, or None if it was not created or cannot be found."""
+        try:
+            order = lookup_order(self.client, self.symbol, client_order_id)
+        except (BinanceAPIException,) + NETWORK_ERRORS as e:
+            # Left PENDING in the journal for resolve_job() to settle
+            logger.error("Grid engine %s: lookup of order %s failed: %s", self.symbol, client_order_id, e)
+            return None
+        if order is None:
+            get_order_journal().set_status(client_order_id, LOST)
+        else:
+            logger.info("Grid engine %s: order %s found after an uncertain placement", self.symbol, client_order_id)
+        return order
+
+    def _cancel(self, order_id) -> None:
+        try:
+            self.client.futures_cancel_order(symbol=self.symbol, orderId=order_id)
+        except BinanceAPIException as api_exc:
+            if api_exc.code not in (-2011, -2013):
+                logger.error("Grid engine %s: failed to cancel %s: %s (Code: %s)",
+                             self.symbol, order_id, api_exc.message, api_exc.code)
+
+
+class GridManager:
+    """
+    Runs grid engines for many symbols on one user-data stream and one placement pool.
+
+    Raises:
+        ValueError: If the user-data stream does not connect (fills could not be followed).
+    """
+
+    def __init__(self, client=None, workers: int = 4):
+        self.client = client or get_binance_client()
+        self.engines = {}
+        self._stream = get_user_stream(self.client, start=False)
+        if not self._stream.start():
+            raise ValueError("User data stream did not connect; grid not started because fills could not be followed.")
+        self._stream.add_handler(self.on_event)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="grid-engine")
+        self._stop = threading.Event()
+
+    def add_grid(self, symbol: str, total_quantity: float, lower_price: float, upper_price: float,
+                 grid_count: int) -> GridEngine:
+        """
+        Start a grid for a symbol.
+
+        Raises:
+            ValueError: If the symbol already has a grid or the ladder violates the symbol filters.
+        """
+        if symbol in self.engines:
+            raise ValueError(f"A grid is already running for {symbol}")
+        engine = GridEngine(self.client, self._executor, symbol, total_quantity, lower_price, upper_price, grid_count)
+        self.engines[symbol] = engine
+        engine.start(market_data.get_mark_price(self.client, symbol))
+        return engine
+
+    def remove_grid(self, symbol: str, cancel: bool = True) -> None:
+        engine = self.engines.pop(symbol, None)
+        if engine is not None:
+            engine.stop(cancel)
+
+    def on_event(self, event: dict) -> None:
+        """User-data stream handler: route order updates to the symbol's engine."""
+        if event.get("e") != "ORDER_TRADE_UPDATE":
+            return
+        engine = self.engines.get(event["o"].get("s"))
+        if engine is not None:
+            engine.on_order_update(event["o"])
+
+    def check_prices(self) -> None:
+        """Re-center every grid whose symbol's mark price left its range."""
+        for symbol, engine in list(self.engines.items()):
+            try:
+                engine.maybe_recenter(market_data.get_mark_price(self.client, symbol))
+            except (ValueError, BinanceAPIException) as e:
+                logger.error("Grid engine %s: price check failed: %s", symbol, e)
+
+    def run(self, check_interval: float = 1.0) -> None:
+        """Block, checking prices every check_interval seconds, until stop() is called."""
+        while not self._stop.wait(check_interval):
+            self.check_prices()
+
+    def stop(self, cancel: bool = True) -> None:
+        self._stop.set()
+        for symbol in list(self.engines):
+            self.remove_grid(symbol, cancel)
+        self._stream.remove_handler(self.on_event)
+        self._executor.shutdown(wait=True)
+
+
+def _parse_grid(spec: str):
+    symbol, total_quantity, lower_price, upper_price, grid_count = spec.split(",")
+    return symbol.upper(), float(total_quantity), float(lower_price), float(upper_price), int(grid_count)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Self-rebalancing grid engine")
+    parser.add_argument("--grid", action="append", required=True, metavar="SYMBOL,QTY,LOWER,UPPER,COUNT",
+                        help="Grid to run, e.g. BTCUSDT,0.05,67000,69000,20 (repeat for several symbols)")
+    parser.add_argument("--check_interval", type=float, default=1.0, help="Seconds between re-centering checks")
+    parser.add_argument("--keep_orders", action="store_true", help="Leave grid orders open on exit")
+    args = parser.parse_args()
+
+    try:
+        manager = GridManager()
+    except ValueError as ve:
+        logger.error("Validation Error: %s", ve)
+        print(f"Error: {ve}")
+        raise SystemExit(1)
+    try:
+        for spec in args.grid:
+            try:
+                manager.add_grid(*_parse_grid(spec))
+            except ValueError as ve:
+                logger.error("Validation Error: %s", ve)
+                print(f"Error: {ve}")
+            except BinanceAPIException as api_exc:
+                filter_cache.handle_api_error(api_exc)
+                logger.error("Binance API Error: %s (Code: %s)", api_exc.message, api_exc.code)
+                print(f"Binance API Error: {api_exc.message} (Code: {api_exc.code})")
+        if manager.engines:
+            print(f"✅ Grid engine running for {', '.join(manager.engines)}. Press Ctrl+C to stop.")
+            manager.run(args.check_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engines = dict(manager.engines)
+        manager.stop(cancel=not args.keep_orders)
+        for symbol, engine in engines.items():
+            print(f"{symbol}: {engine.fills} fills, {engine.recenters} re-centers")
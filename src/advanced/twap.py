@@ -2,17 +2,27 @@
 
 import time
 import argparse
+from contextlib import nullcontext
 from decimal import Decimal
 from binance.exceptions import BinanceAPIException
 from src.utils.api import get_binance_client
-from src.utils.logger import setup_logger
-from src.utils.account import has_sufficient_balance
-from src.utils.validation import validate_order_params
+from src.utils.logger import elapsed_ms, log_order_placed, log_order_rejected, setup_logger
+from src.utils.account import reserve_margin
+from src.utils.depth_book import depth_books
+from src.utils.filters import filter_cache
+from src.utils.journal import get_order_journal
+from src.utils.submission import send_order
+from src.utils.market_data import market_data
+from src.utils.metrics import profile_run
+from src.utils.validation import check_order_params, normalize_price, normalize_quantity
 
 logger = setup_logger()
-client = get_binance_client()
 
-def place_twap_orders(symbol: str, side: str, total_quantity: float, num_slices: int, interval: int, order_type: str = "MARKET"):
+# Book levels on the far side counted as visible liquidity for --max_participation.
+PARTICIPATION_LEVELS = 20
+
+def place_twap_orders(symbol: str, side: str, total_quantity: float, num_slices: int, interval: int, order_type: str = "MARKET",
+                      job_id: str = None, price_offset_ticks: int = 0, max_participation: float = None):
     """
     Places TWAP (Time-Weighted Average Price) orders by splitting total_quantity
     into num_slices and placing orders at fixed intervals.
@@ -24,66 +34,165 @@ def place_twap_orders(symbol: str, side: str, total_quantity: float, num_slices:
         num_slices (int): Number of order slices
         interval (int): Interval in seconds between each order
         order_type (str): Order type - "MARKET" or "LIMIT"
-    """
-    try:
-        slice_qty = round(total_quantity / num_slices, 6)
-
-        logger.info(f"Starting TWAP: {num_slices} slices of {slice_qty} {symbol} every {interval}s.")
-
+        job_id (str): Journal id of an interrupted TWAP to resume; slices already placed are skipped
+        price_offset_ticks (int): For LIMIT, ticks inside the spread from the near touch (0 joins the best bid/ask)
+        max_participation (float): Cap each slice at this fraction of the visible quantity on the far side of
+            the book (top PARTICIPATION_LEVELS levels); the excess rolls into the following slices
 
-        for i in range(num_slices):
-            logger.debug(f"Placing slice {i+1}/{num_slices}")
+    LIMIT slices are priced from the local depth book (see src/utils/depth_book.py).
 
-            validate_order_params(client, symbol, slice_qty)
-
-            # Use current mark price for estimating cost
-            price = float(client.futures_mark_price(symbol=symbol)["markPrice"])
-            if not has_sufficient_balance(client, symbol, side, slice_qty, price):
-                raise ValueError("Insufficient balance for TWAP slice.")
-
-            order = client.futures_create_order(
-                symbol=symbol,
-                side=side,
-                type=order_type,
-                quantity=slice_qty,
-                timeInForce='GTC' if order_type == 'LIMIT' else None
-            )
-
-            logger.info(f"TWAP Order {i+1}: ID {order['orderId']}, Qty: {slice_qty}, Status: {order['status']}")
+    Returns:
+        list[dict]: Per-slice reports with planned and actual send times (seconds from start).
+    """
+    reports = []
+    try:
+        client = get_binance_client()
+        filters = filter_cache.get(client, symbol)
+        slice_qty = normalize_quantity(filters, total_quantity / num_slices)
+        check_order_params(filters, slice_qty)
+
+        journal = get_order_journal()
+        if job_id is None:
+            params = {"total_quantity": total_quantity, "num_slices": num_slices, "interval": interval,
+                      "order_type": order_type, "price_offset_ticks": price_offset_ticks,
+                      "max_participation": max_participation}
+            job_id = journal.start_job("twap", symbol, side, params)
+            remaining = list(range(num_slices))
+        else:
+            done = journal.resolve_job(client, job_id)
+            remaining = [i for i in range(num_slices) if i + 1 not in done]
+            print(f"↪️ Resuming TWAP job {job_id}: {num_slices - len(remaining)}/{num_slices} slices already placed.")
+
+        logger.info("Starting TWAP job %s: %s slices of %s %s every %ss.", job_id, len(remaining), slice_qty, symbol, interval)
+        tick = float(filters.tick_size)
+        far_side = "SELL" if side == "BUY" else "BUY"
+        carry = 0.0
+
+        # Slices fire on absolute deadlines so request latency does not accumulate as drift
+        start = time.monotonic()
+        for n, i in enumerate(remaining):
+            planned = n * interval
+            delay = start + planned - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            fired = time.monotonic() - start
+            logger.debug("Placing slice %s/%s (planned +%.3fs, actual +%.3fs)", i+1, num_slices, planned, fired)
+
+            quantity = slice_qty + carry
+            book = None
+            if order_type == "LIMIT" or max_participation:
+                book = depth_books.get_book(client, symbol)
+            if max_participation:
+                visible = book.visible_quantity(far_side, levels=PARTICIPATION_LEVELS)
+                capped = normalize_quantity(filters, min(quantity, max_participation * visible))
+                if capped < filters.min_qty:
+                    # Nothing is sent, so the whole slice (with what it already carried) rolls over
+                    carry = quantity
+                    logger.warning("TWAP slice %s skipped: %s visible on the book, rolling %s over", i+1, visible, carry)
+                    reports.append({"slice": i + 1, "planned": planned, "fired": fired, "order": None})
+                    continue
+                carry = normalize_quantity(filters, quantity - capped)
+                quantity = capped
+
+            if order_type == "LIMIT":
+                price = book.passive_price(side, tick, price_offset_ticks)
+                if price is None:
+                    raise ValueError(f"No bid/ask in the {symbol} order book to price the LIMIT slice.")
+                price = normalize_price(filters, price, "down" if side == "BUY" else "up")
+                check_order_params(filters, quantity, price)
+                order_params = {"price": price, "timeInForce": "GTC"}
+            else:
+                # Use current mark price for estimating cost (streamed, REST fallback when stale)
+                price = market_data.get_mark_price(client, symbol)
+                order_params = {}
+            client_order_id = journal.client_order_id(job_id, i + 1)
+            with reserve_margin(client, symbol, quantity * price, "Insufficient balance for TWAP slice.") as reservation, \
+                    journal.track(client_order_id, symbol, side, order_type, quantity, order_params.get("price"), job_id,
+                                  "twap", i + 1) as entry:
+                started = time.perf_counter()
+                order = send_order(
+                    client,
+                    symbol=symbol,
+                    side=side,
+                    type=order_type,
+                    quantity=quantity,
+                    newClientOrderId=client_order_id,
+                    **order_params
+                )
+                entry.record(order)
+                reservation.confirm(order['orderId'])
+            log_order_placed(order, elapsed_ms(started), strategy="twap", slice=i + 1)
+
+            logger.info("TWAP Order %s: ID %s, Qty: %s, Status: %s", i+1, order['orderId'], quantity, order['status'])
             print(f"✅ Order {i+1}/{num_slices} placed: ID {order['orderId']}, Status: {order['status']}")
+            reports.append({"slice": i + 1, "planned": planned, "fired": fired, "order": order})
 
-            if i < num_slices - 1:
-                time.sleep(interval)
+        if carry:
+            logger.warning("TWAP job %s left %s %s unplaced under the participation cap", job_id, carry, symbol)
+            print(f"⚠️ {carry} {symbol} left unplaced under the participation cap.")
 
+        journal.finish_job(job_id)
         print("✅ TWAP Execution Completed.")
 
     except ValueError as ve:
-        logger.error(f"Validation Error: {ve}")
+        logger.error("Validation Error: %s", ve)
         print(f"Error: {ve}")
     except BinanceAPIException as api_exc:
-        logger.error(f"Binance API Error: {api_exc.message} (Code: {api_exc.code})")
+        filter_cache.handle_api_error(api_exc)
+        log_order_rejected(symbol, api_exc.code, api_exc.message, side=side, strategy="twap")
+        logger.error("Binance API Error: %s (Code: %s)", api_exc.message, api_exc.code)
         print(f"Binance API Error: {api_exc.message} (Code: {api_exc.code})")
     except Exception as e:
-        logger.critical(f"Unexpected error in TWAP: {e}", exc_info=True)
+        logger.critical("Unexpected error in TWAP: %s", e, exc_info=True)
         print(f"Unexpected error: {e}")
 
+    return reports
+
+def resume_twap(job_id: str):
+    """
+    Resume an interrupted TWAP job from the order journal.
+
+    Slices with an unknown outcome are looked up by client order id first; the remaining
+    slices are then sent on a fresh schedule starting now, with their original ids.
+    """
+    job = get_order_journal().get_job(job_id)
+    if job is None or job["strategy"] != "twap":
+        print(f"Error: No TWAP job '{job_id}' in the order journal.")
+        return []
+    return place_twap_orders(job["symbol"], job["side"], job_id=job_id, **job["params"])
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="TWAP Order Executor")
-    parser.add_argument("--symbol", type=str, required=True)
-    parser.add_argument("--side", type=str, choices=["BUY", "SELL"], required=True)
-    parser.add_argument("--total_quantity", type=float, required=True)
-    parser.add_argument("--num_slices", type=int, required=True)
-    parser.add_argument("--interval", type=int, required=True)
+    parser.add_argument("--symbol", type=str)
+    parser.add_argument("--side", type=str, choices=["BUY", "SELL"])
+    parser.add_argument("--total_quantity", type=float)
+    parser.add_argument("--num_slices", type=int)
+    parser.add_argument("--interval", type=int)
     parser.add_argument("--type", type=str, choices=["MARKET", "LIMIT"], default="MARKET")
+    parser.add_argument("--price_offset", type=int, default=0,
+                        help="For LIMIT, ticks inside the spread from the best bid/ask (0 joins the touch)")
+    parser.add_argument("--max_participation", type=float, default=None,
+                        help="Cap each slice at this fraction of the visible opposite-side book depth")
+    parser.add_argument("--resume", type=str, metavar="JOB_ID", help="Resume an interrupted TWAP job from the order journal")
 
-    args = parser.parse_args()
+    parser.add_argument("--profile", type=str, metavar="PATH", help="Write a cProfile trace of the run to PATH")
 
-    place_twap_orders(
-        symbol=args.symbol.upper(),
-        side=args.side.upper(),
-        total_quantity=args.total_quantity,
-        num_slices=args.num_slices,
-        interval=args.interval,
-        order_type=args.type.upper()
-    )
+    args = parser.parse_args()
+    if not args.resume and None in (args.symbol, args.side, args.total_quantity, args.num_slices, args.interval):
+        parser.error("--symbol, --side, --total_quantity, --num_slices and --interval are required")
+
+    with profile_run(args.profile) if args.profile else nullcontext():
+        if args.resume:
+            resume_twap(args.resume)
+        else:
+            place_twap_orders(
+                symbol=args.symbol.upper(),
+                side=args.side.upper(),
+                total_quantity=args.total_quantity,
+                num_slices=args.num_slices,
+                interval=args.interval,
+                order_type=args.type.upper(),
+                price_offset_ticks=args.price_offset,
+                max_participation=args.max_participation
+            )
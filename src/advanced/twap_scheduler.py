@@ -0,0 +1,252 @@
+# src/advanced/twap_scheduler.py
+
+import asyncio
+import heapq
+import itertools
+from binance.exceptions import BinanceAPIException
+from src.utils.async_api import close_async_binance_clients, get_async_binance_client
+from src.utils.logger import log_order_placed, log_order_rejected, setup_logger
+from src.utils.account import reserve_margin_async
+from src.utils.depth_book import depth_books
+from src.utils.filters import filter_cache
+from src.utils.journal import get_order_journal
+from src.utils.submission import send_order_async
+from src.utils.market_data import market_data
+from src.utils.validation import check_order_params, normalize_price, normalize_quantity
+
+logger = setup_logger()
+
+_job_ids = itertools.count(1)
+
+
+class TwapJob:
+    """
+    One TWAP execution: num_slices slices of total_quantity / num_slices, one every interval seconds.
+
+    After the job finishes, `reports` holds one dict per slice with the planned and actual
+    send times (seconds from the job start, on the event loop's monotonic clock), the
+    completion time, and the order or error. LIMIT slices are priced price_offset_ticks
+    inside the best bid/ask of the local depth book.
+    """
+
+    def __init__(self, symbol: str, side: str, total_quantity: float, num_slices: int, interval: float,
+                 order_type: str = "MARKET", price_offset_ticks: int = 0):
+        self.job_id = next(_job_ids)
+        self.symbol = symbol
+        self.side = side
+        self.total_quantity = total_quantity
+        self.num_slices = num_slices
+        self.interval = interval
+        self.order_type = order_type
+        self.price_offset_ticks = price_offset_ticks
+        self.filters = None
+        self.slice_qty = None
+        self.journal_id = None
+        self.client = None
+        self.start_at = None
+        self.reports = []
+        self.error = None
+        self.done = None
+        self._pending = num_slices
+
+    @property
+    def orders(self) -> list:
+        return [r["order"] for r in sorted(self.reports, key=lambda r: r["slice"]) if r["order"]]
+
+    def lag_stats(self):
+        """Return (mean, max) lag in seconds between planned and actual slice send times."""
+        lags = [r["fired"] - r["planned"] for r in self.reports]
+        if not lags:
+            return 0.0, 0.0
+        return sum(lags) / len(lags), max(lags)
+
+
+class TwapScheduler:
+    """
+    Runs many TWAP jobs on one event loop.
+
+    All slices of all jobs sit in a single deadline heap keyed on the loop's monotonic
+    clock. A dispatcher sleeps until the earliest deadline and fires every due slice as
+    its own task, so a slow request never delays the next slice of the same or another job.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._dispatcher = None
+        self._tasks = set()
+
+    async def submit(self, job: TwapJob) -> TwapJob:
+        """
+        Validate a job and schedule its slices.
+
+        Raises:
+            ValueError: If the slice quantity violates the symbol filters.
+        """
+        loop = asyncio.get_running_loop()
+        job.done = loop.create_future()
+        job.client = await get_async_binance_client()
+        job.filters = filters = await filter_cache.get_async(job.client, job.symbol)
+        job.slice_qty = normalize_quantity(filters, job.total_quantity / job.num_slices)
+        check_order_params(filters, job.slice_qty)
+        job.journal_id = get_order_journal().start_job(
+            "twap", job.symbol, job.side, {"total_quantity": job.total_quantity, "num_slices": job.num_slices,
+                                           "interval": job.interval, "order_type": job.order_type,
+                                           "price_offset_ticks": job.price_offset_ticks}
+        )
+
+        logger.info("Starting TWAP job %s: %s slices of %s %s every %ss.",
+                    job.job_id, job.num_slices, job.slice_qty, job.symbol, job.interval)
+        job.start_at = loop.time()
+        for i in range(job.num_slices):
+            heapq.heappush(self._heap, (job.start_at + i * job.interval, next(self._seq), job, i))
+
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        return job
+
+    async def run(self, *jobs: TwapJob) -> list:
+        """Submit jobs and wait for all of them to finish. Cancelling the caller cancels the jobs."""
+        try:
+            for job in jobs:
+                try:
+                    await self.submit(job)
+                except (ValueError, BinanceAPIException) as e:
+                    job.error = str(e)
+                    logger.error("TWAP job %s rejected: %s", job.job_id, e)
+                    job.done.set_result(job)
+            await asyncio.gather(*(job.done for job in jobs))
+        except asyncio.CancelledError:
+            for job in jobs:
+                self.cancel(job)
+            raise
+        return list(jobs)
+
+    def cancel(self, job: TwapJob) -> None:
+        """Unschedule a job's remaining slices. Slices already being sent still complete."""
+        remaining = self._unschedule(job)
+        if job.done is not None and not job.done.done():
+            job.done.cancel()
+        logger.warning("TWAP job %s cancelled: %s slices unscheduled", job.job_id, remaining)
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._heap:
+            deadline = self._heap[0][0]
+            delay = deadline - loop.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, job, index = heapq.heappop(self._heap)
+            task = asyncio.ensure_future(self._fire(job, index, deadline))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fire(self, job: TwapJob, index: int, deadline: float) -> None:
+        loop = asyncio.get_running_loop()
+        report = {
+            "slice": index + 1,
+            "planned": deadline - job.start_at,
+            "fired": loop.time() - job.start_at,
+            "completed": None,
+            "order": None,
+            "error": None,
+        }
+        job.reports.append(report)
+        try:
+            if job.order_type == "LIMIT":
+                book = await depth_books.get_book_async(job.client, job.symbol)
+                price = book.passive_price(job.side, float(job.filters.tick_size), job.price_offset_ticks)
+                if price is None:
+                    raise ValueError(f"No bid/ask in the {job.symbol} order book to price the LIMIT slice.")
+                price = normalize_price(job.filters, price, "down" if job.side == "BUY" else "up")
+                check_order_params(job.filters, job.slice_qty, price)
+                params = {"price": price, "timeInForce": "GTC"}
+            else:
+                price = await market_data.get_mark_price_async(job.client, job.symbol)
+                params = {}
+            journal = get_order_journal()
+            client_order_id = journal.client_order_id(job.journal_id, index + 1)
+            with await reserve_margin_async(job.client, job.symbol, job.slice_qty * price,
+                                            "Insufficient balance for TWAP slice.") as reservation, \
+                    journal.track(client_order_id, job.symbol, job.side, job.order_type, job.slice_qty,
+                                  params.get("price"), job.journal_id, "twap", index + 1) as entry:
+                order = await send_order_async(
+                    job.client,
+                    symbol=job.symbol, side=job.side, type=job.order_type, quantity=job.slice_qty,
+                    newClientOrderId=client_order_id, **params
+                )
+                entry.record(order)
+                reservation.confirm(order['orderId'])
+            report["order"] = order
+            log_order_placed(order, round((loop.time() - job.start_at - report["fired"]) * 1000, 3),
+                             strategy="twap", job_id=job.job_id, slice=index + 1)
+            logger.info("TWAP job %s Order %s: ID %s, Qty: %s, planned +%.3fs, sent +%.3fs",
+                        job.job_id, index+1, order['orderId'], job.slice_qty, report['planned'], report['fired'])
+        except BinanceAPIException as api_exc:
+            filter_cache.handle_api_error(api_exc)
+            report["error"] = job.error = f"{api_exc.message} (Code: {api_exc.code})"
+            log_order_rejected(job.symbol, api_exc.code, api_exc.message, side=job.side, strategy="twap",
+                               job_id=job.job_id, slice=index + 1)
+            logger.error("TWAP job %s slice %s failed: %s", job.job_id, index+1, report['error'])
+        except Exception as e:
+            report["error"] = job.error = str(e)
+            logger.error("TWAP job %s slice %s failed: %s", job.job_id, index+1, e)
+        report["completed"] = loop.time() - job.start_at
+        if job.error:
+            self._drop_remaining(job)
+        self._finish_slice(job)
+
+    def _drop_remaining(self, job: TwapJob) -> None:
+        """Unschedule the remaining slices of a failed job."""
+        remaining = self._unschedule(job)
+        if remaining:
+            logger.warning("TWAP job %s stopped: %s slices cancelled after error", job.job_id, remaining)
+
+    def _unschedule(self, job: TwapJob) -> int:
+        remaining = sum(1 for entry in self._heap if entry[2] is job)
+        if remaining:
+            self._heap = [entry for entry in self._heap if entry[2] is not job]
+            heapq.heapify(self._heap)
+            job._pending -= remaining
+        return remaining
+
+    def _finish_slice(self, job: TwapJob) -> None:
+        job._pending -= 1
+        if job._pending == 0 and not job.done.done():
+            mean_lag, max_lag = job.lag_stats()
+            logger.info("TWAP job %s finished: %s/%s slices placed, lag mean %.1fms max %.1fms",
+                        job.job_id, len(job.orders), job.num_slices, mean_lag * 1000, max_lag * 1000)
+            if not job.error:
+                get_order_journal().finish_job(job.journal_id)
+            job.done.set_result(job)
+
+
+_schedulers = {}
+
+def get_twap_scheduler() -> TwapScheduler:
+    """Return the TwapScheduler shared by every TWAP on the running event loop."""
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(id(loop))
+    if scheduler is None:
+        scheduler = _schedulers[id(loop)] = TwapScheduler()
+    return scheduler
+
+def run_twap_jobs(jobs: list) -> list:
+    """Run several TWAP jobs concurrently on a fresh event loop and return them with their reports."""
+    async def run_all():
+        try:
+            return await get_twap_scheduler().run(*jobs)
+        finally:
+            _schedulers.pop(id(asyncio.get_running_loop()), None)
+            await close_async_binance_clients()
+
+    return asyncio.run(run_all())
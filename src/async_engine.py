@@ -0,0 +1,293 @@
+import asyncio
+import contextvars
+import time
+from binance.exceptions import BinanceAPIException
+from src.utils.async_api import get_async_binance_client
+from src.utils.logger import elapsed_ms, log_order_placed, log_order_rejected, setup_logger
+from src.utils.account import has_sufficient_margin_async, reserve_margin_async
+from src.utils.filters import filter_cache
+from src.utils.api import get_binance_client
+from src.utils.journal import get_order_journal
+from src.utils.market_data import market_data
+from src.utils.submission import send_order_async
+from src.utils.user_stream import get_user_stream
+from src.utils.ledger import get_margin_ledger
+from src.utils.validation import check_order_params
+from src.advanced.grid import build_grid_ladder
+from src.advanced.twap_scheduler import TwapJob, get_twap_scheduler
+
+logger = setup_logger()
+
+# Upper bound on in-flight order requests per strategy call.
+MAX_CONCURRENT_ORDERS = 10
+
+# Reason the last order call in the current task failed; read through last_error().
+_last_error = contextvars.ContextVar("last_error", default=None)
+
+def last_error():
+    """
+    Return why the most recent place_*_async call in the current task failed.
+
+    Returns:
+        str | None: The reported error message, or None if nothing has failed.
+    """
+    return _last_error.get()
+
+def _report_error(context: str, exc: Exception, symbol: str = None, **fields) -> None:
+    """Log and print an error the same way the synchronous entry points do."""
+    if isinstance(exc, ValueError):
+        logger.error("Validation Error: %s", exc)
+        message = f"Error: {exc}"
+    elif isinstance(exc, BinanceAPIException):
+        filter_cache.handle_api_error(exc)
+        if symbol:
+            log_order_rejected(symbol, exc.code, exc.message, **fields)
+        logger.error("Binance API Error in %s (Code: %s): %s", context, exc.code, exc.message)
+        message = f"Binance API Error: {exc.message} (Code: {exc.code})"
+    else:
+        logger.critical("Unexpected error in %s: %s", context, exc, exc_info=exc)
+        message = f"Unexpected error: {exc}"
+    _last_error.set(message)
+    print(message)
+
+async def place_market_order_async(symbol: str, side: str, quantity: float):
+    """
+    Async counterpart of place_market_order().
+
+    Returns:
+        dict | None: The order response, or None if the order was not placed.
+    """
+    try:
+        client = await get_async_binance_client()
+        check_order_params(await filter_cache.get_async(client, symbol), quantity)
+        price = await market_data.get_mark_price_async(client, symbol)
+
+        journal = get_order_journal()
+        client_order_id = journal.client_order_id()
+        with await reserve_margin_async(client, symbol, quantity * price,
+                                        "Insufficient balance to place market order.") as reservation, \
+                journal.track(client_order_id, symbol, side, 'MARKET', quantity, strategy="market") as entry:
+            started = time.perf_counter()
+            order = await send_order_async(client, symbol=symbol, side=side, type='MARKET', quantity=quantity,
+                                           newClientOrderId=client_order_id)
+            entry.record(order)
+            reservation.confirm(order['orderId'])
+        log_order_placed(order, elapsed_ms(started))
+        logger.info(
+            "Market order placed successfully. ID: %s, Symbol: %s, Side: %s, Quantity: %s, Status: %s",
+            order['orderId'], order['symbol'], order['side'], order['origQty'], order['status']
+        )
+        print(f"✅ Success: Market order placed. Order ID: {order['orderId']}, Status: {order['status']}")
+        return order
+    except Exception as e:
+        _report_error("market order", e, symbol, side=side, type="MARKET")
+        return None
+
+async def place_limit_order_async(symbol: str, side: str, quantity: float, price: float):
+    """
+    Async counterpart of place_limit_order().
+
+    Returns:
+        dict | None: The order response, or None if the order was not placed.
+    """
+    try:
+        client = await get_async_binance_client()
+        check_order_params(await filter_cache.get_async(client, symbol), quantity, price)
+
+        journal = get_order_journal()
+        client_order_id = journal.client_order_id()
+        with await reserve_margin_async(client, symbol, quantity * price,
+                                        "Insufficient balance to place limit order.") as reservation, \
+                journal.track(client_order_id, symbol, side, 'LIMIT', quantity, price, strategy="limit") as entry:
+            started = time.perf_counter()
+            order = await send_order_async(
+                client,
+                symbol=symbol, side=side, type='LIMIT', quantity=quantity, price=price, timeInForce='GTC',
+                newClientOrderId=client_order_id
+            )
+            entry.record(order)
+            reservation.confirm(order['orderId'])
+        log_order_placed(order, elapsed_ms(started))
+        logger.info(
+            "Limit order placed successfully. ID: %s, Symbol: %s, Side: %s, Quantity: %s, Price: %s, Status: %s",
+            order['orderId'], order['symbol'], order['side'], order['origQty'], order['price'], order['status']
+        )
+        print(f"Success: Limit order placed. Order ID: {order['orderId']}, Status: {order['status']}")
+        return order
+    except Exception as e:
+        _report_error("limit order", e, symbol, side=side, type="LIMIT", price=price)
+        return None
+
+async def place_oco_orders_async(symbol: str, side: str, quantity: float, tp_price: float, stop_price: float,
+                                 stop_limit_price: float = None):
+    """
+    Async counterpart of place_oco_orders(). Both legs are submitted concurrently;
+    if one leg is rejected the other is cancelled. Once placed, the pair is watched by
+    the user-data stream, which cancels the other leg when one fills.
+
+    Returns:
+        tuple[dict, dict] | None: (take-profit order, stop order), or None on failure.
+    """
+    try:
+        client = await get_async_binance_client()
+        filters = await filter_cache.get_async(client, symbol)
+        check_order_params(filters, quantity, tp_price)
+        check_order_params(filters, quantity, stop_price)
+        stream = get_user_stream(get_binance_client(), start=False)
+        if not await asyncio.to_thread(stream.start):
+            raise ValueError("User data stream did not connect; OCO legs not placed because nothing could cancel the sibling.")
+
+        reservation = await reserve_margin_async(client, symbol, quantity * max(tp_price, stop_price),
+                                                 "Insufficient balance for OCO order.")
+        with reservation:
+            started = time.perf_counter()
+            limit_order, stop_order = await _place_oco_legs(client, symbol, side, quantity, tp_price, stop_price)
+            latency = elapsed_ms(started)
+            log_order_placed(limit_order, latency, leg="take_profit")
+            log_order_placed(stop_order, latency, leg="stop")
+            reservation.confirm(limit_order['orderId'])
+            reservation.confirm(stop_order['orderId'])
+        stream.oco.register(symbol, limit_order, stop_order)
+
+        logger.info("Take-Profit LIMIT order placed. ID: %s, Price: %s", limit_order['orderId'], tp_price)
+        logger.info("Stop-MARKET order placed. ID: %s, Stop: %s", stop_order['orderId'], stop_price)
+        print(f"✅ OCO simulated: LIMIT Order ID: {limit_order['orderId']}, STOP-MARKET Order ID: {stop_order['orderId']}")
+        return limit_order, stop_order
+    except Exception as e:
+        _report_error("OCO orders", e, symbol, side=side, strategy="oco")
+        return None
+
+async def _place_oco_legs(client, symbol: str, side: str, quantity: float, tp_price: float, stop_price: float):
+    """Submit both OCO legs concurrently, cancelling the survivor if either is rejected."""
+    journal = get_order_journal()
+    limit_id, stop_id = journal.client_order_id(), journal.client_order_id()
+    journal.record_submit(limit_id, symbol, side, "LIMIT", quantity, tp_price, strategy="oco")
+    journal.record_submit(stop_id, symbol, side, "STOP_MARKET", quantity, stop_price, strategy="oco")
+    limit_leg = send_order_async(
+        client,
+        symbol=symbol, side=side, type="LIMIT", quantity=quantity, price=str(tp_price), timeInForce="GTC",
+        newClientOrderId=limit_id
+    )
+    stop_leg = send_order_async(
+        client,
+        symbol=symbol, side=side, type="STOP_MARKET", stopPrice=str(stop_price), quantity=quantity,
+        workingType="MARK_PRICE", newClientOrderId=stop_id
+    )
+    limit_order, stop_order = await asyncio.gather(limit_leg, stop_leg, return_exceptions=True)
+
+    for client_order_id, leg in ((limit_id, limit_order), (stop_id, stop_order)):
+        if isinstance(leg, BinanceAPIException):
+            journal.record_error(client_order_id, f"{leg.message} (Code: {leg.code})")
+        elif not isinstance(leg, Exception):
+            journal.record_response(client_order_id, leg)
+
+    errors = [r for r in (limit_order, stop_order) if isinstance(r, Exception)]
+    if errors:
+        for client_order_id, leg in ((limit_id, limit_order), (stop_id, stop_order)):
+            if not isinstance(leg, Exception):
+                await client.futures_cancel_order(symbol=symbol, orderId=leg['orderId'])
+                journal.set_status(client_order_id, "CANCELED")
+                logger.info("Cancelled OCO leg %s after sibling was rejected", leg['orderId'])
+        raise errors[0]
+    return limit_order, stop_order
+
+async def place_grid_orders_async(symbol: str, side: str, total_quantity: float, lower_price: float,
+                                  upper_price: float, grid_count: int, max_concurrency: int = MAX_CONCURRENT_ORDERS):
+    """
+    Async counterpart of place_grid_orders(). Levels are submitted concurrently,
+    bounded by max_concurrency, after one aggregate margin check.
+
+    Returns:
+        list[dict]: One result per level with keys level, price, order and error.
+    """
+    results = []
+    try:
+        client = await get_async_binance_client()
+        filters = await filter_cache.get_async(client, symbol)
+        prices, slice_quantity = build_grid_ladder(filters, total_quantity, lower_price, upper_price, grid_count)
+
+        required = sum(price * slice_quantity for price in prices)
+        if not await has_sufficient_margin_async(client, symbol, required):
+            raise ValueError(f"Insufficient balance for grid: {required:.2f} USDT required")
+
+        logger.info("Placing %s grid orders from %s to %s concurrently", grid_count, lower_price, upper_price)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        ledger = get_margin_ledger(client)
+        journal = get_order_journal()
+        job_id = journal.start_job("grid", symbol, side, {"total_quantity": total_quantity, "lower_price": lower_price,
+                                                          "upper_price": upper_price, "grid_count": grid_count})
+
+        async def place_level(level: int, price: float):
+            # The aggregate check above is not atomic with these reservations, so each level re-checks
+            reservation = ledger.reserve(price * slice_quantity)
+            if reservation is None:
+                error = f"Insufficient balance for grid order {level} at price {price}"
+                logger.error("Grid Order %s failed at price %s: %s", level, price, error)
+                return {"level": level, "price": price, "order": None, "error": error}
+            client_order_id = journal.client_order_id(job_id, level)
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    with journal.track(client_order_id, symbol, side, "LIMIT", slice_quantity, price, job_id, "grid",
+                                       level) as entry:
+                        order = await send_order_async(
+                            client,
+                            symbol=symbol, side=side, type="LIMIT", quantity=slice_quantity,
+                            price=str(price), timeInForce="GTC", newClientOrderId=client_order_id
+                        )
+                        entry.record(order)
+                except BinanceAPIException as api_exc:
+                    ledger.release(reservation)
+                    filter_cache.handle_api_error(api_exc)
+                    log_order_rejected(symbol, api_exc.code, api_exc.message, elapsed_ms(started),
+                                       side=side, price=price, strategy="grid", level=level)
+                    logger.error("Grid Order %s failed at price %s: %s (Code: %s)",
+                                 level, price, api_exc.message, api_exc.code)
+                    return {"level": level, "price": price, "order": None, "error": f"{api_exc.message} (Code: {api_exc.code})"}
+                except Exception as e:
+                    # A network error or unknown outcome fails this level only; the others are already in flight
+                    ledger.release(reservation)
+                    logger.error("Grid Order %s failed at price %s: %s", level, price, e)
+                    return {"level": level, "price": price, "order": None, "error": str(e)}
+            ledger.confirm(reservation, order['orderId'])
+            log_order_placed(order, elapsed_ms(started), strategy="grid", level=level)
+            logger.info("Grid Order %s: ID %s, Price: %s, Qty: %s, Status: %s",
+                        level, order['orderId'], price, slice_quantity, order['status'])
+            return {"level": level, "price": price, "order": order, "error": None}
+
+        results = await asyncio.gather(*(place_level(i + 1, p) for i, p in enumerate(prices)))
+        failed = sum(1 for r in results if r["error"])
+        if not failed:
+            journal.finish_job(job_id)
+        print(f"✅ Grid Execution Completed: {grid_count - failed}/{grid_count} levels placed.")
+    except Exception as e:
+        _report_error("Grid", e)
+    return list(results)
+
+async def place_twap_orders_async(symbol: str, side: str, total_quantity: float, num_slices: int, interval: float,
+                                  order_type: str = "MARKET", price_offset_ticks: int = 0):
+    """
+    Async counterpart of place_twap_orders(). The job runs on the loop's shared
+    TwapScheduler, so many TWAPs can run in one process on absolute slice deadlines.
+    Cancelling the call (e.g. a daemon job cancel) unschedules the job's remaining slices.
+
+    Returns:
+        list[dict]: The slice order responses placed.
+    """
+    job = TwapJob(symbol, side, total_quantity, num_slices, interval, order_type, price_offset_ticks)
+    await get_twap_scheduler().run(job)
+    if job.error:
+        _last_error.set(f"Error: TWAP for {symbol} stopped: {job.error}")
+        print(_last_error.get())
+    else:
+        print(f"✅ TWAP Execution Completed for {symbol}.")
+    return job.orders
+
+async def run_concurrently(*coroutines):
+    """
+    Run independent order or strategy coroutines (e.g. several symbols) concurrently.
+
+    Returns:
+        list: Results in the order the coroutines were given.
+    """
+    return await asyncio.gather(*coroutines)
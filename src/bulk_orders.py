@@ -0,0 +1,256 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from binance.exceptions import BinanceAPIException
+from src.utils.api import get_binance_client
+from src.utils.logger import elapsed_ms, log_order_placed, log_order_rejected, setup_logger
+from src.utils.account import reserve_margin
+from src.utils.filters import filter_cache
+from src.utils.journal import get_order_journal
+from src.utils.market_data import market_data
+from src.utils.submission import send_order
+from src.utils.metrics import profile_run
+from src.utils.validation import validate_orders_batch
+
+logger = setup_logger()
+
+DEFAULT_WORKERS = int(os.getenv("BULK_WORKERS", "8"))
+# Orders read and validated together; also bounds how far reading runs ahead of submission.
+DEFAULT_BATCH_SIZE = 500
+
+RESULT_FIELDS = ["line", "symbol", "side", "type", "quantity", "price", "status", "order_id", "client_order_id",
+                 "error", "latency_ms"]
+
+
+def read_orders(path: str):
+    """
+    Stream orders from a CSV (with a header row) or JSONL file, one at a time.
+
+    Each order needs symbol, side and quantity; type defaults to LIMIT when a price is given and
+    MARKET otherwise.
+
+    Yields:
+        tuple[int, dict]: Line number and the raw order fields.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson", ".json")):
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    raw = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, {"_error": f"Malformed JSON: {e}"}
+                    continue
+                yield line_no, raw if isinstance(raw, dict) else {"_error": "Expected a JSON object"}
+        else:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+
+
+def parse_order(line: int, raw: dict) -> dict:
+    """
+    Convert raw fields to an order dict.
+
+    Raises:
+        ValueError: If a field is missing or malformed.
+    """
+    if "_error" in raw:
+        raise ValueError(raw["_error"])
+    try:
+        symbol = str(raw["symbol"]).strip().upper()
+        side = str(raw["side"]).strip().upper()
+        quantity = float(raw["quantity"])
+    except KeyError as e:
+        raise ValueError(f"Missing field {e}")
+    price = raw.get("price")
+    price = float(price) if price not in (None, "") else None
+    order_type = str(raw.get("type") or ("LIMIT" if price is not None else "MARKET")).strip().upper()
+    if side not in ("BUY", "SELL"):
+        raise ValueError(f"Invalid side '{side}'")
+    if order_type not in ("MARKET", "LIMIT"):
+        raise ValueError(f"Unsupported order type '{order_type}'")
+    if order_type == "LIMIT" and price is None:
+        raise ValueError("LIMIT order requires a price")
+    if order_type == "MARKET":
+        price = None
+    return {"line": line, "symbol": symbol, "side": side, "type": order_type, "quantity": quantity, "price": price}
+
+
+def validate_batch(client, orders: list, normalize: bool = False) -> list:
+    """
+    Validate a batch of parsed orders against the cached filters, one vectorised pass per symbol.
+
+    Returns:
+        list[str | None]: Error message per order, None when valid. With normalize=True,
+        valid orders have their price and quantity snapped to the symbol's tick and step.
+    """
+    errors = [None] * len(orders)
+    by_symbol = {}
+    for i, order in enumerate(orders):
+        by_symbol.setdefault(order["symbol"], []).append(i)
+    for symbol, indexes in by_symbol.items():
+        try:
+            filters = filter_cache.get(client, symbol)
+        except ValueError as ve:
+            for i in indexes:
+                errors[i] = str(ve)
+            continue
+        verdicts = validate_orders_batch(filters, [orders[i]["price"] for i in indexes],
+                                         [orders[i]["quantity"] for i in indexes], normalize=normalize)
+        for i, verdict in zip(indexes, verdicts):
+            if not verdict.valid:
+                errors[i] = verdict.error
+            elif normalize:
+                orders[i]["quantity"] = verdict.quantity
+                orders[i]["price"] = verdict.price
+    return errors
+
+
+def submit_order(client, order: dict, job_id: str) -> dict:
+    """Place one validated order and return its result row."""
+    journal = get_order_journal()
+    client_order_id = journal.client_order_id(job_id, order["line"])
+    result = dict(order, status=None, order_id=None, client_order_id=client_order_id, error=None, latency_ms=None)
+    params = {"symbol": order["symbol"], "side": order["side"], "type": order["type"], "quantity": order["quantity"],
+              "newClientOrderId": client_order_id}
+    started = time.perf_counter()
+    try:
+        with journal.track(client_order_id, order["symbol"], order["side"], order["type"], order["quantity"],
+                           order["price"], job_id, "bulk", order["line"]) as entry:
+            if order["type"] == "LIMIT":
+                price = order["price"]
+                params.update(price=price, timeInForce="GTC")
+            else:
+                # MARKET orders are costed at the streamed mark price (REST only when it is stale)
+                price = market_data.get_mark_price(client, order["symbol"])
+            with reserve_margin(client, order["symbol"], order["quantity"] * price,
+                                f"Insufficient balance for order on line {order['line']}.") as reservation:
+                response = send_order(client, **params)
+                reservation.confirm(response['orderId'])
+            entry.record(response)
+        result["latency_ms"] = elapsed_ms(started)
+        result["status"] = response["status"]
+        result["order_id"] = response["orderId"]
+        log_order_placed(response, result["latency_ms"], strategy="bulk", line=order["line"])
+    except ValueError as ve:
+        result["status"] = "INVALID"
+        result["error"] = str(ve)
+    except BinanceAPIException as api_exc:
+        filter_cache.handle_api_error(api_exc)
+        result["latency_ms"] = elapsed_ms(started)
+        result["status"] = "REJECTED"
+        result["error"] = f"{api_exc.message} (Code: {api_exc.code})"
+        log_order_rejected(order["symbol"], api_exc.code, api_exc.message, result["latency_ms"],
+                           side=order["side"], type=order["type"], strategy="bulk", line=order["line"])
+    except Exception as e:
+        result["status"] = "ERROR"
+        result["error"] = str(e)
+        logger.error("Bulk order on line %s failed: %s", order["line"], e)
+    return result
+
+
+class _ResultWriter:
+    """Writes result rows as CSV or JSONL, chosen by the file extension."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._csv = None
+        if not path.endswith((".jsonl", ".ndjson", ".json")):
+            self._csv = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+            self._csv.writeheader()
+
+    def write(self, row: dict) -> None:
+        if self._csv is not None:
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps({k: row.get(k) for k in RESULT_FIELDS}, separators=(",", ":")) + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def run_bulk_orders(path: str, results_path: str = None, workers: int = DEFAULT_WORKERS,
+                    batch_size: int = DEFAULT_BATCH_SIZE, normalize: bool = False) -> dict:
+    """
+    Place every order in a CSV/JSONL file.
+
+    The file is streamed in batches of batch_size orders: each batch is validated against the cached
+    filters in one pass per symbol, and the valid orders are submitted through a pool of `workers`
+    threads (the shared client's rate limiter keeps them inside Binance's limits). At most two
+    batches are in flight, so memory stays flat regardless of the file size. Every order gets one
+    row in the results file, in completion order, keyed by its line number.
+
+    Returns:
+        dict: Counts per result status plus total, elapsed seconds, orders_per_sec and results path.
+    """
+    results_path = results_path or f"{os.path.splitext(path)[0]}.results.csv"
+    client = get_binance_client()
+    job_id = get_order_journal().start_job("bulk", "*", "BOTH", {"file": os.path.abspath(path)})
+    counts = {}
+    writer = _ResultWriter(results_path)
+    in_flight = set()
+    started = time.perf_counter()
+
+    def record(row):
+        counts[row["status"]] = counts.get(row["status"], 0) + 1
+        writer.write(row)
+
+    logger.info("Bulk orders from %s (job %s): %s workers, batches of %s", path, job_id, workers, batch_size)
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk") as pool:
+            raw_orders = read_orders(path)
+            while True:
+                batch = list(itertools.islice(raw_orders, batch_size))
+                if not batch:
+                    break
+                orders = []
+                for line, raw in batch:
+                    try:
+                        orders.append(parse_order(line, raw))
+                    except (ValueError, TypeError) as e:
+                        record({"line": line, "status": "INVALID", "error": str(e), **{k: raw.get(k) for k in
+                                ("symbol", "side", "type", "quantity", "price")}})
+                for order, error in zip(orders, validate_batch(client, orders, normalize)):
+                    if error:
+                        record(dict(order, status="INVALID", error=error))
+                    else:
+                        in_flight.add(pool.submit(submit_order, client, order, job_id))
+                # Keep reading ahead by at most one batch
+                while len(in_flight) > batch_size:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record(future.result())
+            for future in in_flight:
+                record(future.result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    get_order_journal().finish_job(job_id)
+    summary = dict(counts, total=total, elapsed=round(elapsed, 3),
+                   orders_per_sec=round(total / elapsed, 1) if elapsed else None, results=results_path)
+    logger.info("Bulk orders finished: %s", summary)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Place orders from a CSV or JSONL file")
+    parser.add_argument("file", type=str, help="CSV (with header) or JSONL file with symbol, side, quantity[, price, type]")
+    parser.add_argument("--results", type=str, default=None, help="Results file (.csv or .jsonl)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--batch_size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--normalize", action="store_true", help="Snap prices/quantities to tick/step instead of rejecting")
+    parser.add_argument("--profile", type=str, metavar="PATH", help="Write a cProfile trace of the run to PATH")
+    args = parser.parse_args()
+
+    with profile_run(args.profile) if args.profile else nullcontext():
+        summary = run_bulk_orders(args.file, args.results, args.workers, args.batch_size, args.normalize)
+    print(f"✅ Bulk run finished: {summary}")
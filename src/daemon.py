@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import collections
+import itertools
+import os
+import time
+from aiohttp import web
+from src.utils.async_api import close_async_binance_clients, get_async_binance_client
+from src.utils.logger import setup_logger
+from src.utils.filters import filter_cache
+from src.utils.ledger import get_margin_ledger
+from src.utils.market_data import market_data
+from src.utils.metrics import CONTENT_TYPE, metrics
+from src.utils.api import get_binance_client
+from src.utils.user_stream import get_user_stream, stop_user_streams
+from src.async_engine import (
+    last_error,
+    place_market_order_async,
+    place_limit_order_async,
+    place_oco_orders_async,
+    place_grid_orders_async,
+    place_twap_orders_async,
+)
+
+logger = setup_logger()
+
+DEFAULT_HOST = os.getenv("DAEMON_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.getenv("DAEMON_PORT", "8765"))
+# finished jobs kept for GET /jobs; the oldest are dropped beyond this
+JOB_HISTORY = int(os.getenv("DAEMON_JOB_HISTORY", "1000"))
+
+# job type -> (coroutine function, required params, optional params)
+JOB_TYPES = {
+    "market": (place_market_order_async, ["symbol", "side", "quantity"], []),
+    "limit": (place_limit_order_async, ["symbol", "side", "quantity", "price"], []),
+    "oco": (place_oco_orders_async, ["symbol", "side", "quantity", "tp_price", "stop_price"], ["stop_limit_price"]),
+    "grid": (place_grid_orders_async, ["symbol", "side", "total_quantity", "lower_price", "upper_price", "grid_count"], []),
+    "twap": (place_twap_orders_async, ["symbol", "side", "total_quantity", "num_slices", "interval"], ["order_type", "price_offset_ticks"]),
+}
+
+
+async def _run_job(func, params: dict):
+    """Run a job coroutine, raising the engine's reported error if it placed nothing."""
+    result = await func(**params)
+    if not result:
+        raise RuntimeError(last_error() or f"{func.__name__} returned no result")
+    return result
+
+
+class JobManager:
+    """
+    Runs order and strategy jobs concurrently on the daemon's event loop.
+
+    Args:
+        on_finish (callable): Called with the job dict once a job has finished, failed or been cancelled.
+        history (int): Number of finished jobs kept; running jobs are never dropped.
+    """
+
+    def __init__(self, on_finish=None, history: int = JOB_HISTORY):
+        self.jobs = {}
+        self._tasks = {}
+        self._ids = itertools.count(1)
+        self._on_finish = on_finish
+        self._finished = collections.deque()
+        self._history = history
+
+    def submit(self, payload: dict) -> dict:
+        """
+        Validate a job request and start it.
+
+        Raises:
+            ValueError: If the job type is unknown or a required parameter is missing.
+        """
+        job_type = str(payload.get("type", "")).lower()
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Unknown job type '{job_type}'. Expected one of: {', '.join(JOB_TYPES)}.")
+        func, required, optional = JOB_TYPES[job_type]
+        missing = [name for name in required if name not in payload]
+        if missing:
+            raise ValueError(f"Missing parameters for {job_type} job: {', '.join(missing)}")
+
+        params = {name: payload[name] for name in required + optional if name in payload}
+        params["symbol"] = params["symbol"].upper()
+        params["side"] = params["side"].upper()
+        if "order_type" in params:
+            params["order_type"] = params["order_type"].upper()
+
+        job_id = next(self._ids)
+        job = {
+            "id": job_id,
+            "type": job_type,
+            "params": params,
+            "status": "running",
+            "submitted_at": time.time(),
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        self.jobs[job_id] = job
+        task = asyncio.ensure_future(_run_job(func, params))
+        task.add_done_callback(lambda t: self._finish(job_id, t))
+        self._tasks[job_id] = task
+        logger.info("Daemon job %s started: %s %s", job_id, job_type, params)
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        task = self._tasks.get(job_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    def _finish(self, job_id: int, task: asyncio.Task) -> None:
+        job = self.jobs[job_id]
+        job["finished_at"] = time.time()
+        self._tasks.pop(job_id, None)
+        if task.cancelled():
+            job["status"] = "cancelled"
+        elif task.exception() is not None:
+            job["status"] = "failed"
+            job["error"] = str(task.exception())
+        else:
+            job["result"] = task.result()
+            job["status"] = "done"
+        logger.info("Daemon job %s %s in %.3fs", job_id, job['status'], job['finished_at'] - job['submitted_at'])
+        if self._on_finish is not None:
+            self._on_finish(job)
+        self._finished.append(job_id)
+        while len(self._finished) > self._history:
+            self.jobs.pop(self._finished.popleft(), None)
+
+
+def create_app(symbols=None) -> web.Application:
+    """
+    Build the daemon's HTTP application.
+
+    Args:
+        symbols (list[str]): Symbols whose filters and market data are warmed at startup.
+    """
+    manager = JobManager()
+    token = os.getenv("DAEMON_TOKEN")
+    routes = web.RouteTableDef()
+
+    @web.middleware
+    async def auth(request, handler):
+        if token and request.headers.get("X-Auth-Token") != token:
+            return web.json_response({"error": "unauthorized"}, status=401)
+        return await handler(request)
+
+    @routes.get("/health")
+    async def health(request):
+        running = sum(1 for job in manager.jobs.values() if job["status"] == "running")
+        return web.json_response({"status": "ok", "running_jobs": running})
+
+    @routes.get("/metrics")
+    async def prometheus_metrics(request):
+        return web.Response(body=metrics.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+    @routes.post("/jobs")
+    async def submit_job(request):
+        try:
+            payload = await request.json()
+            job = manager.submit(payload)
+        except (ValueError, AttributeError) as e:
+            return web.json_response({"error": str(e)}, status=400)
+        return web.json_response(job, status=202)
+
+    @routes.get("/jobs")
+    async def list_jobs(request):
+        return web.json_response(list(manager.jobs.values()))
+
+    @routes.get(r"/jobs/{job_id:\d+}")
+    async def get_job(request):
+        job = manager.jobs.get(int(request.match_info["job_id"]))
+        if job is None:
+            return web.json_response({"error": "job not found"}, status=404)
+        return web.json_response(job)
+
+    @routes.delete(r"/jobs/{job_id:\d+}")
+    async def cancel_job(request):
+        job_id = int(request.match_info["job_id"])
+        if job_id not in manager.jobs:
+            return web.json_response({"error": "job not found"}, status=404)
+        return web.json_response({"id": job_id, "cancelled": manager.cancel(job_id)})
+
+    async def warm_up(app):
+        client = await get_async_binance_client()
+        if filter_cache.is_stale():
+            filter_cache.update(await client.futures_exchange_info())
+        await get_margin_ledger(client).ensure_loaded_async(client)
+        # Order and account updates (and OCO sibling cancels) arrive on the user-data stream
+        await asyncio.to_thread(get_user_stream, get_binance_client())
+        if symbols:
+            market_data.subscribe(*symbols)
+        logger.info("Daemon ready; warmed symbols: %s", ', '.join(symbols or []) or 'none')
+
+    async def shut_down(app):
+        for job_id in list(manager._tasks):
+            manager.cancel(job_id)
+        market_data.stop()
+        stop_user_streams()
+        await close_async_binance_clients()
+
+    app = web.Application(middlewares=[auth])
+    app["jobs"] = manager
+    app.add_routes(routes)
+    app.on_startup.append(warm_up)
+    app.on_cleanup.append(shut_down)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the trading bot as a long-lived daemon with an HTTP job API")
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--symbols", type=str, default=os.getenv("DAEMON_SYMBOLS", ""),
+                        help="Comma-separated symbols to pre-subscribe (e.g., BTCUSDT,ETHUSDT)")
+    args = parser.parse_args()
+
+    warm_symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    web.run_app(create_app(warm_symbols), host=args.host, port=args.port)
@@ -1,12 +1,15 @@
 import argparse
+import time
 from binance.exceptions import BinanceAPIException
 from src.utils.api import get_binance_client
-from src.utils.logger import setup_logger
-from src.utils.account import has_sufficient_balance
+from src.utils.logger import elapsed_ms, log_order_placed, log_order_rejected, setup_logger
+from src.utils.account import reserve_margin
+from src.utils.filters import filter_cache
+from src.utils.journal import get_order_journal
+from src.utils.submission import send_order
 from src.utils.validation import validate_order_params
 
 logger = setup_logger()
-client = get_binance_client()
 
 def place_limit_order(symbol: str, side: str, quantity: float, price: float):
     """
@@ -19,34 +22,43 @@ def place_limit_order(symbol: str, side: str, quantity: float, price: float):
         price (float): Limit price
     """
     try:
+        client = get_binance_client()
         validate_order_params(client, symbol, quantity, price)
 
-        if not has_sufficient_balance(client, symbol, side, quantity, price):
-            raise ValueError("Insufficient balance to place limit order.")
-
-        order = client.futures_create_order(
-            symbol=symbol,
-            side=side,
-            type='LIMIT',
-            quantity=quantity,
-            price=price,
-            timeInForce='GTC'
-        )
+        journal = get_order_journal()
+        client_order_id = journal.client_order_id()
+        with reserve_margin(client, symbol, quantity * price, "Insufficient balance to place limit order.") as reservation, \
+                journal.track(client_order_id, symbol, side, 'LIMIT', quantity, price, strategy="limit") as entry:
+            started = time.perf_counter()
+            order = send_order(
+                client,
+                symbol=symbol,
+                side=side,
+                type='LIMIT',
+                quantity=quantity,
+                price=price,
+                timeInForce='GTC',
+                newClientOrderId=client_order_id
+            )
+            entry.record(order)
+            reservation.confirm(order['orderId'])
+        log_order_placed(order, elapsed_ms(started))
         logger.info(
-            f"Limit order placed successfully. ID: {order['orderId']}, "
-            f"Symbol: {order['symbol']}, Side: {order['side']}, "
-            f"Quantity: {order['origQty']}, Price: {order['price']}, Status: {order['status']}"
+            "Limit order placed successfully. ID: %s, Symbol: %s, Side: %s, Quantity: %s, Price: %s, Status: %s",
+            order['orderId'], order['symbol'], order['side'], order['origQty'], order['price'], order['status']
         )
         print(f"Success: Limit order placed. Order ID: {order['orderId']}, Status: {order['status']}")
 
     except ValueError as ve:
-        logger.error(f"Validation Error: {ve}")
+        logger.error("Validation Error: %s", ve)
         print(f"Error: {ve}")
     except BinanceAPIException as api_exc:
-        logger.error(f"Binance API Error placing limit order (Code: {api_exc.code}): {api_exc.message}")
+        filter_cache.handle_api_error(api_exc)
+        log_order_rejected(symbol, api_exc.code, api_exc.message, side=side, type="LIMIT", price=price)
+        logger.error("Binance API Error placing limit order (Code: %s): %s", api_exc.code, api_exc.message)
         print(f"Binance API Error: {api_exc.message} (Code: {api_exc.code})")
     except Exception as e:
-        logger.critical(f"Unexpected error placing limit order: {e}", exc_info=True)
+        logger.critical("Unexpected error placing limit order: %s", e, exc_info=True)
         print(f"Unexpected error: {e}")
 
 if __name__ == "__main__":
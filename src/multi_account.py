@@ -0,0 +1,335 @@
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+DEFAULT_ACCOUNTS_FILE = os.getenv("ACCOUNTS_FILE", "accounts.json")
+# Seconds to wait for every worker to load filters, balances and its user-data stream.
+START_TIMEOUT = 60.0
+
+
+def load_accounts(path: str) -> list:
+    """
+    Read the accounts config: {"accounts": [{"name", "api_key", "api_secret", ...}, ...]}.
+
+    Keys can be given inline or, to keep secrets out of the file, as the names of environment
+    variables (`api_key_env`, `api_secret_env`). Optional per-account fields: `testnet`,
+    `simulator` (run the account against a local SimulatedExchange) and `journal`.
+
+    Raises:
+        ValueError: If the file is malformed, a name is missing or repeated, or keys are missing.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Could not read accounts file {path}: {e}")
+    accounts = config.get("accounts") if isinstance(config, dict) else config
+    if not accounts:
+        raise ValueError(f"No accounts defined in {path}.")
+    names = set()
+    for account in accounts:
+        name = account.get("name")
+        if not name or name in names:
+            raise ValueError(f"Every account needs a unique name (got {name!r}).")
+        names.add(name)
+        if not account.get("simulator"):
+            for field in ("api_key", "api_secret"):
+                if not account.get(field) and not os.getenv(account.get(f"{field}_env", ""), ""):
+                    raise ValueError(f"Account '{name}' has no {field} (or {field}_env).")
+    return accounts
+
+
+def _account_path(path: str, name: str) -> str:
+    """bot.log -> bot.<name>.log, so worker processes never share a log, event or journal file."""
+    if not path or path == ":memory:":
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{name}{ext}"
+
+
+def _account_env(account: dict) -> dict:
+    """Environment a worker process needs to trade as `account`."""
+    name = account["name"]
+    env = {
+        "BINANCE_API_KEY": account.get("api_key") or os.getenv(account.get("api_key_env", ""), ""),
+        "BINANCE_API_SECRET": account.get("api_secret") or os.getenv(account.get("api_secret_env", ""), ""),
+        "BINANCE_SIMULATOR": str(bool(account.get("simulator", False))),
+        "ORDER_JOURNAL_PATH": account.get("journal") or _account_path(os.getenv("ORDER_JOURNAL_PATH", "orders.db"), name),
+        "LOG_FILE": _account_path(os.getenv("LOG_FILE", "bot.log"), name),
+        "ORDER_EVENTS_FILE": _account_path(os.getenv("ORDER_EVENTS_FILE", "orders.jsonl"), name),
+    }
+    if "testnet" in account:
+        env["BINANCE_TESTNET"] = str(bool(account["testnet"]))
+    return env
+
+
+@contextmanager
+def _environment(env: dict):
+    """Temporarily set environment variables (spawned processes inherit them at start)."""
+    saved = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def _worker_main(name: str, jobs, results) -> None:
+    """
+    Entry point of one account's worker process.
+
+    The process is spawned with the account's keys in its environment, so every module reads
+    them at import and every get_binance_client() call returns this account's client, with its
+    own rate limiter, margin ledger and order journal.
+    """
+    asyncio.run(_serve(name, jobs, results))
+
+
+async def _serve(name: str, jobs, results) -> None:
+    from src.daemon import JobManager
+    from src.utils.api import get_binance_client
+    from src.utils.async_api import close_async_binance_clients, get_async_binance_client
+    from src.utils.filters import filter_cache
+    from src.utils.ledger import get_margin_ledger
+    from src.utils.logger import stop_logging
+    from src.utils.market_data import market_data
+    from src.utils.user_stream import get_user_stream, stop_user_streams
+
+    loop = asyncio.get_running_loop()
+    coordinator_ids = {}
+
+    def finished(job):
+        results.put(("job", coordinator_ids.pop(job["id"]), dict(job, account=name)))
+
+    manager = JobManager(on_finish=finished)
+    try:
+        client = await get_async_binance_client()
+        if filter_cache.is_stale():
+            filter_cache.update(await client.futures_exchange_info())
+        await get_margin_ledger(client).ensure_loaded_async(client)
+        await asyncio.to_thread(get_user_stream, get_binance_client())
+    except Exception as e:
+        results.put(("failed", name, str(e)))
+        return
+    results.put(("ready", name, os.getpid()))
+
+    try:
+        while True:
+            message = await loop.run_in_executor(None, jobs.get)
+            if message is None:
+                break
+            job_id, payload = message
+            try:
+                job = manager.submit(payload)
+            except (ValueError, AttributeError) as e:
+                results.put(("job", job_id, {"status": "rejected", "error": str(e), "account": name}))
+                continue
+            coordinator_ids[job["id"]] = job_id
+        if manager._tasks:
+            await asyncio.gather(*manager._tasks.values(), return_exceptions=True)
+    finally:
+        market_data.stop()
+        stop_user_streams()
+        await close_async_binance_clients()
+        stop_logging()
+
+
+class AccountCoordinator:
+    """
+    Runs one worker process per account and routes order and strategy jobs to them.
+
+    Each worker runs the daemon's JobManager on its own event loop, with its own client, rate
+    limiter, margin ledger, user-data stream and journal, so accounts trade in parallel across
+    cores and each is limited only by its own API limits. Jobs use the daemon's job payloads
+    ({"type": "limit", "symbol": ..., ...}); an optional "account" field pins a job to an
+    account, otherwise it goes to the account with the fewest outstanding jobs.
+
+    Use as a context manager, or call start() and stop().
+    """
+
+    def __init__(self, accounts: list, start_timeout: float = START_TIMEOUT):
+        self.accounts = {account["name"]: account for account in accounts}
+        self.start_timeout = start_timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._results = self._context.Queue()
+        self._queues = {}
+        self._processes = {}
+        self._pending = {}
+        self._outstanding = {name: 0 for name in self.accounts}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._collector = None
+        self._stopping = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self) -> None:
+        """
+        Start every worker and wait until all of them are ready.
+
+        Raises:
+            RuntimeError: If a worker fails to start or does not become ready in time.
+        """
+        for name, account in self.accounts.items():
+            jobs = self._context.Queue()
+            process = self._context.Process(target=_worker_main, args=(name, jobs, self._results),
+                                            name=f"account-{name}", daemon=True)
+            with _environment(_account_env(account)):
+                process.start()
+            self._queues[name] = jobs
+            self._processes[name] = process
+
+        waiting = set(self.accounts)
+        deadline = time.monotonic() + self.start_timeout
+        while waiting:
+            try:
+                kind, name, detail = self._results.get(timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Empty:
+                self.stop()
+                raise RuntimeError(f"Account workers not ready after {self.start_timeout}s: {', '.join(sorted(waiting))}")
+            if kind == "failed":
+                self.stop()
+                raise RuntimeError(f"Account '{name}' failed to start: {detail}")
+            waiting.discard(name)
+            logger.info("Account worker %s ready (pid %s)", name, detail)
+
+        self._collector = threading.Thread(target=self._collect, name="account-results", daemon=True)
+        self._collector.start()
+
+    def submit(self, payload: dict, account: str = None) -> Future:
+        """
+        Send a job to an account's worker.
+
+        Returns:
+            Future: Resolves to the finished job dict (status, result, error, account).
+
+        Raises:
+            ValueError: If the account is unknown.
+            RuntimeError: If the account's worker (or, unpinned, every worker) has exited.
+        """
+        account = account or payload.get("account")
+        with self._lock:
+            if account is None:
+                alive = [name for name, process in self._processes.items() if process.is_alive()]
+                if not alive:
+                    raise RuntimeError("No account workers are running.")
+                account = min(alive, key=self._outstanding.get)
+            elif account not in self.accounts:
+                raise ValueError(f"Unknown account '{account}'.")
+            elif not self._processes[account].is_alive():
+                raise RuntimeError(f"Account worker '{account}' is not running.")
+            job_id = next(self._ids)
+            future = Future()
+            self._pending[job_id] = (account, future)
+            self._outstanding[account] += 1
+        self._queues[account].put((job_id, {k: v for k, v in payload.items() if k != "account"}))
+        return future
+
+    def run(self, payloads) -> list:
+        """Submit every job and wait for all of them; returns the job dicts in input order."""
+        futures = [self.submit(payload) for payload in payloads]
+        return [future.result() for future in futures]
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Let workers finish their running jobs, then shut them down."""
+        self._stopping = True
+        for jobs in self._queues.values():
+            jobs.put(None)
+        deadline = time.monotonic() + timeout
+        for name, process in self._processes.items():
+            process.join(max(deadline - time.monotonic(), 0.1))
+            if process.is_alive():
+                logger.warning("Account worker %s did not stop in time; terminating", name)
+                process.terminate()
+        if self._collector is not None:
+            self._collector.join(timeout=2)
+        self._fail_pending(lambda account: True, "Coordinator stopped")
+
+    def _collect(self) -> None:
+        while True:
+            try:
+                kind, job_id, job = self._results.get(timeout=1.0)
+            except queue.Empty:
+                dead = {name for name, process in self._processes.items() if not process.is_alive()}
+                if dead:
+                    self._fail_pending(dead.__contains__, "Account worker exited")
+                if self._stopping and len(dead) == len(self._processes):
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+            if kind != "job":
+                continue
+            with self._lock:
+                account, future = self._pending.pop(job_id, (None, None))
+                if account is not None:
+                    self._outstanding[account] -= 1
+            if future is not None:
+                future.set_result(job)
+
+    def _fail_pending(self, matches, reason: str) -> None:
+        with self._lock:
+            failed = [(job_id, entry) for job_id, entry in self._pending.items() if matches(entry[0])]
+            for job_id, (account, _) in failed:
+                del self._pending[job_id]
+                self._outstanding[account] -= 1
+        for job_id, (account, future) in failed:
+            future.set_exception(RuntimeError(f"{reason} before job {job_id} on account '{account}' finished."))
+
+
+def read_jobs(path: str):
+    """Yield job payloads from a JSONL file, one JSON object per line."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run order and strategy jobs across several accounts, one process each")
+    parser.add_argument("jobs", type=str, help="JSONL file of jobs, e.g. {\"type\": \"limit\", \"symbol\": ..., \"account\": \"main\"}")
+    parser.add_argument("--accounts", type=str, default=DEFAULT_ACCOUNTS_FILE, help="Accounts config (JSON)")
+    parser.add_argument("--results", type=str, default=None, help="Write finished jobs to this JSONL file")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with AccountCoordinator(load_accounts(args.accounts)) as coordinator:
+        futures = [coordinator.submit(payload) for payload in read_jobs(args.jobs)]
+        jobs = []
+        for future in futures:
+            try:
+                jobs.append(future.result())
+            except RuntimeError as e:
+                jobs.append({"status": "lost", "error": str(e)})
+    elapsed = time.perf_counter() - started
+
+    if args.results:
+        with open(args.results, "w", encoding="utf-8") as f:
+            for job in jobs:
+                f.write(json.dumps(job, default=str) + "\n")
+    summary = {}
+    for job in jobs:
+        counts = summary.setdefault(job.get("account", "?"), {})
+        counts[job["status"]] = counts.get(job["status"], 0) + 1
+    print(f"✅ {len(jobs)} jobs in {elapsed:.2f}s: {summary}")
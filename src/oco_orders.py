@@ -1,17 +1,24 @@
 import argparse
+import time
 from binance.exceptions import BinanceAPIException
 from src.utils.api import get_binance_client
-from src.utils.logger import setup_logger
-from src.utils.account import has_sufficient_balance
+from src.utils.logger import elapsed_ms, log_order_placed, log_order_rejected, setup_logger
+from src.utils.account import reserve_margin
+from src.utils.filters import filter_cache
+from src.utils.journal import get_order_journal
+from src.utils.submission import send_order
+from src.utils.user_stream import get_user_stream
 from src.utils.validation import validate_order_params
 
 logger = setup_logger()
-client = get_binance_client()
 
 def place_oco_orders(symbol: str, side: str, quantity: float, tp_price: float, stop_price: float, stop_limit_price: float):
     """
     Simulates OCO (One-Cancels-the-Other) orders on Binance Futures.
-    Places a LIMIT order for take-profit and a STOP-MARKET order for stop-loss.
+    Places a LIMIT order for take-profit and a STOP-MARKET order for stop-loss, and registers
+    the pair with the user-data stream, which cancels the other leg as soon as one fills.
+    The stream runs in this process, so the process must stay up until the pair closes. If the stream
+    does not connect, no leg is placed.
 
     Args:
         symbol (str): Trading pair symbol (e.g., BTCUSDT).
@@ -20,47 +27,96 @@ def place_oco_orders(symbol: str, side: str, quantity: float, tp_price: float, s
         tp_price (float): Take-Profit limit price.
         stop_price (float): Stop trigger price for the stop-market order.
         stop_limit_price (float): (Unused in STOP_MARKET) Reserved for STOP_LIMIT support.
+
+    Returns:
+        OcoPair | None: The watched pair, or None if the orders were not placed.
     """
     try:
+        client = get_binance_client()
         validate_order_params(client, symbol, quantity, tp_price)
         validate_order_params(client, symbol, quantity, stop_price)
 
-        if not has_sufficient_balance(client, symbol, side, quantity, max(tp_price, stop_price)):
-            raise ValueError("Insufficient balance for OCO order.")
-
-        # Place Take-Profit LIMIT order
-        limit_order = client.futures_create_order(
-            symbol=symbol,
-            side=side,
-            type="LIMIT",
-            quantity=quantity,
-            price=str(tp_price),
-            timeInForce="GTC"
-        )
-        logger.info(f"Take-Profit LIMIT order placed. ID: {limit_order['orderId']}, Price: {tp_price}")
+        # Only one leg can execute, so a single reservation covers the pair
+        required = quantity * max(tp_price, stop_price)
+        journal = get_order_journal()
+        # Listen before placing the legs so a fill arriving straight away is not missed
+        stream = get_user_stream(client, start=False)
+        if not stream.start():
+            raise ValueError("User data stream did not connect; OCO legs not placed because nothing could cancel the sibling.")
+        with reserve_margin(client, symbol, required, "Insufficient balance for OCO order.") as reservation:
+            # Place Take-Profit LIMIT order
+            client_order_id = journal.client_order_id()
+            with journal.track(client_order_id, symbol, side, "LIMIT", quantity, tp_price, strategy="oco") as entry:
+                started = time.perf_counter()
+                limit_order = send_order(
+                    client,
+                    symbol=symbol,
+                    side=side,
+                    type="LIMIT",
+                    quantity=quantity,
+                    price=str(tp_price),
+                    timeInForce="GTC",
+                    newClientOrderId=client_order_id
+                )
+                entry.record(limit_order)
+            reservation.confirm(limit_order['orderId'])
+            log_order_placed(limit_order, elapsed_ms(started), leg="take_profit")
+            logger.info("Take-Profit LIMIT order placed. ID: %s, Price: %s", limit_order['orderId'], tp_price)
 
-        # Place Stop-MARKET order
-        stop_order = client.futures_create_order(
-            symbol=symbol,
-            side=side,
-            type="STOP_MARKET",
-            stopPrice=str(stop_price),
-            quantity=quantity,
-            workingType="MARK_PRICE"
-        )
-        logger.info(f"Stop-MARKET order placed. ID: {stop_order['orderId']}, Stop: {stop_price}")
+            # Place Stop-MARKET order
+            client_order_id = journal.client_order_id()
+            try:
+                with journal.track(client_order_id, symbol, side, "STOP_MARKET", quantity, stop_price, strategy="oco") as entry:
+                    started = time.perf_counter()
+                    stop_order = send_order(
+                        client,
+                        symbol=symbol,
+                        side=side,
+                        type="STOP_MARKET",
+                        stopPrice=str(stop_price),
+                        quantity=quantity,
+                        workingType="MARK_PRICE",
+                        newClientOrderId=client_order_id
+                    )
+                    entry.record(stop_order)
+            except BinanceAPIException:
+                # Never leave the take-profit leg working on its own
+                client.futures_cancel_order(symbol=symbol, orderId=limit_order['orderId'])
+                logger.info("Cancelled take-profit leg %s after the stop leg was rejected", limit_order['orderId'])
+                raise
+            reservation.confirm(stop_order['orderId'])
+            log_order_placed(stop_order, elapsed_ms(started), leg="stop")
+            logger.info("Stop-MARKET order placed. ID: %s, Stop: %s", stop_order['orderId'], stop_price)
 
+        pair = stream.oco.register(symbol, limit_order, stop_order)
         print(f"✅ OCO simulated: LIMIT Order ID: {limit_order['orderId']}, STOP-MARKET Order ID: {stop_order['orderId']}")
+        return pair
 
     except ValueError as ve:
-        logger.error(f"Validation Error: {ve}")
+        logger.error("Validation Error: %s", ve)
         print(f"Error: {ve}")
     except BinanceAPIException as api_exc:
-        logger.error(f"Binance API Error (Code: {api_exc.code}): {api_exc.message}")
+        filter_cache.handle_api_error(api_exc)
+        log_order_rejected(symbol, api_exc.code, api_exc.message, side=side, strategy="oco")
+        logger.error("Binance API Error (Code: %s): %s", api_exc.code, api_exc.message)
         print(f"Binance API Error: {api_exc.message} (Code: {api_exc.code})")
     except Exception as e:
-        logger.critical(f"Unexpected error placing OCO orders: {e}", exc_info=True)
+        logger.critical("Unexpected error placing OCO orders: %s", e, exc_info=True)
         print(f"Unexpected error: {e}")
+    return None
+
+def watch_oco_pair(pair, no_watch: bool = False) -> None:
+    """Keep the process (and its user-data stream) up until the pair closes, or warn that it is unmanaged."""
+    if no_watch:
+        logger.warning("OCO pair %s/%s left unmanaged", pair.take_profit_id, pair.stop_id)
+        print("⚠️ Not watching: the legs stay open and nothing cancels the sibling when one fills. Cancel it yourself.")
+        return
+    print("Watching OCO pair; press Ctrl+C to stop (the legs stay open).")
+    try:
+        pair.wait()
+        print(f"✅ OCO closed by order {pair.closed_by}; sibling cancelled: {pair.sibling_cancelled}")
+    except KeyboardInterrupt:
+        print("⚠️ Stopped watching: the legs stay open and nothing cancels the sibling when one fills.")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Simulate OCO order on Binance Futures")
@@ -70,14 +126,19 @@ if __name__ == "__main__":
     parser.add_argument("tp_price", type=float, help="Take-Profit price")
     parser.add_argument("stop_price", type=float, help="Stop trigger price")
     parser.add_argument("stop_limit_price", type=float, help="Stop limit execution price (unused)")
+    parser.add_argument("--no_watch", action="store_true",
+                        help="Exit once the legs are placed; nothing cancels the sibling when one fills")
 
     args = parser.parse_args()
 
-    place_oco_orders(
+    pair = place_oco_orders(
         args.symbol.upper(),
         args.side.upper(),
         args.quantity,
         args.tp_price,
         args.stop_price,
         args.stop_limit_price
-    )
\ No newline at end of file
+    )
+
+    if pair is not None:
+        watch_oco_pair(pair, args.no_watch)
@@ -0,0 +1,4 @@
+from src.simulator.order_book import BookOrder, OrderBook
+from src.simulator.exchange import AsyncSimulatedExchange, SimulatedExchange
+
+__all__ = ["AsyncSimulatedExchange", "BookOrder", "OrderBook", "SimulatedExchange"]
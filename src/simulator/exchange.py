@@ -0,0 +1,514 @@
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from binance.exceptions import BinanceAPIException
+from src.simulator.order_book import BookOrder, OrderBook
+from src.utils.filters import parse_exchange_info
+from src.utils.validation import check_order_params
+
+# Per-symbol market configuration used when none is supplied.
+DEFAULT_SYMBOLS = {
+    "BTCUSDT": {"price": 60000.0, "tick_size": "0.10", "step_size": "0.001", "min_qty": "0.001", "min_notional": "100"},
+    "ETHUSDT": {"price": 3000.0, "tick_size": "0.01", "step_size": "0.001", "min_qty": "0.001", "min_notional": "20"},
+}
+
+OPEN_STATUSES = {"NEW", "PARTIALLY_FILLED"}
+BATCH_ORDER_LIMIT = 5
+
+
+def api_error(code: int, msg: str, status_code: int = 400) -> BinanceAPIException:
+    """Build a BinanceAPIException shaped like a real exchange rejection."""
+    return BinanceAPIException(None, status_code, json.dumps({"code": code, "msg": msg}))
+
+
+class SimulatedExchange:
+    """
+    Local stand-in for the python-binance futures Client.
+
+    Implements the client methods the bot uses (orders, batch orders, cancels,
+    exchange info, balances, mark price, depth) on top of an in-memory
+    price-time-priority order book per symbol, seeded with synthetic external
+    liquidity around a mark price. Supports latency injection, records call
+    counts per endpoint, and emits ORDER_TRADE_UPDATE / ACCOUNT_UPDATE events in
+    the user-data-stream format to registered listeners.
+    """
+
+    API_KEY = "simulator"
+
+    def __init__(self, symbols: dict = None, balance: float = 100000.0, leverage: int = 20, latency: float = 0.0,
+                 jitter: float = 0.0, taker_fee: float = 0.0004, maker_fee: float = 0.0002,
+                 liquidity_levels: int = 20, liquidity_qty: float = 5.0, seed: int = None):
+        self.symbols = symbols or DEFAULT_SYMBOLS
+        self.wallet = balance
+        self.leverage = leverage
+        self.latency = latency
+        self.jitter = jitter
+        self.taker_fee = taker_fee
+        self.maker_fee = maker_fee
+        self.liquidity_levels = liquidity_levels
+        self.liquidity_qty = liquidity_qty
+        self.call_counts = Counter()
+        self.response = None
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1000000)
+        self._orders = {}
+        self._client_ids = {}
+        self._stops = {}
+        self._order_margin = {}
+        self._open_margin = 0.0
+        self._positions = {}
+        self._listeners = []
+        self._books = {}
+        self._marks = {}
+        self._exchange_info = self._build_exchange_info()
+        self._filters = parse_exchange_info(self._exchange_info)
+        for symbol, config in self.symbols.items():
+            self._books[symbol] = OrderBook(symbol)
+            self._marks[symbol] = float(config["price"])
+            self._seed_liquidity(symbol)
+
+    # ----- python-binance compatible endpoints -----
+
+    def futures_ping(self, **params):
+        return self._call("futures_ping", params)
+
+    def futures_exchange_info(self, **params):
+        return self._call("futures_exchange_info", params)
+
+    def futures_account_balance(self, **params):
+        return self._call("futures_account_balance", params)
+
+    def futures_mark_price(self, **params):
+        return self._call("futures_mark_price", params)
+
+    def futures_order_book(self, **params):
+        return self._call("futures_order_book", params)
+
+    def futures_create_order(self, **params):
+        return self._call("futures_create_order", params)
+
+    def futures_place_batch_order(self, **params):
+        return self._call("futures_place_batch_order", params)
+
+    def futures_cancel_order(self, **params):
+        return self._call("futures_cancel_order", params)
+
+    def futures_get_order(self, **params):
+        return self._call("futures_get_order", params)
+
+    def futures_get_open_orders(self, **params):
+        return self._call("futures_get_open_orders", params)
+
+    def futures_stream_get_listen_key(self, **params):
+        return self._call("futures_stream_get_listen_key", params)
+
+    def futures_stream_keepalive(self, **params):
+        return self._call("futures_stream_keepalive", params)
+
+    def close_connection(self):
+        pass
+
+    # ----- simulation controls -----
+
+    def add_listener(self, callback) -> None:
+        """Register a callback that receives user-data-stream style event dicts."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback) -> None:
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def set_mark_price(self, symbol: str, price: float) -> None:
+        """
+        Move the market to `price`: resting user orders the move trades through are
+        filled, triggered stop orders execute, and external liquidity is re-centred.
+        """
+        with self._lock:
+            book = self._books[symbol]
+            old = self._marks[symbol]
+            self._marks[symbol] = price
+            for order in self._external_orders(symbol):
+                book.remove(order.order_id)
+            side = "BUY" if price < old else "SELL"
+            for resting in book.crossed_by(side, price):
+                book.remove(resting.order_id)
+                self._fill_user_order(resting.order_id, resting.remaining, resting.price, maker=True)
+            self._seed_liquidity(symbol)
+            self._trigger_stops(symbol)
+
+    def random_walk(self, symbol: str, steps: int = 1, volatility: float = 0.001) -> float:
+        """Move the mark price by `steps` Gaussian steps of relative size `volatility`."""
+        price = self._marks[symbol]
+        tick = float(self._filters[symbol].tick_size)
+        for _ in range(steps):
+            price = max(tick, round(round(price * (1 + self._rng.gauss(0, volatility)) / tick) * tick, 8))
+            self.set_mark_price(symbol, price)
+        return price
+
+    def get_position(self, symbol: str):
+        """Return (quantity, entry_price) of the simulated position; quantity is negative when short."""
+        return self._positions.get(symbol, (0.0, 0.0))
+
+    # ----- internals -----
+
+    def _call(self, name: str, params: dict):
+        self.call_counts[name] += 1
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        return self.dispatch(name, params)
+
+    def dispatch(self, name: str, params: dict):
+        """Execute an endpoint without latency injection."""
+        handler = getattr(self, "_handle_" + name[len("futures_"):])
+        with self._lock:
+            return handler(dict(params))
+
+    def _handle_ping(self, params):
+        return {}
+
+    def _handle_exchange_info(self, params):
+        return self._exchange_info
+
+    def _handle_account_balance(self, params):
+        return [{
+            "accountAlias": "SIM",
+            "asset": "USDT",
+            "balance": f"{self.wallet:.8f}",
+            "crossWalletBalance": f"{self.wallet:.8f}",
+            "availableBalance": f"{self._available():.8f}",
+            "updateTime": self._now(),
+        }]
+
+    def _handle_mark_price(self, params):
+        symbol = params.get("symbol")
+        if symbol is None:
+            return [{"symbol": s, "markPrice": f"{p}", "time": self._now()} for s, p in self._marks.items()]
+        self._require_symbol(symbol)
+        return {"symbol": symbol, "markPrice": f"{self._marks[symbol]}", "time": self._now()}
+
+    def _handle_order_book(self, params):
+        symbol = params["symbol"]
+        self._require_symbol(symbol)
+        book = self._books[symbol]
+        bids, asks = book.depth(int(params.get("limit", 500)))
+        return {
+            "lastUpdateId": book.update_id,
+            "E": self._now(),
+            "T": self._now(),
+            "bids": [[f"{p}", f"{q}"] for p, q in bids],
+            "asks": [[f"{p}", f"{q}"] for p, q in asks],
+        }
+
+    def _handle_stream_get_listen_key(self, params):
+        return "simulated-listen-key"
+
+    def _handle_stream_keepalive(self, params):
+        return {}
+
+    def _handle_get_open_orders(self, params):
+        symbol = params.get("symbol")
+        return [dict(o) for o in self._orders.values()
+                if o["status"] in OPEN_STATUSES and (symbol is None or o["symbol"] == symbol)]
+
+    def _handle_get_order(self, params):
+        return dict(self._find_order(params, -2013, "Order does not exist."))
+
+    def _handle_cancel_order(self, params):
+        order = self._find_order(params, -2011, "Unknown order sent.")
+        if order["status"] not in OPEN_STATUSES:
+            raise api_error(-2011, "Unknown order sent.")
+        self._books[order["symbol"]].remove(order["orderId"])
+        self._stops.pop(order["orderId"], None)
+        self._set_status(order, "CANCELED", "CANCELED")
+        return dict(order)
+
+    def _handle_place_batch_order(self, params):
+        batch = params["batchOrders"]
+        if isinstance(batch, str):
+            batch = json.loads(batch)
+        if len(batch) > BATCH_ORDER_LIMIT:
+            raise api_error(-1130, "Data sent for parameter 'batchOrders' is not valid.")
+        results = []
+        for order_params in batch:
+            try:
+                results.append(self._handle_create_order(dict(order_params)))
+            except BinanceAPIException as exc:
+                results.append({"code": exc.code, "msg": exc.message})
+        return results
+
+    def _handle_create_order(self, params):
+        symbol = params.get("symbol")
+        self._require_symbol(symbol)
+        side = params.get("side")
+        order_type = params.get("type")
+        if side not in ("BUY", "SELL"):
+            raise api_error(-1117, "Invalid side.")
+        if order_type not in ("MARKET", "LIMIT", "STOP_MARKET", "TAKE_PROFIT_MARKET"):
+            raise api_error(-1116, "Invalid orderType.")
+
+        client_order_id = params.get("newClientOrderId") or f"sim-{next(self._ids)}"
+        existing = self._client_ids.get(client_order_id)
+        if existing is not None and self._orders[existing]["status"] in OPEN_STATUSES:
+            raise api_error(-4116, "ClientOrderId is duplicated.")
+
+        quantity = float(params.get("quantity", 0))
+        price = float(params["price"]) if params.get("price") not in (None, "") else None
+        stop_price = float(params["stopPrice"]) if params.get("stopPrice") not in (None, "") else None
+        if order_type == "LIMIT" and price is None:
+            raise api_error(-1102, "Mandatory parameter 'price' was not sent, was empty/null, or malformed.")
+        if order_type in ("STOP_MARKET", "TAKE_PROFIT_MARKET") and stop_price is None:
+            raise api_error(-1102, "Mandatory parameter 'stopPrice' was not sent, was empty/null, or malformed.")
+        try:
+            check_order_params(self._filters[symbol], quantity, price if order_type == "LIMIT" else None)
+        except ValueError as e:
+            raise api_error(-1013, str(e))
+
+        reference = price if order_type == "LIMIT" else self._marks[symbol]
+        if quantity * reference / self.leverage > self._available():
+            raise api_error(-2019, "Margin is insufficient.")
+
+        time_in_force = params.get("timeInForce") or ("GTC" if order_type == "LIMIT" else None)
+        order_id = next(self._ids)
+        order = {
+            "orderId": order_id,
+            "symbol": symbol,
+            "status": "NEW",
+            "clientOrderId": client_order_id,
+            "price": f"{price or 0}",
+            "avgPrice": "0",
+            "origQty": f"{quantity}",
+            "executedQty": "0",
+            "cumQuote": "0",
+            "timeInForce": time_in_force or "GTC",
+            "type": order_type,
+            "side": side,
+            "stopPrice": f"{stop_price or 0}",
+            "workingType": params.get("workingType", "CONTRACT_PRICE"),
+            "origType": order_type,
+            "updateTime": self._now(),
+        }
+        self._orders[order_id] = order
+        self._client_ids[client_order_id] = order_id
+        self._track_margin(order)
+        self._emit_order(order, "NEW")
+
+        if order_type == "MARKET":
+            self._execute_taker(order, quantity, None)
+            if float(order["executedQty"]) < quantity:
+                self._set_status(order, "EXPIRED", "EXPIRED")
+        elif order_type == "LIMIT":
+            book = self._books[symbol]
+            opposite = book.best("SELL" if side == "BUY" else "BUY")
+            crosses = opposite is not None and (price >= opposite if side == "BUY" else price <= opposite)
+            if time_in_force == "GTX" and crosses:
+                self._set_status(order, "EXPIRED", "EXPIRED")
+                raise api_error(-5022, "Due to the order could not be executed as maker, the Post Only order will be rejected.")
+            self._execute_taker(order, quantity, price)
+            remaining = quantity - float(order["executedQty"])
+            if remaining > 1e-12:
+                if time_in_force in ("IOC", "FOK"):
+                    self._set_status(order, "EXPIRED", "EXPIRED")
+                else:
+                    book.add(BookOrder(order_id, client_order_id, side, price, quantity, "user", order_id))
+                    book.get(order_id).filled = float(order["executedQty"])
+        else:
+            self._stops[order_id] = order
+            self._trigger_stops(symbol)
+        return dict(order)
+
+    def _execute_taker(self, order: dict, quantity: float, limit_price):
+        book = self._books[order["symbol"]]
+        for resting, qty, price in book.match(order["side"], quantity, limit_price):
+            if resting.owner == "user":
+                self._apply_fill(self._orders[resting.order_id], qty, price, maker=True)
+            self._apply_fill(order, qty, price, maker=False)
+
+    def _fill_user_order(self, order_id, qty: float, price: float, maker: bool):
+        self._apply_fill(self._orders[order_id], qty, price, maker)
+
+    def _apply_fill(self, order: dict, qty: float, price: float, maker: bool):
+        executed = float(order["executedQty"]) + qty
+        cum_quote = float(order["cumQuote"]) + qty * price
+        order["executedQty"] = f"{executed:.8f}".rstrip("0").rstrip(".")
+        order["cumQuote"] = f"{cum_quote:.8f}"
+        order["avgPrice"] = f"{cum_quote / executed:.8f}"
+        order["updateTime"] = self._now()
+        fee = qty * price * (self.maker_fee if maker else self.taker_fee)
+        realized = self._update_position(order["symbol"], qty if order["side"] == "BUY" else -qty, price)
+        self.wallet += realized - fee
+        order["status"] = "FILLED" if executed >= float(order["origQty"]) - 1e-12 else "PARTIALLY_FILLED"
+        self._track_margin(order)
+        self._emit_order(order, "TRADE", last_qty=qty, last_price=price, fee=fee, maker=maker, realized=realized)
+        self._emit_account(order["symbol"])
+
+    def _update_position(self, symbol: str, delta: float, price: float) -> float:
+        qty, entry = self._positions.get(symbol, (0.0, 0.0))
+        realized = 0.0
+        if qty == 0 or (qty > 0) == (delta > 0):
+            new_qty = qty + delta
+            entry = (qty * entry + delta * price) / new_qty
+        else:
+            closed = min(abs(delta), abs(qty))
+            realized = closed * (price - entry) * (1 if qty > 0 else -1)
+            new_qty = qty + delta
+            if abs(new_qty) > 1e-12 and (new_qty > 0) != (qty > 0):
+                entry = price
+        self._positions[symbol] = (new_qty, entry if abs(new_qty) > 1e-12 else 0.0)
+        return realized
+
+    def _trigger_stops(self, symbol: str):
+        mark = self._marks[symbol]
+        for order_id, order in list(self._stops.items()):
+            if order["symbol"] != symbol:
+                continue
+            stop = float(order["stopPrice"])
+            rising = (order["type"] == "STOP_MARKET") == (order["side"] == "BUY")
+            if (mark >= stop) if rising else (mark <= stop):
+                del self._stops[order_id]
+                quantity = float(order["origQty"])
+                self._execute_taker(order, quantity, None)
+                if float(order["executedQty"]) < quantity:
+                    self._set_status(order, "EXPIRED", "EXPIRED")
+
+    def _seed_liquidity(self, symbol: str):
+        if not self.liquidity_levels:
+            return
+        book = self._books[symbol]
+        mark = self._marks[symbol]
+        tick = float(self._filters[symbol].tick_size)
+        for i in range(1, self.liquidity_levels + 1):
+            for side, price in (("BUY", mark - i * tick), ("SELL", mark + i * tick)):
+                order_id = f"ext-{next(self._ids)}"
+                book.add(BookOrder(order_id, order_id, side, round(price, 8), self.liquidity_qty, "external", 0))
+
+    def _external_orders(self, symbol: str):
+        return [o for o in self._books[symbol].orders() if o.owner == "external"]
+
+    def _available(self) -> float:
+        used = self._open_margin
+        for qty, entry in self._positions.values():
+            used += abs(qty) * entry / self.leverage
+        return self.wallet - used
+
+    def _track_margin(self, order: dict):
+        """Keep the running total of margin held by open orders in step with one order's state."""
+        margin = 0.0
+        if order["status"] in OPEN_STATUSES:
+            remaining = float(order["origQty"]) - float(order["executedQty"])
+            price = float(order["price"]) or self._marks[order["symbol"]]
+            margin = remaining * price / self.leverage
+        self._open_margin += margin - self._order_margin.pop(order["orderId"], 0.0)
+        if margin:
+            self._order_margin[order["orderId"]] = margin
+
+    def _set_status(self, order: dict, status: str, execution_type: str):
+        order["status"] = status
+        order["updateTime"] = self._now()
+        self._track_margin(order)
+        self._emit_order(order, execution_type)
+
+    def _find_order(self, params, code: int, msg: str):
+        order_id = params.get("orderId")
+        if order_id is None and params.get("origClientOrderId"):
+            order_id = self._client_ids.get(params["origClientOrderId"])
+        order = self._orders.get(int(order_id)) if order_id is not None else None
+        if order is None or (params.get("symbol") and order["symbol"] != params["symbol"]):
+            raise api_error(code, msg)
+        return order
+
+    def _require_symbol(self, symbol):
+        if symbol not in self._books:
+            raise api_error(-1121, "Invalid symbol.")
+
+    def _emit_order(self, order: dict, execution_type: str, last_qty: float = 0.0, last_price: float = 0.0,
+                    fee: float = 0.0, maker: bool = False, realized: float = 0.0):
+        if not self._listeners:
+            return
+        now = self._now()
+        self._emit({
+            "e": "ORDER_TRADE_UPDATE",
+            "E": now,
+            "T": now,
+            "o": {
+                "s": order["symbol"], "c": order["clientOrderId"], "S": order["side"], "o": order["type"],
+                "f": order["timeInForce"], "q": order["origQty"], "p": order["price"], "ap": order["avgPrice"],
+                "sp": order["stopPrice"], "x": execution_type, "X": order["status"], "i": order["orderId"],
+                "l": f"{last_qty}", "z": order["executedQty"], "L": f"{last_price}", "n": f"{fee}", "N": "USDT",
+                "T": now, "m": maker, "rp": f"{realized}",
+            },
+        })
+
+    def _emit_account(self, symbol: str):
+        if not self._listeners:
+            return
+        qty, entry = self._positions.get(symbol, (0.0, 0.0))
+        self._emit({
+            "e": "ACCOUNT_UPDATE",
+            "E": self._now(),
+            "a": {
+                "m": "ORDER",
+                "B": [{"a": "USDT", "wb": f"{self.wallet:.8f}", "cw": f"{self.wallet:.8f}"}],
+                "P": [{"s": symbol, "pa": f"{qty}", "ep": f"{entry}"}],
+            },
+        })
+
+    def _emit(self, event: dict):
+        for callback in list(self._listeners):
+            callback(event)
+
+    def _build_exchange_info(self) -> dict:
+        symbols = []
+        for symbol, config in self.symbols.items():
+            symbols.append({
+                "symbol": symbol,
+                "status": "TRADING",
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "minPrice": config.get("min_price", config["tick_size"]),
+                     "maxPrice": config.get("max_price", "1000000"), "tickSize": config["tick_size"]},
+                    {"filterType": "LOT_SIZE", "minQty": config["min_qty"], "maxQty": config.get("max_qty", "1000"),
+                     "stepSize": config["step_size"]},
+                    {"filterType": "MIN_NOTIONAL", "notional": config.get("min_notional", "5")},
+                ],
+            })
+        return {"timezone": "UTC", "serverTime": self._now(), "symbols": symbols}
+
+    @staticmethod
+    def _now() -> int:
+        return int(time.time() * 1000)
+
+
+class AsyncSimulatedExchange:
+    """
+    AsyncClient-compatible view of a SimulatedExchange.
+
+    Every futures_* method becomes a coroutine whose injected latency is awaited
+    on the event loop, so concurrent requests overlap like real network calls.
+    """
+
+    def __init__(self, exchange: SimulatedExchange):
+        self.exchange = exchange
+        self.API_KEY = exchange.API_KEY
+
+    def __getattr__(self, name):
+        if not name.startswith("futures_"):
+            return getattr(self.exchange, name)
+        getattr(self.exchange, name)
+
+        async def call(**params):
+            exchange = self.exchange
+            exchange.call_counts[name] += 1
+            delay = exchange.latency + (exchange._rng.uniform(0, exchange.jitter) if exchange.jitter else 0.0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return exchange.dispatch(name, params)
+
+        return call
+
+    async def close_connection(self):
+        pass
@@ -0,0 +1,138 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+
+
+class BookOrder:
+    """A resting order in the simulated book."""
+
+    __slots__ = ("order_id", "client_order_id", "side", "price", "quantity", "filled", "owner", "seq")
+
+    def __init__(self, order_id, client_order_id, side, price, quantity, owner, seq):
+        self.order_id = order_id
+        self.client_order_id = client_order_id
+        self.side = side
+        self.price = price
+        self.quantity = quantity
+        self.filled = 0.0
+        self.owner = owner
+        self.seq = seq
+
+    @property
+    def remaining(self) -> float:
+        return self.quantity - self.filled
+
+
+class OrderBook:
+    """
+    Price-time priority limit order book for one symbol.
+
+    Each side keeps a sorted list of price levels (bids stored negated so both
+    lists ascend towards the touch) plus a FIFO deque of orders per level.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self._keys = {"BUY": [], "SELL": []}
+        self._levels = {"BUY": {}, "SELL": {}}
+        self._orders = {}
+        self.update_id = 0
+
+    @staticmethod
+    def _key(side: str, price: float) -> float:
+        return -price if side == "BUY" else price
+
+    def best(self, side: str):
+        """Return the best price on a side, or None if the side is empty."""
+        keys = self._keys[side]
+        if not keys:
+            return None
+        return abs(keys[0])
+
+    def add(self, order: BookOrder) -> None:
+        key = self._key(order.side, order.price)
+        levels = self._levels[order.side]
+        if key not in levels:
+            levels[key] = deque()
+            insort(self._keys[order.side], key)
+        levels[key].append(order)
+        self._orders[order.order_id] = order
+        self.update_id += 1
+
+    def remove(self, order_id):
+        """Remove and return a resting order, or None if it is not in the book."""
+        order = self._orders.pop(order_id, None)
+        if order is None:
+            return None
+        key = self._key(order.side, order.price)
+        level = self._levels[order.side][key]
+        level.remove(order)
+        if not level:
+            self._drop_level(order.side, key)
+        self.update_id += 1
+        return order
+
+    def get(self, order_id):
+        return self._orders.get(order_id)
+
+    def orders(self):
+        return list(self._orders.values())
+
+    def match(self, side: str, quantity: float, limit_price: float = None):
+        """
+        Match an incoming order against the opposite side.
+
+        Args:
+            side (str): Side of the incoming order.
+            quantity (float): Quantity to fill.
+            limit_price (float): Worst acceptable price, or None for a market order.
+
+        Returns:
+            list[tuple[BookOrder, float, float]]: (resting order, fill qty, fill price) in execution order.
+        """
+        opposite = "SELL" if side == "BUY" else "BUY"
+        keys = self._keys[opposite]
+        levels = self._levels[opposite]
+        fills = []
+        while quantity > 1e-12 and keys:
+            key = keys[0]
+            price = abs(key)
+            if limit_price is not None and (price > limit_price if side == "BUY" else price < limit_price):
+                break
+            level = levels[key]
+            while quantity > 1e-12 and level:
+                resting = level[0]
+                qty = min(quantity, resting.remaining)
+                resting.filled += qty
+                quantity -= qty
+                fills.append((resting, qty, price))
+                if resting.remaining <= 1e-12:
+                    level.popleft()
+                    del self._orders[resting.order_id]
+            if not level:
+                self._drop_level(opposite, key)
+        if fills:
+            self.update_id += 1
+        return fills
+
+    def crossed_by(self, side: str, price: float):
+        """Return resting orders on `side` that a trade at `price` would fill (in priority order)."""
+        keys = self._keys[side]
+        bound = self._key(side, price)
+        result = []
+        for key in keys[:bisect_right(keys, bound)]:
+            result.extend(self._levels[side][key])
+        return result
+
+    def depth(self, limit: int = 100):
+        """Return (bids, asks) as lists of [price, quantity] aggregated per level."""
+        def side_depth(side):
+            return [
+                [abs(key), sum(o.remaining for o in self._levels[side][key])]
+                for key in self._keys[side][:limit]
+            ]
+        return side_depth("BUY"), side_depth("SELL")
+
+    def _drop_level(self, side: str, key: float) -> None:
+        del self._levels[side][key]
+        keys = self._keys[side]
+        del keys[bisect_left(keys, key)]
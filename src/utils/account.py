@@ -1,10 +1,11 @@
-from src.utils.api import get_binance_client
 import logging
+from src.utils.ledger import get_margin_ledger
+from src.utils.market_data import market_data
+from src.utils.metrics import metrics
 
-client = get_binance_client()
 logger = logging.getLogger("BinanceBot")
 
-def has_sufficient_balance(client, symbol: str, side: str, quantity: float, price: float) -> bool:
+def has_sufficient_balance(client, symbol: str, side: str, quantity: float, price: float = None) -> bool:
     """
     Check if the user has sufficient USDT balance to place the order.
 
@@ -13,19 +14,77 @@ def has_sufficient_balance(client, symbol: str, side: str, quantity: float, pric
         symbol (str): Trading pair symbol (e.g., BTCUSDT).
         side (str): Order side (BUY or SELL)
         quantity (float): Quantity to buy/sell.
-        price (float): Price per unit.
+        price (float): Price per unit; None (market orders) uses the cached mark price.
 
     Returns:
         bool: True if sufficient balance, False otherwise.
     """
+    if price is None:
+        price = market_data.get_mark_price(client, symbol)
+    return has_sufficient_margin(client, symbol, quantity * price)
+
+def has_sufficient_margin(client, symbol: str, required: float) -> bool:
+    """
+    Check if the USDT balance covers an aggregate notional (e.g. a whole grid ladder).
+
+    Args:
+        client: Binance client
+        symbol (str): Trading pair symbol, used for logging.
+        required (float): Total USDT required.
+
+    Returns:
+        bool: True if sufficient balance, False otherwise.
+    """
+    try:
+        ledger = get_margin_ledger(client)
+        with metrics.stage("balance"):
+            ledger.ensure_loaded(client)
+        return _covers(ledger, required)
+    except Exception as e:
+        logger.error("Balance check error for %s: %s", symbol, e, exc_info=True)
+        return False
+
+async def has_sufficient_margin_async(client, symbol: str, required: float) -> bool:
+    """Async variant of has_sufficient_margin() for use with AsyncClient."""
     try:
-        balance_data = client.futures_account_balance()
-        usdt_balance = next(item for item in balance_data if item['asset'] == 'USDT')
-        available_balance = float(usdt_balance['balance'])
-        required = quantity * price
+        ledger = get_margin_ledger(client)
+        with metrics.stage("balance"):
+            await ledger.ensure_loaded_async(client)
+        return _covers(ledger, required)
+    except Exception as e:
+        logger.error("Balance check error for %s: %s", symbol, e, exc_info=True)
+        return False
+
+def reserve_margin(client, symbol: str, required: float, error_message: str = "Insufficient balance."):
+    """
+    Reserve margin for an order in the local ledger.
+
+    Use as a context manager around order submission; call confirm(order_id) once the
+    order is accepted. The reservation is released if the block raises.
 
-        logger.debug(f"Checking balance: required={required}, available={available_balance}")
-        return available_balance >= required
+    Raises:
+        ValueError: If the available balance does not cover the requirement.
+    """
+    ledger = get_margin_ledger(client)
+    try:
+        with metrics.stage("balance"):
+            ledger.ensure_loaded(client)
     except Exception as e:
-        logger.error(f"Balance check error for {symbol}: {e}", exc_info=True)
-        return False
\ No newline at end of file
+        logger.error("Balance check error for %s: %s", symbol, e, exc_info=True)
+        raise ValueError(error_message)
+    return ledger.reservation(required, error_message)
+
+async def reserve_margin_async(client, symbol: str, required: float, error_message: str = "Insufficient balance."):
+    """Async variant of reserve_margin() for use with AsyncClient."""
+    ledger = get_margin_ledger(client)
+    try:
+        with metrics.stage("balance"):
+            await ledger.ensure_loaded_async(client)
+    except Exception as e:
+        logger.error("Balance check error for %s: %s", symbol, e, exc_info=True)
+        raise ValueError(error_message)
+    return ledger.reservation(required, error_message)
+
+def _covers(ledger, required: float) -> bool:
+    logger.debug("Checking balance: required=%s, available=%s", required, ledger.available)
+    return ledger.available >= required
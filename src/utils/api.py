@@ -1,23 +1,94 @@
 import os
+import threading
 from dotenv import load_dotenv
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
+from src.utils.rate_limit import ScheduledClient, get_request_scheduler
 
 load_dotenv()
 
-def get_binance_client():
-    api_key = os.getenv("BINANCE_API_KEY")
-    api_secret = os.getenv("BINANCE_API_SECRET")
-    use_testnet = os.getenv("BINANCE_TESTNET", "True").lower() == "true"
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+SIMULATOR_ENABLED = os.getenv("BINANCE_SIMULATOR", "False").lower() == "true"
+
+# One client (and therefore one pooled requests.Session) per (api_key, testnet) pair.
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Client returned for every request instead of a real one (see set_binance_client).
+_override_client = None
+
+def set_binance_client(client):
+    """
+    Make every get_binance_client() call return `client`, e.g. a SimulatedExchange.
+    Pass None to go back to real clients.
+    """
+    global _override_client
+    _override_client = client
+
+def get_override_client():
+    """Return the client installed by set_binance_client() or BINANCE_SIMULATOR, if any."""
+    global _override_client
+    if _override_client is None and SIMULATOR_ENABLED:
+        with _clients_lock:
+            if _override_client is None:
+                from src.simulator import SimulatedExchange
+                _override_client = SimulatedExchange()
+    return _override_client
+
+def get_binance_client(api_key=None, api_secret=None, testnet=None, ping=None):
+    """
+    Return the process-wide Binance client for the given credentials, creating it on first use.
+
+    Args:
+        api_key (str): API key. Defaults to BINANCE_API_KEY.
+        api_secret (str): API secret. Defaults to BINANCE_API_SECRET.
+        testnet (bool): Use the futures testnet. Defaults to BINANCE_TESTNET.
+        ping (bool): Ping the futures API when the client is first created.
+            Defaults to BINANCE_PING (off), since the first real request surfaces connection errors anyway.
+
+    If a client was installed with set_binance_client() or BINANCE_SIMULATOR=True, that client is returned.
+    """
+    override = get_override_client()
+    if override is not None:
+        return override
+
+    api_key = api_key or os.getenv("BINANCE_API_KEY")
+    api_secret = api_secret or os.getenv("BINANCE_API_SECRET")
+    use_testnet = os.getenv("BINANCE_TESTNET", "True").lower() == "true" if testnet is None else testnet
+    if ping is None:
+        ping = os.getenv("BINANCE_PING", "False").lower() == "true"
 
     if not api_key or not api_secret:
         raise ValueError("API keys not found. Set BINANCE_API_KEY and BINANCE_API_SECRET in your .env file.")
 
-    try:
-        client = Client(api_key, api_secret, testnet=use_testnet)
-        client.futures_ping()
+    key = (api_key, use_testnet)
+    client = _clients.get(key)
+    if client is not None:
         return client
-    except BinanceAPIException as e:
-        raise ValueError(f"Failed to connect to Binance API. Error: {e.message}")
-    except Exception as e:
-        raise ValueError(f"Unexpected error during API client initialization: {e}")
\ No newline at end of file
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            return client
+        try:
+            client = Client(api_key, api_secret, testnet=use_testnet, ping=False)
+            if RATE_LIMIT_ENABLED:
+                client = ScheduledClient(client, get_request_scheduler(api_key))
+            if ping:
+                client.futures_ping()
+        except BinanceAPIException as e:
+            raise ValueError(f"Failed to connect to Binance API. Error: {e.message}")
+        except Exception as e:
+            raise ValueError(f"Unexpected error during API client initialization: {e}")
+        _clients[key] = client
+        return client
+
+def reset_binance_clients():
+    """Drop all cached clients, closing their HTTP sessions."""
+    with _clients_lock:
+        for client in _clients.values():
+            try:
+                client.close_connection()
+            except Exception:
+                pass
+        _clients.clear()
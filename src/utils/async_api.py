@@ -0,0 +1,47 @@
+import asyncio
+import os
+from binance import AsyncClient
+from dotenv import load_dotenv
+from src.utils.api import RATE_LIMIT_ENABLED, get_override_client
+from src.utils.rate_limit import AsyncScheduledClient, get_request_scheduler
+
+load_dotenv()
+
+# One AsyncClient (one aiohttp session) per (api_key, testnet, event loop).
+_async_clients = {}
+
+async def get_async_binance_client(api_key=None, api_secret=None, testnet=None):
+    """
+    Return the shared AsyncClient for the running event loop, creating it on first use.
+
+    The client is built without the ping/server-time round trips done by AsyncClient.create().
+    When a simulator is installed (see set_binance_client), an async view of it is returned.
+    """
+    override = get_override_client()
+    if override is not None:
+        from src.simulator import AsyncSimulatedExchange
+        return AsyncSimulatedExchange(override)
+
+    api_key = api_key or os.getenv("BINANCE_API_KEY")
+    api_secret = api_secret or os.getenv("BINANCE_API_SECRET")
+    use_testnet = os.getenv("BINANCE_TESTNET", "True").lower() == "true" if testnet is None else testnet
+
+    if not api_key or not api_secret:
+        raise ValueError("API keys not found. Set BINANCE_API_KEY and BINANCE_API_SECRET in your .env file.")
+
+    loop = asyncio.get_running_loop()
+    key = (api_key, use_testnet, id(loop))
+    client = _async_clients.get(key)
+    if client is None:
+        client = AsyncClient(api_key, api_secret, testnet=use_testnet, loop=loop)
+        if RATE_LIMIT_ENABLED:
+            client = AsyncScheduledClient(client, get_request_scheduler(api_key))
+        _async_clients[key] = client
+    return client
+
+async def close_async_binance_clients():
+    """Close every AsyncClient created on the running event loop."""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [k for k in _async_clients if k[2] == loop_id]:
+        client = _async_clients.pop(key)
+        await client.close_connection()
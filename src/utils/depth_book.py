@@ -0,0 +1,324 @@
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from binance.exceptions import BinanceAPIException
+from websockets.sync.client import connect
+from src.utils.api import get_binance_client
+from src.utils.market_data import FUTURES_STREAM_URL, STREAMS_ENABLED, TESTNET_STREAM_URL
+from src.utils.metrics import metrics
+
+logger = logging.getLogger("BinanceBot")
+
+# Levels requested in the REST snapshot that seeds each book (weight 20 at 1000).
+DEPTH_SNAPSHOT_LIMIT = int(os.getenv("DEPTH_SNAPSHOT_LIMIT", "1000"))
+# A REST-only book (no live stream) is refetched once it is older than this many seconds.
+DEPTH_MAX_AGE = float(os.getenv("DEPTH_BOOK_MAX_AGE", "5"))
+# Levels further than this from the touch are dropped; diffs recreate them if they come back.
+MAX_LEVELS = 2 * DEPTH_SNAPSHOT_LIMIT
+# Snapshots fetched for one gap before giving up; the next try waits RESYNC_COOLDOWN seconds.
+RESYNC_ATTEMPTS = 3
+RESYNC_COOLDOWN = 5.0
+
+
+class DepthBook:
+    """
+    Local L2 order book for one symbol.
+
+    Each side is a pair of parallel array('d') buffers, keys and quantities, sorted best
+    first (bid keys are negated prices), so the touch is index 0 and a level update is a
+    bisect plus, at worst, one memmove. Mutations and multi-level reads hold `lock`.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.lock = threading.Lock()
+        self._keys = {"BUY": array("d"), "SELL": array("d")}
+        self._qtys = {"BUY": array("d"), "SELL": array("d")}
+        self.last_update_id = None
+        self.updated_at = 0.0
+        # True once a stream diff has been bridged onto the snapshot and the stream is connected
+        self.live = False
+
+    @staticmethod
+    def _key(side: str, price: float) -> float:
+        return -price if side == "BUY" else price
+
+    def clear(self) -> None:
+        for side in ("BUY", "SELL"):
+            del self._keys[side][:]
+            del self._qtys[side][:]
+        self.last_update_id = None
+        self.live = False
+
+    def load_snapshot(self, snapshot: dict) -> None:
+        """Replace the book with a REST depth snapshot (`lastUpdateId`, `bids`, `asks`)."""
+        for side, levels in (("BUY", snapshot["bids"]), ("SELL", snapshot["asks"])):
+            pairs = sorted((self._key(side, float(p)), float(q)) for p, q in levels if float(q) > 0)
+            self._keys[side] = array("d", (k for k, _ in pairs))
+            self._qtys[side] = array("d", (q for _, q in pairs))
+        self.last_update_id = snapshot["lastUpdateId"]
+        self.updated_at = time.monotonic()
+        self.live = False
+
+    def apply_diff(self, event: dict) -> bool:
+        """
+        Apply a depthUpdate event (`U`, `u`, `pu`, `b`, `a`).
+
+        The first event after a snapshot must straddle its lastUpdateId; every later one must
+        continue the previous event (`pu` equal to our last `u`). Events already covered by
+        the snapshot are skipped.
+
+        Returns:
+            bool: False if the event does not continue the book and a new snapshot is needed.
+        """
+        if self.last_update_id is None:
+            return False
+        if event["u"] < self.last_update_id:
+            return True
+        if self.live:
+            if event["pu"] != self.last_update_id:
+                return False
+        elif event["U"] > self.last_update_id:
+            return False
+        self._update("BUY", event["b"])
+        self._update("SELL", event["a"])
+        self.last_update_id = event["u"]
+        self.updated_at = time.monotonic()
+        self.live = True
+        return True
+
+    def _update(self, side: str, levels) -> None:
+        keys = self._keys[side]
+        qtys = self._qtys[side]
+        for p, q in levels:
+            key = self._key(side, float(p))
+            qty = float(q)
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                if qty > 0:
+                    qtys[i] = qty
+                else:
+                    del keys[i]
+                    del qtys[i]
+            elif qty > 0 and i < MAX_LEVELS:
+                keys.insert(i, key)
+                qtys.insert(i, qty)
+        if len(keys) > MAX_LEVELS:
+            del keys[MAX_LEVELS:]
+            del qtys[MAX_LEVELS:]
+
+    def best_bid(self):
+        with self.lock:
+            keys = self._keys["BUY"]
+            return -keys[0] if keys else None
+
+    def best_ask(self):
+        with self.lock:
+            keys = self._keys["SELL"]
+            return keys[0] if keys else None
+
+    def levels(self, side: str, count: int = 10) -> list:
+        """Return the top `count` levels of one side ("BUY" = bids) as (price, quantity) pairs."""
+        with self.lock:
+            keys = self._keys[side][:count]
+            qtys = self._qtys[side][:count]
+        return [(abs(k), q) for k, q in zip(keys, qtys)]
+
+    def visible_quantity(self, side: str, levels: int = None, within: float = None) -> float:
+        """
+        Quantity resting on one side ("BUY" = bids) across the top `levels` levels and/or
+        within `within` (a fraction, e.g. 0.001 for 10bps) of that side's best price.
+        """
+        with self.lock:
+            keys = self._keys[side]
+            end = len(keys) if levels is None else min(levels, len(keys))
+            if within is not None and keys:
+                end = min(end, bisect_right(keys, keys[0] + abs(keys[0]) * within))
+            return sum(self._qtys[side][:end])
+
+    def passive_price(self, side: str, tick: float, offset_ticks: int = 0):
+        """
+        Price for a resting LIMIT order on `side`: the near touch, moved `offset_ticks` ticks
+        inside the spread but never onto or through the far touch.
+
+        Returns:
+            float | None: The price, or None when the book is one-sided.
+        """
+        with self.lock:
+            bids, asks = self._keys["BUY"], self._keys["SELL"]
+            if not bids or not asks:
+                return None
+            bid, ask = -bids[0], asks[0]
+        if side == "BUY":
+            price = bid + offset_ticks * tick
+            return min(price, ask - tick) if ask - tick >= bid else bid
+        price = ask - offset_ticks * tick
+        return max(price, bid + tick) if bid + tick <= ask else ask
+
+
+class DepthBookManager:
+    """
+    Maintains DepthBooks from REST snapshots plus the `<symbol>@depth@100ms` diff stream.
+
+    One background thread reads the diff stream for every subscribed symbol. A symbol's
+    first diff, a sequence gap (`pu` not matching the previous `u`) or a reconnect triggers
+    a fresh snapshot; diffs that arrive while it loads wait in the socket's receive queue
+    and are replayed on top of it. Readers get books from memory; without a live stream a
+    REST snapshot is fetched and reused for `max_age` seconds.
+    """
+
+    def __init__(self, testnet: bool = None, snapshot_limit: int = DEPTH_SNAPSHOT_LIMIT,
+                 max_age: float = DEPTH_MAX_AGE):
+        if testnet is None:
+            testnet = os.getenv("BINANCE_TESTNET", "True").lower() == "true"
+        self.url = TESTNET_STREAM_URL if testnet else FUTURES_STREAM_URL
+        self.snapshot_limit = snapshot_limit
+        self.max_age = max_age
+        self._books = {}
+        self._symbols = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._ws = None
+        self._request_id = 0
+        self._retry_at = {}
+        self.resyncs = 0
+
+    def book(self, symbol: str) -> DepthBook:
+        book = self._books.get(symbol)
+        if book is None:
+            with self._lock:
+                book = self._books.setdefault(symbol, DepthBook(symbol))
+        return book
+
+    def subscribe(self, *symbols: str) -> None:
+        """Start maintaining books for the given symbols from the diff-depth stream."""
+        new = {s.upper() for s in symbols} - self._symbols
+        if not new:
+            return
+        with self._lock:
+            self._symbols |= new
+        for symbol in new:
+            self.book(symbol)
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="depth-book", daemon=True)
+            self._thread.start()
+        elif self._ws is not None:
+            self._send_subscribe(new)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._ws is not None:
+            self._ws.close()
+
+    def get_book(self, client, symbol: str, max_age: float = None) -> DepthBook:
+        """
+        Return the book for symbol: the streamed book when it is live, otherwise a REST
+        snapshot no older than max_age seconds.
+        """
+        with metrics.stage("depth"):
+            book = self.book(symbol)
+            if self._is_fresh(book, max_age):
+                return book
+            if STREAMS_ENABLED:
+                self.subscribe(symbol)
+            snapshot = client.futures_order_book(symbol=symbol, limit=self.snapshot_limit)
+            with book.lock:
+                if not book.live:
+                    book.load_snapshot(snapshot)
+            return book
+
+    async def get_book_async(self, client, symbol: str, max_age: float = None) -> DepthBook:
+        """Async variant of get_book() for use with AsyncClient."""
+        with metrics.stage("depth"):
+            book = self.book(symbol)
+            if self._is_fresh(book, max_age):
+                return book
+            if STREAMS_ENABLED:
+                self.subscribe(symbol)
+            snapshot = await client.futures_order_book(symbol=symbol, limit=self.snapshot_limit)
+            with book.lock:
+                if not book.live:
+                    book.load_snapshot(snapshot)
+            return book
+
+    def _is_fresh(self, book: DepthBook, max_age: float = None) -> bool:
+        if book.live:
+            return True
+        max_age = self.max_age if max_age is None else max_age
+        return book.last_update_id is not None and time.monotonic() - book.updated_at <= max_age
+
+    def _send_subscribe(self, symbols) -> None:
+        self._request_id += 1
+        try:
+            self._ws.send(json.dumps({"method": "SUBSCRIBE", "params": [f"{s.lower()}@depth@100ms" for s in symbols],
+                                      "id": self._request_id}))
+        except Exception as e:
+            logger.warning("Depth stream subscribe failed, will resubscribe on reconnect: %s", e)
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                with connect(self.url) as ws:
+                    self._ws = ws
+                    self._send_subscribe(set(self._symbols))
+                    backoff = 1.0
+                    for message in ws:
+                        self._handle(json.loads(message))
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                logger.warning("Depth stream disconnected: %s; reconnecting in %.0fs", e, backoff)
+            finally:
+                self._ws = None
+                # Diffs were missed while disconnected; every book needs a new snapshot
+                for book in list(self._books.values()):
+                    with book.lock:
+                        book.live = False
+                        book.last_update_id = None
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _handle(self, message: dict) -> None:
+        data = message.get("data", message)
+        if data.get("e") != "depthUpdate":
+            return
+        book = self._books.get(data["s"])
+        if book is None:
+            return
+        with book.lock:
+            applied = book.apply_diff(data)
+        if not applied and time.monotonic() >= self._retry_at.get(book.symbol, 0.0):
+            self._resync(book, data)
+
+    def _resync(self, book: DepthBook, event: dict) -> None:
+        if book.last_update_id is not None:
+            logger.warning("Depth gap on %s (pu=%s, last u=%s); resyncing", book.symbol, event.get("pu"),
+                           book.last_update_id)
+        self.resyncs += 1
+        for attempt in range(RESYNC_ATTEMPTS):
+            try:
+                snapshot = get_binance_client().futures_order_book(symbol=book.symbol, limit=self.snapshot_limit)
+            except BinanceAPIException as e:
+                logger.warning("Depth snapshot for %s failed: %s (Code: %s)", book.symbol, e.message, e.code)
+                break
+            with book.lock:
+                book.load_snapshot(snapshot)
+                if book.apply_diff(event):
+                    return
+            # The snapshot is older than the stream; give the REST cache a moment to catch up
+            self._stop.wait(0.1 * (attempt + 1))
+        logger.warning("Could not resync depth book for %s; retrying in %ss", book.symbol, RESYNC_COOLDOWN)
+        self._retry_at[book.symbol] = time.monotonic() + RESYNC_COOLDOWN
+        with book.lock:
+            book.clear()
+
+
+depth_books = DepthBookManager()
@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+from binance.exceptions import BinanceAPIException
+
+# Pre-converted exchange filters for a single symbol.
+SymbolFilters = namedtuple(
+    "SymbolFilters",
+    ["symbol", "min_qty", "max_qty", "step_size", "min_price", "max_price", "tick_size", "min_notional"],
+)
+
+# Binance error codes that indicate our cached filters may be out of date.
+FILTER_ERROR_CODES = {-1013, -1111, -1121, -4003, -4004, -4005, -4013, -4014, -4023, -4164}
+
+DEFAULT_TTL = float(os.getenv("FILTER_CACHE_TTL", "3600"))
+DEFAULT_SNAPSHOT_PATH = os.getenv("FILTER_CACHE_PATH", ".filter_cache.json")
+
+
+def parse_exchange_info(exchange_info: dict) -> dict:
+    """
+    Build a per-symbol index of SymbolFilters from a futures_exchange_info() payload.
+
+    Args:
+        exchange_info (dict): Raw exchange info response.
+
+    Returns:
+        dict: Mapping of symbol -> SymbolFilters.
+    """
+    index = {}
+    for symbol_info in exchange_info.get("symbols", []):
+        filters = {f["filterType"]: f for f in symbol_info.get("filters", [])}
+        lot = filters.get("LOT_SIZE", {})
+        price = filters.get("PRICE_FILTER", {})
+        notional = filters.get("MIN_NOTIONAL", {})
+        index[symbol_info["symbol"]] = SymbolFilters(
+            symbol=symbol_info["symbol"],
+            min_qty=Decimal(lot.get("minQty", "0")),
+            max_qty=Decimal(lot.get("maxQty", "0")),
+            step_size=Decimal(lot.get("stepSize", "0")),
+            min_price=Decimal(price.get("minPrice", "0")),
+            max_price=Decimal(price.get("maxPrice", "0")),
+            tick_size=Decimal(price.get("tickSize", "0")),
+            min_notional=Decimal(notional.get("notional", notional.get("minNotional", "0"))),
+        )
+    return index
+
+
+class SymbolFilterCache:
+    """
+    Caches exchange filters per symbol so order validation does not download
+    the full exchange info document on every call.
+
+    The cache is refreshed when its TTL expires or after a filter-related API
+    error, and can be persisted to disk so a fresh process starts warm.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, snapshot_path: str = DEFAULT_SNAPSHOT_PATH):
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self._index = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._snapshot_checked = False
+
+    def is_stale(self) -> bool:
+        """Return True if the cache is empty or older than its TTL."""
+        self._load_snapshot_once()
+        return not self._index or (time.time() - self._loaded_at) > self.ttl
+
+    def update(self, exchange_info: dict) -> None:
+        """
+        Replace the cached index with a freshly downloaded exchange info payload.
+
+        Args:
+            exchange_info (dict): Raw futures_exchange_info() response.
+        """
+        index = parse_exchange_info(exchange_info)
+        with self._lock:
+            self._index = index
+            self._loaded_at = time.time()
+        if self.snapshot_path:
+            self._save_snapshot(exchange_info)
+
+    def refresh(self, client) -> None:
+        """Download exchange info through the given client and rebuild the index."""
+        self.update(client.futures_exchange_info())
+
+    def invalidate(self) -> None:
+        """Force the next lookup to download fresh exchange info."""
+        with self._lock:
+            self._loaded_at = 0.0
+
+    def get(self, client, symbol: str) -> SymbolFilters:
+        """
+        Return the cached filters for a symbol, refreshing through the client if needed.
+
+        Args:
+            client: Binance client
+            symbol (str): Trading pair symbol (e.g., BTCUSDT).
+
+        Returns:
+            SymbolFilters: Pre-converted filter values.
+
+        Raises:
+            ValueError: If the symbol is not listed on Binance Futures.
+        """
+        if self.is_stale():
+            self.refresh(client)
+        filters = self._index.get(symbol)
+        if filters is None:
+            raise ValueError(f"Invalid symbol: {symbol}. Please check Binance Futures API for valid symbols.")
+        return filters
+
+    async def get_async(self, client, symbol: str) -> SymbolFilters:
+        """Async variant of get() for use with AsyncClient."""
+        if self.is_stale():
+            self.update(await client.futures_exchange_info())
+        filters = self._index.get(symbol)
+        if filters is None:
+            raise ValueError(f"Invalid symbol: {symbol}. Please check Binance Futures API for valid symbols.")
+        return filters
+
+    def lookup(self, symbol: str):
+        """Return cached filters for a symbol without any network access, or None."""
+        self._load_snapshot_once()
+        return self._index.get(symbol)
+
+    def handle_api_error(self, exc: BinanceAPIException) -> None:
+        """Invalidate the cache if the API error indicates a filter mismatch."""
+        if getattr(exc, "code", None) in FILTER_ERROR_CODES:
+            self.invalidate()
+
+    def _save_snapshot(self, exchange_info: dict) -> None:
+        try:
+            tmp_path = f"{self.snapshot_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"saved_at": self._loaded_at, "exchange_info": exchange_info}, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError:
+            pass
+
+    def _load_snapshot_once(self) -> None:
+        if self._snapshot_checked:
+            return
+        self._snapshot_checked = True
+        if self._index or not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path) as f:
+                snapshot = json.load(f)
+            index = parse_exchange_info(snapshot["exchange_info"])
+        except (OSError, ValueError, KeyError):
+            return
+        with self._lock:
+            if not self._index:
+                self._index = index
+                self._loaded_at = float(snapshot.get("saved_at", 0.0))
+
+
+filter_cache = SymbolFilterCache()
@@ -0,0 +1,336 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from binance.exceptions import BinanceAPIException
+
+logger = logging.getLogger("BinanceBot")
+
+# SQLite file for the journal; an empty value keeps it in memory (nothing survives the process).
+JOURNAL_PATH = os.getenv("ORDER_JOURNAL_PATH", "orders.db")
+
+# Written before the request is sent; still PENDING after a crash means the outcome is unknown.
+PENDING = "PENDING"
+# The order was not found on the exchange, so it never arrived and may be sent again.
+LOST = "LOST"
+OPEN_STATUSES = ("PENDING", "NEW", "PARTIALLY_FILLED")
+# Steps in these states count as done when a job is resumed.
+DONE_STATUSES = ("NEW", "PARTIALLY_FILLED", "FILLED", "CANCELED", "EXPIRED")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    strategy TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    client_order_id TEXT PRIMARY KEY,
+    order_id INTEGER,
+    job_id TEXT,
+    strategy TEXT,
+    step INTEGER,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    type TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    price REAL,
+    executed_qty REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_status_symbol ON orders (status, symbol);
+CREATE INDEX IF NOT EXISTS orders_strategy_status ON orders (strategy, status);
+CREATE INDEX IF NOT EXISTS orders_job_step ON orders (job_id, step);
+CREATE INDEX IF NOT EXISTS orders_order_id ON orders (order_id);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, strategy);
+"""
+
+
+class OrderJournal:
+    """
+    SQLite journal of every order the bot submits and of the grid/TWAP jobs they belong to.
+
+    Each order is written as PENDING before it is sent and updated with the exchange
+    response, so after a crash the journal shows which orders are live, which were
+    rejected and which have an unknown outcome. Rows are never deleted.
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH):
+        self.path = path or ":memory:"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # ----- jobs -----
+
+    def start_job(self, strategy: str, symbol: str, side: str, params: dict) -> str:
+        """Register a new grid/TWAP job and return its id (also the prefix of its client order ids)."""
+        job_id = f"{strategy}-{uuid.uuid4().hex[:10]}"
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, 'running', ?, ?)",
+                (job_id, strategy, symbol, side, json.dumps(params), now, now),
+            )
+        return job_id
+
+    def finish_job(self, job_id: str, status: str = "done") -> None:
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+                               (status, time.time(), job_id))
+
+    def get_job(self, job_id: str):
+        """Return a job as a dict (params decoded), or None."""
+        row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def unfinished_jobs(self, strategy: str = None) -> list:
+        """Return jobs that never reached done, e.g. because the process crashed."""
+        query = "SELECT job_id FROM jobs WHERE status != 'done'"
+        args = ()
+        if strategy:
+            query += " AND strategy = ?"
+            args = (strategy,)
+        return [self.get_job(row["job_id"]) for row in self._conn.execute(query + " ORDER BY created_at", args)]
+
+    def job_orders(self, job_id: str) -> dict:
+        """Return the job's order rows keyed by step."""
+        rows = self._conn.execute("SELECT * FROM orders WHERE job_id = ? ORDER BY step", (job_id,))
+        return {row["step"]: dict(row) for row in rows}
+
+    def resolve_job(self, client, job_id: str) -> set:
+        """
+        Settle orders with an unknown outcome by looking them up on the exchange.
+
+        Returns:
+            set[int]: Steps that are done (placed, filled or cancelled) and must not be sent again.
+        """
+        job = self.get_job(job_id)
+        if job is None:
+            raise ValueError(f"Unknown job '{job_id}'.")
+        for step, row in self.job_orders(job_id).items():
+            if row["status"] != PENDING:
+                continue
+            try:
+                order = client.futures_get_order(symbol=row["symbol"], origClientOrderId=row["client_order_id"])
+                self.record_response(row["client_order_id"], order)
+            except BinanceAPIException as api_exc:
+                if api_exc.code != -2013:
+                    raise
+                self.set_status(row["client_order_id"], LOST)
+        return {step for step, row in self.job_orders(job_id).items() if row["status"] in DONE_STATUSES}
+
+    # ----- orders -----
+
+    @staticmethod
+    def client_order_id(job_id: str = None, step: int = None) -> str:
+        """Deterministic id for a job step (so a resumed job reuses it), random for standalone orders."""
+        if job_id is None:
+            return f"bot-{uuid.uuid4().hex[:20]}"
+        return f"{job_id}-{step}"
+
+    def record_submit(self, client_order_id: str, symbol: str, side: str, order_type: str, quantity: float,
+                      price: float = None, job_id: str = None, strategy: str = None, step: int = None) -> None:
+        """Write an order as PENDING just before it is sent (an existing row for the id is reset)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO orders (client_order_id, job_id, strategy, step, symbol, side, type, quantity, price, "
+                "status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (client_order_id) DO UPDATE SET status = excluded.status, error = NULL, "
+                "updated_at = excluded.updated_at",
+                (client_order_id, job_id, strategy, step, symbol, side, order_type, float(quantity),
+                 float(price) if price else None, PENDING, now, now),
+            )
+
+    def record_response(self, client_order_id: str, order: dict) -> None:
+        """Store the exchange's view of an order (id, status, executed quantity)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE orders SET order_id = ?, status = ?, executed_qty = ?, error = NULL, updated_at = ? "
+                "WHERE client_order_id = ?",
+                (order.get("orderId"), order.get("status"), float(order.get("executedQty") or 0), time.time(),
+                 client_order_id),
+            )
+
+    def record_error(self, client_order_id: str, error: str) -> None:
+        """Mark an order the exchange rejected."""
+        with self._lock:
+            self._conn.execute("UPDATE orders SET status = 'REJECTED', error = ?, updated_at = ? "
+                               "WHERE client_order_id = ?", (error, time.time(), client_order_id))
+
+    def set_status(self, client_order_id: str, status: str, executed_qty: float = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE orders SET status = ?, executed_qty = COALESCE(?, executed_qty), updated_at = ? "
+                "WHERE client_order_id = ?",
+                (status, executed_qty, time.time(), client_order_id),
+            )
+
+    def track(self, client_order_id: str, symbol: str, side: str, order_type: str, quantity: float,
+              price: float = None, job_id: str = None, strategy: str = None, step: int = None):
+        """
+        Context manager that journals one order submission.
+
+        The order is written as PENDING on entry; call .record(response) inside the block.
+        A BinanceAPIException marks it REJECTED; any other exception leaves it PENDING
+        (outcome unknown) for resolve_job() to settle.
+        """
+        self.record_submit(client_order_id, symbol, side, order_type, quantity, price, job_id, strategy, step)
+        return _JournalEntry(self, client_order_id)
+
+    def reconcile(self, client, symbol: str = None) -> int:
+        """
+        Bring open rows up to date with the exchange.
+
+        Rows only move past NEW through the user-data stream, which runs only in long-lived
+        processes (daemon, OCO watch, grid engine). Orders from one-shot CLI runs stay NEW here
+        after they fill or are cancelled. This fetches the open orders of every symbol with open
+        rows. Rows that are no longer open are then looked up by client order id, and rows the
+        exchange does not know are marked LOST.
+
+        Returns:
+            int: Number of rows whose status changed.
+        """
+        changed = 0
+        for sym in {row["symbol"] for row in self.open_orders(symbol)}:
+            live = {order["clientOrderId"]: order for order in client.futures_get_open_orders(symbol=sym)}
+            for row in self.open_orders(sym):
+                order = live.get(row["client_order_id"])
+                if order is None:
+                    try:
+                        order = client.futures_get_order(symbol=sym, origClientOrderId=row["client_order_id"])
+                    except BinanceAPIException as api_exc:
+                        if api_exc.code != -2013:
+                            raise
+                        self.set_status(row["client_order_id"], LOST)
+                        changed += 1
+                        continue
+                if order.get("status") != row["status"] or float(order.get("executedQty") or 0) != row["executed_qty"]:
+                    self.record_response(row["client_order_id"], order)
+                    changed += 1
+        return changed
+
+    def open_orders(self, symbol: str = None, strategy: str = None) -> list:
+        """
+        Return orders that are (or may be) live, optionally filtered by symbol and strategy.
+
+        Statuses are as last recorded; call reconcile() first when no user-data stream was running.
+        """
+        query = f"SELECT * FROM orders WHERE status IN ({', '.join('?' * len(OPEN_STATUSES))})"
+        args = list(OPEN_STATUSES)
+        if symbol:
+            query += " AND symbol = ?"
+            args.append(symbol)
+        if strategy:
+            query += " AND strategy = ?"
+            args.append(strategy)
+        return [dict(row) for row in self._conn.execute(query, args)]
+
+    def open_exposure(self, symbol: str = None) -> dict:
+        """
+        Sum the unfilled quantity and notional of open orders per symbol (as last recorded; see reconcile()).
+
+        Returns:
+            dict: symbol -> {"buy_qty", "sell_qty", "buy_notional", "sell_notional", "orders"}.
+        """
+        query = (
+            "SELECT symbol, side, COUNT(*) AS orders, SUM(quantity - executed_qty) AS qty, "
+            "SUM((quantity - executed_qty) * COALESCE(price, 0)) AS notional FROM orders "
+            f"WHERE status IN ({', '.join('?' * len(OPEN_STATUSES))})"
+        )
+        args = list(OPEN_STATUSES)
+        if symbol:
+            query += " AND symbol = ?"
+            args.append(symbol)
+        exposure = {}
+        for row in self._conn.execute(query + " GROUP BY symbol, side", args):
+            entry = exposure.setdefault(row["symbol"], {"buy_qty": 0.0, "sell_qty": 0.0, "buy_notional": 0.0,
+                                                        "sell_notional": 0.0, "orders": 0})
+            side = row["side"].lower()
+            entry[f"{side}_qty"] = row["qty"]
+            entry[f"{side}_notional"] = row["notional"]
+            entry["orders"] += row["orders"]
+        return exposure
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class _JournalEntry:
+    def __init__(self, journal: OrderJournal, client_order_id: str):
+        self.journal = journal
+        self.client_order_id = client_order_id
+
+    def record(self, order: dict) -> None:
+        self.journal.record_response(self.client_order_id, order)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if isinstance(exc, BinanceAPIException):
+            self.journal.record_error(self.client_order_id, f"{exc.message} (Code: {exc.code})")
+        return False
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+def get_order_journal() -> OrderJournal:
+    """Return the process-wide journal, opening ORDER_JOURNAL_PATH on first use."""
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = OrderJournal()
+    return _journal
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the order journal")
+    parser.add_argument("--jobs", action="store_true", help="List grid/TWAP jobs that did not finish")
+    parser.add_argument("--open", action="store_true", help="List open orders")
+    parser.add_argument("--exposure", action="store_true", help="Show open exposure per symbol")
+    parser.add_argument("--symbol", type=str, default=None)
+    parser.add_argument("--offline", action="store_true",
+                        help="Answer from the journal alone, without reconciling open orders with the exchange")
+    args = parser.parse_args()
+
+    journal = get_order_journal()
+    symbol = args.symbol.upper() if args.symbol else None
+    if not args.offline and (args.open or args.exposure or not args.jobs):
+        from src.utils.api import get_binance_client
+        changed = journal.reconcile(get_binance_client(), symbol)
+        logger.info("Journal reconciled with the exchange: %s orders updated", changed)
+    if args.jobs:
+        for job in journal.unfinished_jobs():
+            print(f"{job['job_id']}: {job['strategy']} {job['side']} {job['symbol']} {job['params']} [{job['status']}]")
+    if args.open:
+        for row in journal.open_orders(symbol):
+            print(f"{row['client_order_id']}: {row['side']} {row['quantity']} {row['symbol']} @ {row['price']} [{row['status']}]")
+    if args.exposure or not (args.jobs or args.open):
+        for sym, entry in sorted(journal.open_exposure(symbol).items()):
+            print(f"{sym}: {entry['orders']} open orders, buy {entry['buy_qty']:g} ({entry['buy_notional']:.2f} USDT), "
+                  f"sell {entry['sell_qty']:g} ({entry['sell_notional']:.2f} USDT)")
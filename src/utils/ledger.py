@@ -0,0 +1,170 @@
+import itertools
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("BinanceBot")
+
+DEFAULT_RECONCILE_INTERVAL = float(os.getenv("LEDGER_RECONCILE_INTERVAL", "60"))
+
+# Order statuses after which an order no longer ties up margin.
+RELEASE_STATUSES = {"CANCELED", "EXPIRED", "REJECTED", "EXPIRED_IN_MATCH"}
+
+
+class MarginLedger:
+    """
+    In-process balance ledger for one account.
+
+    Balances are loaded once and then tracked locally: every order reserves its
+    notional when it is submitted and releases it when it is cancelled, expired or
+    rejected. The ledger reconciles against the exchange periodically (or when an
+    account-update event marks it stale); at that point reservations for orders
+    the exchange has acknowledged are dropped, since the exchange balance already
+    reflects them.
+    """
+
+    def __init__(self, asset: str = "USDT", reconcile_interval: float = DEFAULT_RECONCILE_INTERVAL):
+        self.asset = asset
+        self.reconcile_interval = reconcile_interval
+        self._balance = 0.0
+        self._reserved = 0.0
+        self._reservations = {}
+        self._order_keys = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._keys = itertools.count(1)
+
+    @property
+    def available(self) -> float:
+        """Balance not yet reserved by orders submitted from this process."""
+        return self._balance - self._reserved
+
+    @property
+    def reserved(self) -> float:
+        return self._reserved
+
+    def needs_reconcile(self) -> bool:
+        return self._loaded_at is None or (time.monotonic() - self._loaded_at) > self.reconcile_interval
+
+    def load(self, balance_data: list) -> None:
+        """
+        Reconcile against a futures_account_balance() response.
+
+        Args:
+            balance_data (list): Raw balance entries from the exchange.
+        """
+        entry = next(item for item in balance_data if item['asset'] == self.asset)
+        balance = float(entry.get('availableBalance', entry['balance']))
+        with self._lock:
+            self._balance = balance
+            for key in list(self._order_keys.values()):
+                self._drop(key)
+            self._loaded_at = time.monotonic()
+        logger.debug("Ledger reconciled: balance=%s, reserved=%s", balance, self._reserved)
+
+    def ensure_loaded(self, client) -> None:
+        if self.needs_reconcile():
+            self.load(client.futures_account_balance())
+
+    async def ensure_loaded_async(self, client) -> None:
+        if self.needs_reconcile():
+            self.load(await client.futures_account_balance())
+
+    def reserve(self, amount: float):
+        """
+        Reserve margin for an order about to be submitted.
+
+        Returns:
+            int | None: Reservation key, or None if the balance does not cover the amount.
+        """
+        with self._lock:
+            if self._balance - self._reserved < amount:
+                return None
+            key = next(self._keys)
+            self._reservations[key] = amount
+            self._reserved += amount
+            return key
+
+    def confirm(self, key, order_id) -> None:
+        """Attach the exchange order id to a reservation once the order is accepted."""
+        with self._lock:
+            if key in self._reservations:
+                self._order_keys[order_id] = key
+
+    def release(self, key) -> None:
+        """Release a reservation by its key."""
+        with self._lock:
+            self._drop(key)
+
+    def release_order(self, order_id) -> None:
+        """Release the reservation attached to an exchange order id."""
+        with self._lock:
+            key = self._order_keys.get(order_id)
+            if key is not None:
+                self._drop(key)
+
+    def reservation(self, amount: float, error_message: str):
+        """
+        Context manager that reserves margin and releases it if the block raises.
+
+        Raises:
+            ValueError: With error_message if the balance does not cover the amount.
+        """
+        return _Reservation(self, amount, error_message)
+
+    def apply_order_update(self, event: dict) -> None:
+        """Apply an ORDER_TRADE_UPDATE user-data event."""
+        order = event.get("o", {})
+        if order.get("X") in RELEASE_STATUSES:
+            self.release_order(order.get("i"))
+
+    def apply_account_update(self, event: dict) -> None:
+        """Apply an ACCOUNT_UPDATE user-data event by scheduling a reconcile."""
+        with self._lock:
+            self._loaded_at = None
+
+    def _drop(self, key) -> None:
+        amount = self._reservations.pop(key, None)
+        if amount is None:
+            return
+        self._reserved -= amount
+        for order_id, order_key in list(self._order_keys.items()):
+            if order_key == key:
+                del self._order_keys[order_id]
+
+
+class _Reservation:
+    def __init__(self, ledger: MarginLedger, amount: float, error_message: str):
+        self.ledger = ledger
+        self.amount = amount
+        self.error_message = error_message
+        self.key = None
+
+    def __enter__(self):
+        self.key = self.ledger.reserve(self.amount)
+        if self.key is None:
+            raise ValueError(self.error_message)
+        logger.debug("Reserved margin: required=%s, available=%s", self.amount, self.ledger.available)
+        return self
+
+    def confirm(self, order_id) -> None:
+        self.ledger.confirm(self.key, order_id)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.ledger.release(self.key)
+        return False
+
+
+_ledgers = {}
+_ledgers_lock = threading.Lock()
+
+def get_margin_ledger(client) -> MarginLedger:
+    """Return the ledger shared by every client (sync or async) for the same API key."""
+    key = getattr(client, "API_KEY", None) or id(client)
+    ledger = _ledgers.get(key)
+    if ledger is None:
+        with _ledgers_lock:
+            ledger = _ledgers.setdefault(key, MarginLedger())
+    return ledger
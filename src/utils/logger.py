@@ -1,5 +1,71 @@
+import atexit
+import json
 import logging
 import os
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FILE = os.getenv("LOG_FILE", "bot.log")
+ORDER_EVENTS_FILE = os.getenv("ORDER_EVENTS_FILE", "orders.jsonl")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
+EVENTS_LOGGER = "BinanceBot.events"
+
+_listener = None
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues records unformatted.
+
+    The stock handler merges msg % args in the calling thread; here that work is left
+    to the writer thread, so a log call on the order path only appends to a queue.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats order events as one compact JSON object per line."""
+
+    def format(self, record):
+        event = {"ts": round(record.created, 3), "event": record.getMessage()}
+        event.update(getattr(record, "fields", {}))
+        return json.dumps(event, separators=(",", ":"), default=str)
+
+
+def _only_events(record):
+    return record.name == EVENTS_LOGGER
+
+
+def _no_events(record):
+    return record.name != EVENTS_LOGGER
+
+
+def _start_listener():
+    global _listener
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+
+    fh = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+    fh.setFormatter(formatter)
+    fh.addFilter(_no_events)
+
+    ch = logging.StreamHandler()
+    ch.setFormatter(formatter)
+    ch.addFilter(_no_events)
+
+    eh = RotatingFileHandler(ORDER_EVENTS_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+    eh.setFormatter(JsonLinesFormatter())
+    eh.addFilter(_only_events)
+
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, fh, ch, eh, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return DeferredQueueHandler(log_queue)
 
 def setup_logger():
     logger = logging.getLogger("BinanceBot")
@@ -8,13 +74,52 @@ def setup_logger():
     logger.setLevel(log_level)
 
     if not logger.handlers:
-        fh = logging.FileHandler("bot.log")
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s')
-        fh.setFormatter(formatter)
-        logger.addHandler(fh)
+        # File and console writes happen on a background thread fed by a queue
+        logger.addHandler(_start_listener())
+
+        events = logging.getLogger(EVENTS_LOGGER)
+        events.setLevel(logging.INFO)
+        events.propagate = False
+        events.addHandler(logger.handlers[0])
+
+    return logger
+
+def stop_logging():
+    """Flush queued records and stop the background writer (registered with atexit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def log_order_event(event: str, **fields):
+    """
+    Record an order lifecycle event (e.g. placed, rejected, filled) as a JSON line in ORDER_EVENTS_FILE.
+
+    Args:
+        event (str): Event name.
+        **fields: Event attributes such as symbol, side, order_id, status or latency_ms.
+    """
+    events = logging.getLogger(EVENTS_LOGGER)
+    if events.isEnabledFor(logging.INFO):
+        events.info(event, extra={"fields": fields})
+
+def elapsed_ms(started: float) -> float:
+    """Milliseconds since a time.perf_counter() reading, rounded for event logs."""
+    return round((time.perf_counter() - started) * 1000, 3)
 
-        ch = logging.StreamHandler()
-        ch.setFormatter(formatter)
-        logger.addHandler(ch)
+def log_order_placed(order: dict, latency_ms: float = None, **fields):
+    """Record a 'placed' event for an order response, plus 'filled' if the response already shows a fill."""
+    log_order_event(
+        "placed", symbol=order.get("symbol"), side=order.get("side"), type=order.get("type"),
+        order_id=order.get("orderId"), client_order_id=order.get("clientOrderId"), quantity=order.get("origQty"),
+        price=order.get("price"), status=order.get("status"), latency_ms=latency_ms, **fields
+    )
+    if order.get("status") in ("FILLED", "PARTIALLY_FILLED"):
+        log_order_event(
+            "filled", symbol=order.get("symbol"), side=order.get("side"), order_id=order.get("orderId"),
+            executed_qty=order.get("executedQty"), avg_price=order.get("avgPrice"), status=order.get("status")
+        )
 
-    return logger
\ No newline at end of file
+def log_order_rejected(symbol: str, code, message: str, latency_ms: float = None, **fields):
+    """Record a 'rejected' event for an order the exchange refused."""
+    log_order_event("rejected", symbol=symbol, code=code, error=message, latency_ms=latency_ms, **fields)
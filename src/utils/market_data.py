@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from websockets.sync.client import connect
+from src.utils.metrics import metrics
+
+logger = logging.getLogger("BinanceBot")
+
+FUTURES_STREAM_URL = "wss://fstream.binance.com/stream"
+TESTNET_STREAM_URL = "wss://stream.binancefuture.com/stream"
+
+DEFAULT_MAX_AGE = float(os.getenv("MARKET_DATA_MAX_AGE", "3"))
+STREAMS_ENABLED = os.getenv("MARKET_DATA_STREAM", "True").lower() == "true"
+
+
+class PriceEntry:
+    """Latest prices for one symbol; timestamps are time.monotonic() values."""
+
+    __slots__ = ("mark_price", "mark_at", "bid", "ask", "book_at")
+
+    def __init__(self):
+        self.mark_price = None
+        self.mark_at = 0.0
+        self.bid = None
+        self.ask = None
+        self.book_at = 0.0
+
+
+class MarketDataCache:
+    """
+    Background subscriber for mark-price and book-ticker streams.
+
+    Keeps an in-memory latest-price table per symbol. Readers get prices
+    instantly from memory and fall back to REST only when the stream is stale.
+    """
+
+    def __init__(self, testnet: bool = None, max_age: float = DEFAULT_MAX_AGE):
+        if testnet is None:
+            testnet = os.getenv("BINANCE_TESTNET", "True").lower() == "true"
+        self.url = TESTNET_STREAM_URL if testnet else FUTURES_STREAM_URL
+        self.max_age = max_age
+        self._prices = {}
+        self._symbols = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._ws = None
+        self._request_id = 0
+
+    def subscribe(self, *symbols: str) -> None:
+        """Start streaming mark price and book ticker for the given symbols."""
+        new = {s.upper() for s in symbols} - self._symbols
+        if not new:
+            return
+        with self._lock:
+            self._symbols |= new
+            for symbol in new:
+                self._prices.setdefault(symbol, PriceEntry())
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="market-data", daemon=True)
+            self._thread.start()
+        elif self._ws is not None:
+            self._send_subscribe(new)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._ws is not None:
+            self._ws.close()
+
+    def get_entry(self, symbol: str):
+        return self._prices.get(symbol)
+
+    def cached_mark_price(self, symbol: str, max_age: float = None):
+        """Return the streamed mark price if it is fresher than max_age, else None."""
+        entry = self._prices.get(symbol)
+        max_age = self.max_age if max_age is None else max_age
+        if entry is None or entry.mark_price is None or time.monotonic() - entry.mark_at > max_age:
+            return None
+        return entry.mark_price
+
+    def get_book_ticker(self, symbol: str, max_age: float = None):
+        """Return (best_bid, best_ask) if fresher than max_age, else None."""
+        entry = self._prices.get(symbol)
+        max_age = self.max_age if max_age is None else max_age
+        if entry is None or entry.bid is None or time.monotonic() - entry.book_at > max_age:
+            return None
+        return entry.bid, entry.ask
+
+    def get_mark_price(self, client, symbol: str, max_age: float = None) -> float:
+        """
+        Return the latest mark price, reading from the stream and falling back to REST.
+
+        Args:
+            client: Binance client used for the REST fallback.
+            symbol (str): Trading pair symbol (e.g., BTCUSDT).
+            max_age (float): Maximum acceptable age in seconds of the streamed price.
+        """
+        with metrics.stage("price"):
+            price = self.cached_mark_price(symbol, max_age)
+            if price is not None:
+                return price
+            if STREAMS_ENABLED:
+                self.subscribe(symbol)
+            return self._store_mark(symbol, float(client.futures_mark_price(symbol=symbol)["markPrice"]))
+
+    async def get_mark_price_async(self, client, symbol: str, max_age: float = None) -> float:
+        """Async variant of get_mark_price() for use with AsyncClient."""
+        with metrics.stage("price"):
+            price = self.cached_mark_price(symbol, max_age)
+            if price is not None:
+                return price
+            if STREAMS_ENABLED:
+                self.subscribe(symbol)
+            return self._store_mark(symbol, float((await client.futures_mark_price(symbol=symbol))["markPrice"]))
+
+    def _store_mark(self, symbol: str, price: float) -> float:
+        entry = self._prices.setdefault(symbol, PriceEntry())
+        entry.mark_price = price
+        entry.mark_at = time.monotonic()
+        return price
+
+    def _streams(self, symbols):
+        for symbol in symbols:
+            lower = symbol.lower()
+            yield f"{lower}@markPrice@1s"
+            yield f"{lower}@bookTicker"
+
+    def _send_subscribe(self, symbols) -> None:
+        self._request_id += 1
+        try:
+            self._ws.send(json.dumps({"method": "SUBSCRIBE", "params": list(self._streams(symbols)), "id": self._request_id}))
+        except Exception as e:
+            logger.warning("Market data subscribe failed, will resubscribe on reconnect: %s", e)
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                with connect(self.url) as ws:
+                    self._ws = ws
+                    self._send_subscribe(set(self._symbols))
+                    backoff = 1.0
+                    for message in ws:
+                        self._handle(json.loads(message))
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                logger.warning("Market data stream disconnected: %s; reconnecting in %.0fs", e, backoff)
+            finally:
+                self._ws = None
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _handle(self, message: dict) -> None:
+        data = message.get("data", message)
+        event = data.get("e")
+        entry = self._prices.get(data.get("s"))
+        if entry is None:
+            return
+        now = time.monotonic()
+        if event == "markPriceUpdate":
+            entry.mark_price = float(data["p"])
+            entry.mark_at = now
+        elif event == "bookTicker":
+            entry.bid = float(data["b"])
+            entry.ask = float(data["a"])
+            entry.book_at = now
+
+
+market_data = MarketDataCache()
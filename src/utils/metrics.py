@@ -0,0 +1,213 @@
+import atexit
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger("BinanceBot")
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+# Prometheus text file written at exit (e.g. for node_exporter's textfile collector); empty disables it.
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+
+# Histogram bucket upper bounds in seconds (100µs .. 10s), as in Prometheus client defaults but finer at the low end.
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_METRIC = "binance_bot_stage_seconds"
+REQUEST_METRIC = "binance_bot_request_seconds"
+REQUEST_ERRORS_METRIC = "binance_bot_request_errors_total"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_HELP = {
+    STAGE_METRIC: "Time spent in each order-path stage (validation, filters, balance, price, depth, rate_limit_wait, submission).",
+    REQUEST_METRIC: "Latency of Binance REST requests by endpoint.",
+    REQUEST_ERRORS_METRIC: "Binance API errors by endpoint and error code.",
+    "binance_bot_submit_events_total": "Order submission retries, hedges and lookups that resolved an uncertain outcome.",
+}
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (non-cumulative counts; the last slot is +Inf)."""
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (an estimate, like Prometheus' histogram_quantile)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """
+    Process-wide registry of latency histograms and error counters.
+
+    Histograms are keyed by (metric, label name, label value), so the hot path is one dict
+    lookup plus a bisect over 16 bucket bounds under a lock.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, metric: str, label: str, value: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        key = (metric, label, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, metric: str, labels: tuple, amount: int = 1) -> None:
+        """Increment a counter; labels is a tuple of (name, value) pairs."""
+        if not self.enabled:
+            return
+        key = (metric, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def stage(self, name: str):
+        """Context manager timing one order-path stage, e.g. `with metrics.stage("validation"):`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, name)
+
+    def observe_request(self, endpoint: str, seconds: float, error_code=None) -> None:
+        self.observe(REQUEST_METRIC, "endpoint", endpoint, seconds)
+        if error_code is not None:
+            self.inc(REQUEST_ERRORS_METRIC, (("endpoint", endpoint), ("code", str(error_code))))
+
+    def histogram(self, metric: str, value: str):
+        """Return the histogram for a stage or endpoint name, or None."""
+        label = "stage" if metric == STAGE_METRIC else "endpoint"
+        return self._histograms.get((metric, label, value))
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            dict: metric -> {label value: {"count", "mean_ms", "p50_ms", "p99_ms"}}; quantiles are bucket bounds.
+        """
+        result = {}
+        with self._lock:
+            for (metric, _, value), h in sorted(self._histograms.items()):
+                result.setdefault(metric, {})[value] = {
+                    "count": h.count,
+                    "mean_ms": round(h.sum / h.count * 1000, 3) if h.count else 0.0,
+                    "p50_ms": h.quantile(0.5) * 1000,
+                    "p99_ms": h.quantile(0.99) * 1000,
+                }
+        return result
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        current = None
+        for (metric, label, value), h in histograms:
+            if metric != current:
+                lines.append(f"# HELP {metric} {_HELP.get(metric, metric)}")
+                lines.append(f"# TYPE {metric} histogram")
+                current = metric
+            cumulative = 0
+            for bound, count in zip(BUCKETS, h.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{label}="{value}",le="+Inf"}} {h.count}')
+            lines.append(f'{metric}_sum{{{label}="{value}"}} {h.sum:.9f}')
+            lines.append(f'{metric}_count{{{label}="{value}"}} {h.count}')
+        for (metric, labels), count in counters:
+            if metric != current:
+                lines.append(f"# HELP {metric} {_HELP.get(metric, metric)}")
+                lines.append(f"# TYPE {metric} counter")
+                current = metric
+            rendered = ",".join(f'{name}="{value}"' for name, value in labels)
+            lines.append(f"{metric}{{{rendered}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write the Prometheus text to path atomically (temp file + rename)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+class _StageTimer:
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics: Metrics, name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(STAGE_METRIC, "stage", self.name, time.perf_counter() - self.started)
+        return False
+
+
+_NULL_TIMER = nullcontext()
+
+metrics = Metrics()
+
+def _write_metrics_file():
+    if METRICS_FILE and metrics.enabled:
+        metrics.write(METRICS_FILE)
+
+atexit.register(_write_metrics_file)
+
+
+@contextmanager
+def profile_run(path: str, top: int = 25):
+    """
+    Profile the enclosed block with cProfile and dump the stats to path.
+
+    The .prof file opens in snakeviz, or converts to a flame graph with flameprof or
+    gprof2dot. The `top` functions by cumulative time are also logged.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+        logger.info("Profile written to %s\n%s", path, out.getvalue())
+        print(f"📈 Profile written to {path} (view with: snakeviz {path})")
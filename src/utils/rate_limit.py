@@ -0,0 +1,285 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+from binance.exceptions import BinanceAPIException
+from src.utils.metrics import STAGE_METRIC, metrics
+
+logger = logging.getLogger("BinanceBot")
+
+# Request priorities: lower values are served first.
+PRIORITY_ORDER = 0
+PRIORITY_INFO = 1
+
+# Futures API limits (per minute weight, per 10s and per minute order counts).
+WEIGHT_LIMIT_1M = int(os.getenv("RATE_LIMIT_WEIGHT_1M", "2400"))
+ORDER_LIMIT_10S = int(os.getenv("RATE_LIMIT_ORDERS_10S", "300"))
+ORDER_LIMIT_1M = int(os.getenv("RATE_LIMIT_ORDERS_1M", "1200"))
+
+# Share of each bucket that informational calls may not use, kept free for order placement/cancel.
+ORDER_HEADROOM = 0.1
+
+# Error codes / HTTP statuses that mean we have been throttled and should back off and retry.
+# Throttles are retried only here; order submission treats them as final.
+THROTTLE_CODES = {-1003, -1015}
+THROTTLE_STATUSES = {418, 429}
+MAX_THROTTLE_RETRIES = 5
+
+# method name -> (weight, priority)
+ENDPOINT_COSTS = {
+    "futures_create_order": (1, PRIORITY_ORDER),
+    "futures_cancel_order": (1, PRIORITY_ORDER),
+    "futures_cancel_orders": (1, PRIORITY_ORDER),
+    "futures_cancel_all_open_orders": (1, PRIORITY_ORDER),
+    "futures_place_batch_order": (5, PRIORITY_ORDER),
+    "futures_account_balance": (5, PRIORITY_INFO),
+    "futures_account": (5, PRIORITY_INFO),
+    "futures_exchange_info": (1, PRIORITY_INFO),
+    "futures_get_order": (1, PRIORITY_INFO),
+    "futures_stream_get_listen_key": (1, PRIORITY_INFO),
+    "futures_stream_keepalive": (1, PRIORITY_INFO),
+}
+
+
+def request_cost(name: str, params: dict):
+    """
+    Return (weight, order_count, priority) for a client method call.
+    """
+    weight, priority = ENDPOINT_COSTS.get(name, (1, PRIORITY_INFO))
+    if name == "futures_mark_price" and "symbol" not in params:
+        weight = 10
+    elif name == "futures_get_open_orders" and "symbol" not in params:
+        weight = 40
+    elif name == "futures_order_book":
+        limit = int(params.get("limit", 500))
+        weight = 2 if limit <= 50 else 5 if limit <= 100 else 10 if limit <= 500 else 20
+
+    orders = 0
+    if name == "futures_create_order":
+        orders = 1
+    elif name == "futures_place_batch_order":
+        orders = len(params.get("batchOrders", []))
+    return weight, orders, priority
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at capacity / window tokens per second."""
+
+    def __init__(self, capacity: int, window: float):
+        self.capacity = capacity
+        self.window = window
+        self.rate = capacity / window
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, cost: float, reserve: float) -> float:
+        """Seconds until cost tokens are available while keeping reserve tokens untouched."""
+        missing = cost + reserve - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def sync_used(self, used: int) -> None:
+        """Align with the exchange's count of used units in the current window."""
+        self.tokens = min(self.tokens, float(self.capacity - used))
+
+    def drain(self) -> None:
+        self.tokens = min(self.tokens, 0.0)
+
+
+class RequestScheduler:
+    """
+    Central scheduler that keeps request weight and order counts under Binance limits.
+
+    Calls wait in a priority queue (order placement/cancel ahead of informational
+    calls) until the token buckets allow them, instead of failing with -1003/-1015.
+    Buckets are re-synchronised from the X-MBX-USED-WEIGHT / X-MBX-ORDER-COUNT headers.
+    """
+
+    def __init__(self, weight_limit: int = WEIGHT_LIMIT_1M, order_limit_10s: int = ORDER_LIMIT_10S,
+                 order_limit_1m: int = ORDER_LIMIT_1M):
+        self.weight = TokenBucket(weight_limit, 60.0)
+        self.orders_10s = TokenBucket(order_limit_10s, 10.0)
+        self.orders_1m = TokenBucket(order_limit_1m, 60.0)
+        self._lock = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._blocked_until = 0.0
+
+    def try_acquire(self, weight: int, orders: int = 0, priority: int = PRIORITY_INFO) -> float:
+        """
+        Take tokens if available.
+
+        Returns:
+            float: 0.0 if the tokens were taken, otherwise seconds to wait before retrying.
+        """
+        with self._lock:
+            return self._take(weight, orders, priority)
+
+    def acquire(self, weight: int, orders: int = 0, priority: int = PRIORITY_INFO) -> None:
+        """Block until the request may be sent, serving higher-priority waiters first."""
+        with self._lock:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    if self._waiters[0] == ticket:
+                        wait = self._take(weight, orders, priority)
+                        if wait == 0.0:
+                            return
+                    else:
+                        wait = None
+                    self._lock.wait(wait)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._lock.notify_all()
+
+    async def acquire_async(self, weight: int, orders: int = 0, priority: int = PRIORITY_INFO) -> None:
+        """Async variant of acquire(); waits on the event loop instead of blocking a thread."""
+        while True:
+            wait = self.try_acquire(weight, orders, priority)
+            if wait == 0.0:
+                return
+            await asyncio.sleep(wait)
+
+    def update_from_headers(self, headers) -> None:
+        """Synchronise buckets with the usage counters returned by the exchange."""
+        if not headers:
+            return
+        with self._lock:
+            for name, value in headers.items():
+                name = name.lower()
+                if name == "x-mbx-used-weight-1m":
+                    self.weight.sync_used(int(value))
+                elif name == "x-mbx-order-count-10s":
+                    self.orders_10s.sync_used(int(value))
+                elif name == "x-mbx-order-count-1m":
+                    self.orders_1m.sync_used(int(value))
+
+    def penalize(self, retry_after: float) -> None:
+        """Stop all traffic for retry_after seconds after the exchange throttled us."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            for bucket in (self.weight, self.orders_10s, self.orders_1m):
+                bucket.drain()
+            self._lock.notify_all()
+
+    def _take(self, weight: int, orders: int, priority: int) -> float:
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        buckets = [(self.weight, weight)]
+        if orders:
+            buckets += [(self.orders_10s, orders), (self.orders_1m, orders)]
+        wait = 0.0
+        for bucket, cost in buckets:
+            bucket.refill(now)
+            reserve = bucket.capacity * ORDER_HEADROOM if priority > PRIORITY_ORDER else 0.0
+            wait = max(wait, bucket.wait_time(cost, reserve))
+        if wait > 0.0:
+            return wait
+        for bucket, cost in buckets:
+            bucket.tokens -= cost
+        return 0.0
+
+
+def _retry_after(client, default: float = 1.0) -> float:
+    response = getattr(client, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After", default))
+    except (TypeError, ValueError):
+        return default
+
+
+class ScheduledClient:
+    """
+    Wraps a python-binance Client so every futures_* call goes through a RequestScheduler.
+    All other attributes are passed through to the wrapped client.
+    """
+
+    def __init__(self, client, scheduler: RequestScheduler):
+        self._client = client
+        self.scheduler = scheduler
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not name.startswith("futures_") or not callable(attr):
+            return attr
+
+        def call(**params):
+            weight, orders, priority = request_cost(name, params)
+            for attempt in range(MAX_THROTTLE_RETRIES + 1):
+                started = time.perf_counter()
+                self.scheduler.acquire(weight, orders, priority)
+                sent = time.perf_counter()
+                metrics.observe(STAGE_METRIC, "stage", "rate_limit_wait", sent - started)
+                try:
+                    result = attr(**params)
+                except BinanceAPIException as exc:
+                    metrics.observe_request(name, time.perf_counter() - sent, exc.code)
+                    throttled = exc.code in THROTTLE_CODES or exc.status_code in THROTTLE_STATUSES
+                    if not throttled or attempt == MAX_THROTTLE_RETRIES:
+                        raise
+                    retry_after = _retry_after(self._client)
+                    logger.warning("Rate limited on %s (Code: %s); retrying in %ss", name, exc.code, retry_after)
+                    self.scheduler.penalize(retry_after)
+                    continue
+                metrics.observe_request(name, time.perf_counter() - sent)
+                self._sync_usage()
+                return result
+
+        return call
+
+    def _sync_usage(self) -> None:
+        response = getattr(self._client, "response", None)
+        self.scheduler.update_from_headers(getattr(response, "headers", None))
+
+
+class AsyncScheduledClient(ScheduledClient):
+    """ScheduledClient for AsyncClient: waits for tokens on the event loop."""
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not name.startswith("futures_") or not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def call(**params):
+            weight, orders, priority = request_cost(name, params)
+            for attempt in range(MAX_THROTTLE_RETRIES + 1):
+                started = time.perf_counter()
+                await self.scheduler.acquire_async(weight, orders, priority)
+                sent = time.perf_counter()
+                metrics.observe(STAGE_METRIC, "stage", "rate_limit_wait", sent - started)
+                try:
+                    result = await attr(**params)
+                except BinanceAPIException as exc:
+                    metrics.observe_request(name, time.perf_counter() - sent, exc.code)
+                    throttled = exc.code in THROTTLE_CODES or exc.status_code in THROTTLE_STATUSES
+                    if not throttled or attempt == MAX_THROTTLE_RETRIES:
+                        raise
+                    retry_after = _retry_after(self._client)
+                    logger.warning("Rate limited on %s (Code: %s); retrying in %ss", name, exc.code, retry_after)
+                    self.scheduler.penalize(retry_after)
+                    continue
+                metrics.observe_request(name, time.perf_counter() - sent)
+                self._sync_usage()
+                return result
+
+        return call
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+def get_request_scheduler(api_key: str) -> RequestScheduler:
+    """Return the scheduler shared by every client using the given API key."""
+    with _schedulers_lock:
+        return _schedulers.setdefault(api_key, RequestScheduler())
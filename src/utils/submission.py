@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import aiohttp
+import requests
+from binance.exceptions import BinanceAPIException, BinanceRequestException
+from src.utils.journal import OrderJournal
+from src.utils.metrics import metrics
+
+logger = logging.getLogger("BinanceBot")
+
+# Retries after the first attempt, and the backoff bounds between them (full jitter).
+MAX_RETRIES = int(os.getenv("SUBMIT_RETRIES", "3"))
+RETRY_BASE_DELAY = 0.1
+RETRY_MAX_DELAY = 2.0
+# Seconds without a response before a hedge is sent; 0 disables hedging.
+HEDGE_AFTER = float(os.getenv("SUBMIT_HEDGE_AFTER", "0"))
+
+# The request may or may not have reached the matching engine (e.g. -1007 "execution status unknown").
+UNCERTAIN_CODES = {-1000, -1001, -1006, -1007}
+# The request was refused before execution and can be sent again. Throttles (-1003, -1015) are
+# retried by the request scheduler (src/utils/rate_limit.py), which honours Retry-After.
+RETRYABLE_CODES = {-1008, -1021}
+DUPLICATE_ORDER_CODE = -4116
+UNKNOWN_ORDER_CODES = {-2011, -2013}
+
+# Orders that cannot fill on arrival, so they are still open when a hedge arrives and Binance
+# rejects the hedge's reused client order id. Anything else is hedged with a lookup instead.
+RESTING_TYPES = {"STOP", "STOP_MARKET", "TAKE_PROFIT", "TAKE_PROFIT_MARKET", "TRAILING_STOP_MARKET"}
+
+SUBMIT_EVENTS_METRIC = "binance_bot_submit_events_total"
+
+NETWORK_ERRORS = (requests.exceptions.RequestException, BinanceRequestException)
+ASYNC_NETWORK_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, BinanceRequestException)
+
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="order-hedge")
+
+
+class OrderOutcomeUnknown(Exception):
+    """Submission failed in a way that may have created the order, and a lookup could not settle it."""
+
+    def __init__(self, client_order_id: str, cause: Exception):
+        super().__init__(f"Outcome of order {client_order_id} is unknown ({cause}); it stays PENDING in the journal.")
+        self.client_order_id = client_order_id
+        self.cause = cause
+
+
+def classify_error(exc: Exception) -> str:
+    """
+    Classify a submission failure.
+
+    Returns:
+        str: "duplicate" (the client order id is already open), "uncertain" (the order may
+        exist), "retryable" (refused, safe to resend) or "permanent" (e.g. a filter rejection).
+    """
+    if isinstance(exc, BinanceAPIException):
+        if exc.code == DUPLICATE_ORDER_CODE:
+            return "duplicate"
+        if exc.code in UNCERTAIN_CODES or (exc.status_code or 0) >= 500:
+            return "uncertain"
+        if exc.code in RETRYABLE_CODES:
+            return "retryable"
+        return "permanent"
+    if isinstance(exc, NETWORK_ERRORS + ASYNC_NETWORK_ERRORS):
+        return "uncertain"
+    return "permanent"
+
+
+def _hedge_resends(params: dict) -> bool:
+    return params.get("type") in RESTING_TYPES or params.get("timeInForce") == "GTX"
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _count(event: str) -> None:
+    metrics.inc(SUBMIT_EVENTS_METRIC, (("event", event),))
+
+
+def lookup_order(client, symbol: str, client_order_id: str):
+    """Return the order with this client order id, or None if the exchange does not know it."""
+    try:
+        return client.futures_get_order(symbol=symbol, origClientOrderId=client_order_id)
+    except BinanceAPIException as e:
+        if e.code in UNKNOWN_ORDER_CODES:
+            return None
+        raise
+
+
+async def lookup_order_async(client, symbol: str, client_order_id: str):
+    """Async variant of lookup_order() for use with AsyncClient."""
+    try:
+        return await client.futures_get_order(symbol=symbol, origClientOrderId=client_order_id)
+    except BinanceAPIException as e:
+        if e.code in UNKNOWN_ORDER_CODES:
+            return None
+        raise
+
+
+def send_order(client, retries: int = MAX_RETRIES, hedge_after: float = HEDGE_AFTER, **params) -> dict:
+    """
+    Create an order idempotently; a drop-in for client.futures_create_order(**params).
+
+    Every attempt reuses one newClientOrderId (assigned here if the caller has none). Permanent
+    rejections raise at once. Retryable ones are resent after a bounded, jittered backoff. When
+    an attempt may have reached the exchange (timeout, 5xx, -1007), the id is looked up first and
+    the order is only resent once the exchange reports it unknown. Binance rejects a reused id
+    only while the order is open, so a blind resend could double a fill. A -4116 duplicate
+    resolves to the existing order.
+
+    With hedge_after > 0, an attempt still waiting after that many seconds is hedged. Orders that
+    cannot fill on arrival (stop/take-profit types, GTX limits) are resent; the loser of the race
+    gets -4116. Other orders are hedged with a lookup, which returns the order if it has already
+    landed.
+
+    Raises:
+        BinanceAPIException: On a permanent rejection, or when retries run out.
+        OrderOutcomeUnknown: If the order may exist and the final lookup failed too.
+    """
+    client_order_id = params.setdefault("newClientOrderId", OrderJournal.client_order_id())
+    symbol = params["symbol"]
+    last_error = None
+    unresolved = False
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(_backoff(attempt))
+            _count("retry")
+        if unresolved:
+            try:
+                order = lookup_order(client, symbol, client_order_id)
+            except (BinanceAPIException,) + NETWORK_ERRORS as e:
+                last_error = e
+                logger.warning("Lookup of order %s failed: %s", client_order_id, e)
+                continue
+            if order is not None:
+                _count("resolved")
+                logger.info("Order %s found on the exchange after an uncertain attempt", client_order_id)
+                return order
+            unresolved = False
+        try:
+            with metrics.stage("submission"):
+                return _create(client, params, hedge_after)
+        except (BinanceAPIException,) + NETWORK_ERRORS as e:
+            kind = classify_error(e)
+            if kind == "duplicate":
+                order = lookup_order(client, symbol, client_order_id)
+                if order is None:
+                    raise
+                _count("duplicate")
+                return order
+            if kind == "permanent":
+                raise
+            last_error = e
+            unresolved = kind == "uncertain"
+            logger.warning("Order %s attempt %s/%s failed (%s): %s", client_order_id, attempt + 1, retries + 1,
+                           kind, e)
+
+    if unresolved:
+        try:
+            order = lookup_order(client, symbol, client_order_id)
+        except (BinanceAPIException,) + NETWORK_ERRORS as e:
+            raise OrderOutcomeUnknown(client_order_id, e)
+        if order is not None:
+            _count("resolved")
+            return order
+    raise last_error
+
+
+def _create(client, params: dict, hedge_after: float) -> dict:
+    if not hedge_after:
+        return client.futures_create_order(**params)
+    primary = _hedge_executor.submit(client.futures_create_order, **params)
+    done, _ = wait([primary], timeout=hedge_after)
+    if done:
+        return primary.result()
+
+    _count("hedge")
+    hedge = _hedge_executor.submit(_hedge, client, params)
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future is primary and primary.exception() is None:
+                return primary.result()
+            if future is hedge and hedge.exception() is None and hedge.result() is not None:
+                _count("hedge_won")
+                return hedge.result()
+    # Neither side produced the order: surface the primary's error
+    return primary.result()
+
+
+def _hedge(client, params: dict):
+    """Send the hedge: a resend when duplicates are rejected, otherwise a lookup. Returns the order or None."""
+    if _hedge_resends(params):
+        try:
+            return client.futures_create_order(**params)
+        except BinanceAPIException as e:
+            if e.code != DUPLICATE_ORDER_CODE:
+                raise
+    return lookup_order(client, params["symbol"], params["newClientOrderId"])
+
+
+async def send_order_async(client, retries: int = MAX_RETRIES, hedge_after: float = HEDGE_AFTER, **params) -> dict:
+    """Async variant of send_order() for use with AsyncClient."""
+    client_order_id = params.setdefault("newClientOrderId", OrderJournal.client_order_id())
+    symbol = params["symbol"]
+    last_error = None
+    unresolved = False
+    for attempt in range(retries + 1):
+        if attempt:
+            await asyncio.sleep(_backoff(attempt))
+            _count("retry")
+        if unresolved:
+            try:
+                order = await lookup_order_async(client, symbol, client_order_id)
+            except (BinanceAPIException,) + ASYNC_NETWORK_ERRORS as e:
+                last_error = e
+                logger.warning("Lookup of order %s failed: %s", client_order_id, e)
+                continue
+            if order is not None:
+                _count("resolved")
+                logger.info("Order %s found on the exchange after an uncertain attempt", client_order_id)
+                return order
+            unresolved = False
+        try:
+            with metrics.stage("submission"):
+                return await _create_async(client, params, hedge_after)
+        except (BinanceAPIException,) + ASYNC_NETWORK_ERRORS as e:
+            kind = classify_error(e)
+            if kind == "duplicate":
+                order = await lookup_order_async(client, symbol, client_order_id)
+                if order is None:
+                    raise
+                _count("duplicate")
+                return order
+            if kind == "permanent":
+                raise
+            last_error = e
+            unresolved = kind == "uncertain"
+            logger.warning("Order %s attempt %s/%s failed (%s): %s", client_order_id, attempt + 1, retries + 1,
+                           kind, e)
+
+    if unresolved:
+        try:
+            order = await lookup_order_async(client, symbol, client_order_id)
+        except (BinanceAPIException,) + ASYNC_NETWORK_ERRORS as e:
+            raise OrderOutcomeUnknown(client_order_id, e)
+        if order is not None:
+            _count("resolved")
+            return order
+    raise last_error
+
+
+async def _create_async(client, params: dict, hedge_after: float) -> dict:
+    if not hedge_after:
+        return await client.futures_create_order(**params)
+    primary = asyncio.ensure_future(client.futures_create_order(**params))
+    done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+    if done:
+        return primary.result()
+
+    _count("hedge")
+    hedge = asyncio.ensure_future(_hedge_async(client, params))
+    # The loser keeps running (a sent request cannot be recalled); retrieve its error so it is not logged
+    for task in (primary, hedge):
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    pending = {primary, hedge}
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task is primary and primary.exception() is None:
+                return primary.result()
+            if task is hedge and hedge.exception() is None and hedge.result() is not None:
+                _count("hedge_won")
+                return hedge.result()
+    # Neither side produced the order: surface the primary's error
+    return primary.result()
+
+
+async def _hedge_async(client, params: dict):
+    if _hedge_resends(params):
+        try:
+            return await client.futures_create_order(**params)
+        except BinanceAPIException as e:
+            if e.code != DUPLICATE_ORDER_CODE:
+                raise
+    return await lookup_order_async(client, params["symbol"], params["newClientOrderId"])
@@ -0,0 +1,304 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from binance.exceptions import BinanceAPIException
+from websockets.sync.client import connect
+
+from src.utils.journal import get_order_journal
+from src.utils.ledger import get_margin_ledger
+from src.utils.logger import log_order_event
+
+logger = logging.getLogger("BinanceBot")
+
+USER_STREAM_URL = "wss://fstream.binance.com/ws/"
+TESTNET_USER_STREAM_URL = "wss://stream.binancefuture.com/ws/"
+
+# Binance expires a listen key after 60 minutes without a keepalive.
+KEEPALIVE_INTERVAL = float(os.getenv("USER_STREAM_KEEPALIVE", "1800"))
+OCO_CANCEL_WORKERS = int(os.getenv("OCO_CANCEL_WORKERS", "4"))
+
+# A leg in one of these states closes its OCO pair.
+CLOSING_STATUSES = {"PARTIALLY_FILLED", "FILLED", "CANCELED", "EXPIRED", "EXPIRED_IN_MATCH", "REJECTED"}
+FINAL_STATUSES = CLOSING_STATUSES - {"PARTIALLY_FILLED"}
+# Updates for orders not (yet) registered are kept briefly, in case a leg fills before its pair is registered.
+EARLY_UPDATE_LIMIT = 10000
+
+
+class OcoPair:
+    """A take-profit leg and a stop leg of which at most one may execute."""
+
+    __slots__ = ("symbol", "take_profit_id", "stop_id", "closed_by", "sibling_cancelled", "_done")
+
+    def __init__(self, symbol: str, take_profit_id, stop_id):
+        self.symbol = symbol
+        self.take_profit_id = take_profit_id
+        self.stop_id = stop_id
+        self.closed_by = None
+        self.sibling_cancelled = None
+        self._done = threading.Event()
+
+    def sibling(self, order_id):
+        return self.stop_id if order_id == self.take_profit_id else self.take_profit_id
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until one leg closed and the other was cancelled; returns False on timeout."""
+        return self._done.wait(timeout)
+
+
+class OcoManager:
+    """
+    Emulates OCO on futures: when either leg of a registered pair fills (or is cancelled
+    or expires), the other leg is cancelled.
+
+    Pairs are indexed by both order ids, so an order update is matched in O(1) however many
+    pairs are live. Cancels run on a small thread pool so the stream thread never blocks
+    on a REST round trip.
+    """
+
+    def __init__(self, client, workers: int = OCO_CANCEL_WORKERS):
+        self.client = client
+        self._pairs = {}
+        self._early = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="oco-cancel")
+
+    @property
+    def live_pairs(self) -> int:
+        return len({id(pair) for pair in self._pairs.values()})
+
+    def register(self, symbol: str, take_profit_order: dict, stop_order: dict) -> OcoPair:
+        """
+        Start watching a pair. If a leg already closed (in its response or in an update that
+        arrived first), its sibling is cancelled right away.
+        """
+        pair = OcoPair(symbol, take_profit_order["orderId"], stop_order["orderId"])
+        closed = None
+        with self._lock:
+            for order in (take_profit_order, stop_order):
+                status = self._early.pop(order["orderId"], None) or order.get("status")
+                if closed is None and status in CLOSING_STATUSES:
+                    closed = (order["orderId"], status)
+            self._pairs[pair.take_profit_id] = pair
+            self._pairs[pair.stop_id] = pair
+        logger.debug("OCO pair registered: %s take-profit %s, stop %s", symbol, pair.take_profit_id, pair.stop_id)
+        if closed:
+            self._close(pair, *closed)
+        return pair
+
+    def on_order_update(self, event: dict) -> None:
+        """Handle an ORDER_TRADE_UPDATE event."""
+        order = event.get("o", {})
+        order_id, status = order.get("i"), order.get("X")
+        if status not in CLOSING_STATUSES:
+            return
+        with self._lock:
+            pair = self._pairs.get(order_id)
+            if pair is None:
+                self._early[order_id] = status
+                if len(self._early) > EARLY_UPDATE_LIMIT:
+                    self._early.popitem(last=False)
+                return
+        self._close(pair, order_id, status)
+
+    def resync(self) -> None:
+        """
+        Re-check live pairs against the exchange after the stream reconnects, since
+        updates sent while disconnected are lost.
+        """
+        with self._lock:
+            pairs = {id(pair): pair for pair in self._pairs.values() if pair.closed_by is None}
+        for symbol in {pair.symbol for pair in pairs.values()}:
+            try:
+                open_ids = {o["orderId"] for o in self.client.futures_get_open_orders(symbol=symbol)}
+            except BinanceAPIException as api_exc:
+                logger.error("OCO resync for %s failed: %s (Code: %s)", symbol, api_exc.message, api_exc.code)
+                continue
+            for pair in pairs.values():
+                if pair.symbol != symbol:
+                    continue
+                for order_id in (pair.take_profit_id, pair.stop_id):
+                    if order_id not in open_ids:
+                        self._close(pair, order_id, "CLOSED")
+                        break
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _close(self, pair: OcoPair, order_id, status: str) -> None:
+        with self._lock:
+            if pair.closed_by is not None:
+                return
+            pair.closed_by = order_id
+            self._pairs.pop(pair.take_profit_id, None)
+            self._pairs.pop(pair.stop_id, None)
+        self._executor.submit(self._cancel_sibling, pair, order_id, status)
+
+    def _cancel_sibling(self, pair: OcoPair, order_id, status: str) -> None:
+        sibling = pair.sibling(order_id)
+        try:
+            self.client.futures_cancel_order(symbol=pair.symbol, orderId=sibling)
+            pair.sibling_cancelled = True
+            logger.info("OCO %s: order %s %s, cancelled sibling %s", pair.symbol, order_id, status, sibling)
+        except BinanceAPIException as api_exc:
+            pair.sibling_cancelled = False
+            if api_exc.code in (-2011, -2013):
+                logger.warning("OCO %s: sibling %s of order %s was already closed (%s)",
+                               pair.symbol, sibling, order_id, api_exc.message)
+            else:
+                logger.error("OCO %s: failed to cancel sibling %s: %s (Code: %s)",
+                             pair.symbol, sibling, api_exc.message, api_exc.code)
+        except Exception as e:
+            pair.sibling_cancelled = False
+            logger.error("OCO %s: failed to cancel sibling %s: %s", pair.symbol, sibling, e)
+        finally:
+            pair._done.set()
+
+
+class UserDataStream:
+    """
+    Background listener for the futures user-data stream of one account.
+
+    Order updates are applied to the OCO manager (first, as it is latency sensitive), the
+    margin ledger and the order journal; account updates schedule a ledger reconcile.
+    The listen key is kept alive on the stream thread. A client that pushes events itself
+    (such as SimulatedExchange, via add_listener) is used directly instead of a WebSocket.
+    """
+
+    def __init__(self, client, testnet: bool = None, keepalive_interval: float = KEEPALIVE_INTERVAL):
+        if testnet is None:
+            testnet = getattr(client, "testnet", None)
+        if testnet is None:
+            testnet = os.getenv("BINANCE_TESTNET", "True").lower() == "true"
+        self.client = client
+        self.url = TESTNET_USER_STREAM_URL if testnet else USER_STREAM_URL
+        self.keepalive_interval = keepalive_interval
+        self.oco = OcoManager(client)
+        self._handlers = []
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._ws = None
+        self._listening = False
+
+    def add_handler(self, callback) -> None:
+        """Call `callback(event)` for every user-data event after the built-in handling."""
+        self._handlers.append(callback)
+
+    def remove_handler(self, callback) -> None:
+        if callback in self._handlers:
+            self._handlers.remove(callback)
+
+    def start(self, timeout: float = 10.0) -> bool:
+        """Start listening (idempotent) and wait up to `timeout` seconds for the stream to connect."""
+        if hasattr(self.client, "add_listener"):
+            if not self._listening:
+                self.client.add_listener(self.dispatch)
+                self._listening = True
+                self._ready.set()
+        elif self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="user-data", daemon=True)
+            self._thread.start()
+        return self._ready.wait(timeout)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._ready.clear()
+        if self._listening:
+            self.client.remove_listener(self.dispatch)
+            self._listening = False
+        if self._ws is not None:
+            self._ws.close()
+
+    def dispatch(self, event: dict) -> None:
+        """Apply one user-data event."""
+        event_type = event.get("e")
+        if event_type == "ORDER_TRADE_UPDATE":
+            self.oco.on_order_update(event)
+            self._apply_order_update(event)
+        elif event_type == "ACCOUNT_UPDATE":
+            get_margin_ledger(self.client).apply_account_update(event)
+        elif event_type == "listenKeyExpired":
+            logger.warning("User data listen key expired; reconnecting")
+            if self._ws is not None:
+                self._ws.close()
+        for handler in self._handlers:
+            handler(event)
+
+    def _apply_order_update(self, event: dict) -> None:
+        order = event["o"]
+        get_margin_ledger(self.client).apply_order_update(event)
+        get_order_journal().set_status(order.get("c"), order.get("X"), float(order.get("z") or 0))
+        if order.get("x") == "TRADE":
+            log_order_event(
+                "trade", symbol=order.get("s"), side=order.get("S"), order_id=order.get("i"),
+                client_order_id=order.get("c"), last_qty=order.get("l"), last_price=order.get("L"),
+                executed_qty=order.get("z"), status=order.get("X"), maker=order.get("m")
+            )
+
+    def _run(self) -> None:
+        backoff = 1.0
+        connected_before = False
+        while not self._stop.is_set():
+            try:
+                listen_key = self.client.futures_stream_get_listen_key()
+                with connect(self.url + listen_key) as ws:
+                    self._ws = ws
+                    self._ready.set()
+                    backoff = 1.0
+                    if connected_before:
+                        # Updates sent while disconnected are lost: reconcile from REST once
+                        get_margin_ledger(self.client).apply_account_update({})
+                        self.oco.resync()
+                    connected_before = True
+                    keepalive_at = time.monotonic() + self.keepalive_interval
+                    while not self._stop.is_set():
+                        try:
+                            message = ws.recv(timeout=1.0)
+                        except TimeoutError:
+                            message = None
+                        if message is not None:
+                            self.dispatch(json.loads(message))
+                        if time.monotonic() >= keepalive_at:
+                            self.client.futures_stream_keepalive(listenKey=listen_key)
+                            keepalive_at = time.monotonic() + self.keepalive_interval
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                logger.warning("User data stream disconnected: %s; reconnecting in %.0fs", e, backoff)
+            finally:
+                self._ws = None
+                self._ready.clear()
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+def get_user_stream(client, start: bool = True) -> UserDataStream:
+    """Return the user-data stream for the client's account, starting it on first use."""
+    key = getattr(client, "API_KEY", None) or id(client)
+    stream = _streams.get(key)
+    if stream is None:
+        with _streams_lock:
+            stream = _streams.setdefault(key, UserDataStream(client))
+    if start:
+        stream.start()
+    return stream
+
+def stop_user_streams() -> None:
+    with _streams_lock:
+        for stream in _streams.values():
+            stream.stop()
+            stream.oco.shutdown()
+        _streams.clear()
@@ -1,36 +1,197 @@
+from collections import namedtuple
 from decimal import Decimal, getcontext
 
+import numpy as np
+from src.utils.filters import filter_cache
+from src.utils.metrics import metrics
+
 getcontext().prec = 10
 
-def validate_order_params(client, symbol, quantity, price=None):
-    exchange_info = client.futures_exchange_info()
-    symbol_info = next((s for s in exchange_info['symbols'] if s['symbol'] == symbol), None)
+def check_order_params(filters, quantity, price=None):
+    """
+    Validate quantity and (optional) price against pre-converted symbol filters.
+    """
+    with metrics.stage("validation"):
+        return _check_order_params(filters, quantity, price)
 
-    if not symbol_info:
-        raise ValueError(f"Invalid symbol: {symbol}")
+def _check_order_params(filters, quantity, price=None):
+    symbol = filters.symbol
+    quantity_dec = Decimal(str(quantity))
 
-    min_qty = float(next(f['minQty'] for f in symbol_info['filters'] if f['filterType'] == 'LOT_SIZE'))
-    step_size = float(next(f['stepSize'] for f in symbol_info['filters'] if f['filterType'] == 'LOT_SIZE'))
+    if quantity_dec < filters.min_qty:
+        raise ValueError(f"Quantity {quantity} is less than minimum allowed ({filters.min_qty}) for {symbol}.")
 
-    if quantity < min_qty:
-        raise ValueError(f"Quantity {quantity} is less than minimum allowed ({min_qty}) for {symbol}.")
+    if filters.max_qty and quantity_dec > filters.max_qty:
+        raise ValueError(f"Quantity {quantity} is greater than maximum allowed ({filters.max_qty}) for {symbol}.")
 
-    quantity_dec = Decimal(str(quantity))
-    min_qty_dec = Decimal(str(min_qty))
-    step_size_dec = Decimal(str(step_size))
-    qdiff = (quantity_dec - min_qty_dec) / step_size_dec
-    if qdiff != qdiff.to_integral_value():
-        raise ValueError(f"Quantity {quantity} does not adhere to step size ({step_size}) for {symbol}.")
+    if filters.step_size:
+        qdiff = (quantity_dec - filters.min_qty) / filters.step_size
+        if qdiff != qdiff.to_integral_value():
+            raise ValueError(f"Quantity {quantity} does not adhere to step size ({filters.step_size}) for {symbol}.")
 
     if price is not None:
-        min_price = float(next(f['minPrice'] for f in symbol_info['filters'] if f['filterType'] == 'PRICE_FILTER'))
-        tick_size = float(next(f['tickSize'] for f in symbol_info['filters'] if f['filterType'] == 'PRICE_FILTER'))
-
         price_dec = Decimal(str(price))
-        min_price_dec = Decimal(str(min_price))
-        tick_size_dec = Decimal(str(tick_size))
-        diff = (price_dec - min_price_dec) / tick_size_dec
-        if diff != diff.to_integral_value():
-            raise ValueError(f"Price {price} does not adhere to tick size ({tick_size}) for {symbol}.")
+
+        if price_dec < filters.min_price:
+            raise ValueError(f"Price {price} is less than minimum allowed ({filters.min_price}) for {symbol}.")
+
+        if filters.tick_size:
+            diff = (price_dec - filters.min_price) / filters.tick_size
+            if diff != diff.to_integral_value():
+                raise ValueError(f"Price {price} does not adhere to tick size ({filters.tick_size}) for {symbol}.")
+
+        if filters.min_notional and quantity_dec * price_dec < filters.min_notional:
+            raise ValueError(
+                f"Order notional {quantity_dec * price_dec} is below minimum ({filters.min_notional}) for {symbol}."
+            )
 
     return True
+
+def validate_order_params(client, symbol, quantity, price=None):
+    with metrics.stage("filters"):
+        filters = filter_cache.get(client, symbol)
+    return check_order_params(filters, quantity, price)
+
+OrderVerdict = namedtuple("OrderVerdict", ["index", "price", "quantity", "valid", "error"])
+
+def _scale_for(*increments):
+    """Return the power of ten that turns every increment into an integer."""
+    decimals = max((max(-inc.normalize().as_tuple().exponent, 0) for inc in increments if inc), default=0)
+    return 10 ** decimals, decimals
+
+def _snap_units(values, base, increment, scale, rounding):
+    """Snap floats onto the integer grid base + k * increment (all in scaled units)."""
+    base_units = int(base * scale)
+    inc_units = int(increment * scale)
+    offset = np.rint(np.asarray(values, dtype=np.float64) * scale).astype(np.int64) - base_units
+    if rounding == "down":
+        steps = offset // inc_units
+    elif rounding == "up":
+        steps = -((-offset) // inc_units)
+    else:
+        steps = (offset + inc_units // 2) // inc_units
+    return base_units + steps * inc_units
+
+def _snap(values, base, increment, rounding):
+    """Snap an array onto base + k * increment; an exact integer over a power of ten is the nearest float."""
+    if not increment:
+        return np.asarray(values, dtype=np.float64)
+    scale, _ = _scale_for(increment, base)
+    return _snap_units(values, base, increment, scale, rounding) / scale
+
+def normalize_prices(filters, prices, rounding="nearest"):
+    """
+    Snap a sequence of prices to the symbol's tick size.
+
+    Args:
+        filters (SymbolFilters): Cached filters for the symbol.
+        prices (Iterable[float]): Raw prices.
+        rounding (str): "nearest", "down" or "up".
+
+    Returns:
+        list[float]: Prices that are exact multiples of the tick size above minPrice.
+    """
+    return _snap(list(prices), filters.min_price, filters.tick_size, rounding).tolist()
+
+def normalize_quantities(filters, quantities, rounding="down"):
+    """
+    Snap a sequence of quantities to the symbol's step size.
+
+    Quantities are rounded down by default so a split never exceeds the requested total.
+    """
+    return _snap(list(quantities), filters.min_qty, filters.step_size, rounding).tolist()
+
+def normalize_price(filters, price, rounding="nearest"):
+    return normalize_prices(filters, [price], rounding)[0]
+
+def normalize_quantity(filters, quantity, rounding="down"):
+    return normalize_quantities(filters, [quantity], rounding)[0]
+
+def validate_orders_batch(filters, prices, quantities, normalize=True):
+    """
+    Validate many orders for one symbol in a single pass using integer tick/step units.
+
+    Args:
+        filters (SymbolFilters): Cached filters for the symbol.
+        prices (Sequence[float | None]): Limit prices, or None entries for market orders.
+        quantities (Sequence[float]): Order quantities (same length as prices).
+        normalize (bool): Snap prices/quantities to tick/step before checking.
+
+    Returns:
+        list[OrderVerdict]: One verdict per order, in input order.
+    """
+    with metrics.stage("validation_batch"):
+        return _validate_orders_batch(filters, prices, quantities, normalize)
+
+def _validate_orders_batch(filters, prices, quantities, normalize):
+    if len(prices) != len(quantities):
+        raise ValueError("prices and quantities must have the same length.")
+
+    p_scale, _ = _scale_for(filters.tick_size, filters.min_price)
+    q_scale, _ = _scale_for(filters.step_size, filters.min_qty)
+    tick_units = int(filters.tick_size * p_scale) or 1
+    step_units = int(filters.step_size * q_scale) or 1
+    min_price_units = int(filters.min_price * p_scale)
+    max_price_units = int(filters.max_price * p_scale)
+    min_qty_units = int(filters.min_qty * q_scale)
+    max_qty_units = int(filters.max_qty * q_scale)
+    min_notional = float(filters.min_notional)
+
+    # Market orders (None prices) are checked at minPrice and their price checks masked out
+    is_limit = np.array([p is not None for p in prices], dtype=bool)
+    price_arr = np.array([float(filters.min_price) if p is None else p for p in prices], dtype=np.float64)
+    qty_arr = np.asarray(quantities, dtype=np.float64)
+    if normalize:
+        qty_arr = _snap(qty_arr, filters.min_qty, filters.step_size, "down")
+        price_arr = _snap(price_arr, filters.min_price, filters.tick_size, "nearest")
+        quantities = qty_arr.tolist()
+        prices = [p if limit else None for p, limit in zip(price_arr.tolist(), is_limit)]
+
+    q_units, q_on_grid = _to_units(qty_arr, q_scale)
+    p_units, p_on_grid = _to_units(price_arr, p_scale)
+    # np.select picks the first failing check per order, matching the scalar check order
+    failures = np.select([
+        q_units < min_qty_units,
+        (q_units > max_qty_units) if max_qty_units else False,
+        ~q_on_grid | ((q_units - min_qty_units) % step_units != 0),
+        is_limit & (p_units < min_price_units),
+        is_limit & (p_units > max_price_units) if max_price_units else False,
+        is_limit & (~p_on_grid | ((p_units - min_price_units) % tick_units != 0)),
+        is_limit & (price_arr * qty_arr < min_notional) if min_notional else False,
+    ], range(1, 8), 0)
+
+    verdicts = [OrderVerdict(i, price, quantity, True, None) for i, (price, quantity) in enumerate(zip(prices, quantities))]
+    for i in np.flatnonzero(failures).tolist():
+        verdict = verdicts[i]
+        verdicts[i] = verdict._replace(valid=False, error=_batch_error(filters, failures[i], verdict.price, verdict.quantity))
+    return verdicts
+
+def _to_units(values, scale):
+    """
+    Convert floats to scaled units.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Units (exact integers where on the unit grid, the raw
+        scaled value elsewhere, so range checks are not rounded either) and the on-grid mask.
+        Only float representation error is tolerated; 0.0105 at a 0.001 step is off-grid.
+    """
+    raw = values * scale
+    units = np.rint(raw)
+    on_grid = np.abs(raw - units) <= 1e-12 * np.maximum(1.0, np.abs(raw))
+    return np.where(on_grid, units, raw), on_grid
+
+def _batch_error(filters, failure, price, quantity):
+    symbol = filters.symbol
+    if failure == 1:
+        return f"Quantity {quantity} is less than minimum allowed ({filters.min_qty}) for {symbol}."
+    if failure == 2:
+        return f"Quantity {quantity} is greater than maximum allowed ({filters.max_qty}) for {symbol}."
+    if failure == 3:
+        return f"Quantity {quantity} does not adhere to step size ({filters.step_size}) for {symbol}."
+    if failure == 4:
+        return f"Price {price} is less than minimum allowed ({filters.min_price}) for {symbol}."
+    if failure == 5:
+        return f"Price {price} is greater than maximum allowed ({filters.max_price}) for {symbol}."
+    if failure == 6:
+        return f"Price {price} does not adhere to tick size ({filters.tick_size}) for {symbol}."
+    return f"Order notional {price * quantity} is below minimum ({filters.min_notional}) for {symbol}."